@@ -231,3 +231,162 @@ LOGGING = {
 # Groq API Configuration
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
 GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+
+# Workflow Execution Configuration
+# Maximum number of nodes running at the same time within a single execution
+WORKFLOW_MAX_CONCURRENT_NODES = int(os.getenv('WORKFLOW_MAX_CONCURRENT_NODES', '8'))
+# Number of compiled workflow plans kept in the in-process LRU
+WORKFLOW_PLAN_CACHE_SIZE = int(os.getenv('WORKFLOW_PLAN_CACHE_SIZE', '128'))
+# Bounds for finished execution contexts kept in memory (older ones are read from the database)
+WORKFLOW_EXECUTION_REGISTRY = {
+    'MAX_ENTRIES': int(os.getenv('WORKFLOW_EXECUTION_REGISTRY_MAX_ENTRIES', '200')),
+    'MAX_BYTES': int(os.getenv('WORKFLOW_EXECUTION_REGISTRY_MAX_BYTES', str(64 * 1024 * 1024))),
+    'TTL_SECONDS': int(os.getenv('WORKFLOW_EXECUTION_REGISTRY_TTL_SECONDS', '300')),
+}
+# Seconds between keep-alive comments on execution event streams
+WORKFLOW_EVENT_STREAM_HEARTBEAT = int(os.getenv('WORKFLOW_EVENT_STREAM_HEARTBEAT', '15'))
+
+# LLM Thread Pool Configuration
+# Blocking LLM SDK calls run on a dedicated pool instead of the event loop
+LLM_THREAD_POOL_SIZE = int(os.getenv('LLM_THREAD_POOL_SIZE', '16'))
+# Maximum concurrent calls per provider (capped by the pool size)
+LLM_PROVIDER_CONCURRENCY = {
+    'openai': int(os.getenv('LLM_OPENAI_CONCURRENCY', '8')),
+    'groq': int(os.getenv('LLM_GROQ_CONCURRENCY', '8')),
+    'anthropic': int(os.getenv('LLM_ANTHROPIC_CONCURRENCY', '4')),
+    'google': int(os.getenv('LLM_GOOGLE_CONCURRENCY', '4')),
+    'default': int(os.getenv('LLM_DEFAULT_CONCURRENCY', '4')),
+}
+
+# Workflow Execution Queue Configuration
+# BACKEND: 'local' runs executions on an in-process worker pool,
+# 'database' stores them in the ExecutionJob table for `manage.py run_execution_worker`
+WORKFLOW_EXECUTION_QUEUE = {
+    'BACKEND': os.getenv('WORKFLOW_EXECUTION_QUEUE_BACKEND', 'local'),
+    'WORKERS': int(os.getenv('WORKFLOW_EXECUTION_WORKERS', '4')),
+    'POLL_INTERVAL': float(os.getenv('WORKFLOW_EXECUTION_POLL_INTERVAL', '1.0')),
+    # Return 202 Accepted from execute endpoints unless the request sets run_async
+    'ASYNC_BY_DEFAULT': os.getenv('WORKFLOW_EXECUTION_ASYNC_BY_DEFAULT', 'false').lower() == 'true',
+    # Database workers renew their claim on a running job; an expired claim (dead worker) is reclaimed
+    'LEASE_SECONDS': int(os.getenv('WORKFLOW_EXECUTION_LEASE_SECONDS', '60')),
+    # Claims of one job before an abandoned job is marked failed
+    'MAX_ATTEMPTS': int(os.getenv('WORKFLOW_EXECUTION_MAX_ATTEMPTS', '3')),
+}
+
+# Workflow Result Cache Configuration
+# Shared defaults for the in-process LRU + SQLite caches (set WORKFLOW_CACHE_DB_PATH to '' for memory only)
+WORKFLOW_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('WORKFLOW_CACHE_MAX_ENTRIES', '1024')),
+    'MAX_DB_ENTRIES': int(os.getenv('WORKFLOW_CACHE_MAX_DB_ENTRIES', '10000')),
+    'TTL_SECONDS': int(os.getenv('WORKFLOW_CACHE_TTL_SECONDS', '3600')),
+    'DB_PATH': os.getenv('WORKFLOW_CACHE_DB_PATH', str(BASE_DIR / 'workflow_cache.sqlite3')) or None,
+}
+# Memoized results of nodes that set the `cacheResults` property
+WORKFLOW_NODE_CACHE = {
+    'TTL_SECONDS': int(os.getenv('WORKFLOW_NODE_CACHE_TTL_SECONDS', '86400')),
+}
+
+# Workflow Timeout Configuration
+# Wall-clock limit for a whole execution in seconds (0 disables it)
+WORKFLOW_EXECUTION_TIMEOUT = int(os.getenv('WORKFLOW_EXECUTION_TIMEOUT', '1800'))
+# Per-node-type timeouts in seconds, merged over the built-in defaults;
+# a node's own `timeout` property takes precedence
+WORKFLOW_NODE_TIMEOUTS = {
+    'default': int(os.getenv('WORKFLOW_NODE_TIMEOUT', '60')),
+}
+
+# HTTP Client Pool Configuration
+# Shared httpx clients used by HTTP Request nodes (HTTP/2 needs the optional `h2` package)
+HTTP_CLIENT_POOL = {
+    'TIMEOUT': float(os.getenv('HTTP_CLIENT_TIMEOUT', '30')),
+    'CONNECT_TIMEOUT': float(os.getenv('HTTP_CLIENT_CONNECT_TIMEOUT', '10')),
+    'MAX_CONNECTIONS': int(os.getenv('HTTP_CLIENT_MAX_CONNECTIONS', '100')),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.getenv('HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS', '20')),
+    'KEEPALIVE_EXPIRY': float(os.getenv('HTTP_CLIENT_KEEPALIVE_EXPIRY', '30')),
+    'PER_HOST_LIMIT': int(os.getenv('HTTP_CLIENT_PER_HOST_LIMIT', '10')),
+    'HTTP2': os.getenv('HTTP_CLIENT_HTTP2', 'true').lower() == 'true',
+}
+
+# HTTP Request Node Configuration
+# Response bodies above MAX_IN_MEMORY_BYTES are streamed to SPILL_DIR and passed on as a file handle
+HTTP_REQUEST_NODE = {
+    'MAX_IN_MEMORY_BYTES': int(os.getenv('HTTP_REQUEST_MAX_IN_MEMORY_BYTES', str(5 * 1024 * 1024))),
+    'SPILL_DIR': os.getenv('HTTP_REQUEST_SPILL_DIR') or None,
+    'SPILL_TTL_SECONDS': int(os.getenv('HTTP_REQUEST_SPILL_TTL_SECONDS', '3600')),
+    # Auto-pagination limits
+    'MAX_PAGES': int(os.getenv('HTTP_REQUEST_MAX_PAGES', '100')),
+    'PAGE_CONCURRENCY': int(os.getenv('HTTP_REQUEST_PAGE_CONCURRENCY', '4')),
+    'MAX_PAGINATED_BYTES': int(os.getenv('HTTP_REQUEST_MAX_PAGINATED_BYTES', str(50 * 1024 * 1024))),
+}
+# HTTP cache for GET requests of nodes with `cacheResponses` enabled
+# (freshness comes from response headers; TTL only bounds how long entries are kept for revalidation;
+# MAX_BYTES caps the stored bodies of each tier, which are otherwise only bounded by row count)
+HTTP_RESPONSE_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('HTTP_RESPONSE_CACHE_MAX_ENTRIES', '512')),
+    'TTL_SECONDS': int(os.getenv('HTTP_RESPONSE_CACHE_TTL_SECONDS', '86400')),
+    'MAX_BYTES': int(os.getenv('HTTP_RESPONSE_CACHE_MAX_BYTES', str(256 * 1024 * 1024))),
+}
+
+# Web Search Tool Cache Configuration
+# In-process LRU+TTL cache shared by the duckduckgo_search and brave_search agent tools
+WEB_SEARCH_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('WEB_SEARCH_CACHE_MAX_ENTRIES', '512')),
+    'TTL_SECONDS': int(os.getenv('WEB_SEARCH_CACHE_TTL_SECONDS', '900')),
+    'DB_PATH': None,
+}
+# Concurrent tool calls when an agent batches independent calls (e.g. duckduckgo_multi_search)
+AGENT_TOOL_CONCURRENCY = int(os.getenv('AGENT_TOOL_CONCURRENCY', '4'))
+
+# LLM Gateway Configuration
+# Pooled async clients for OpenAI, Groq, Anthropic and Gemini calls (per-provider limits come from LLM_PROVIDER_CONCURRENCY)
+LLM_GATEWAY = {
+    'TIMEOUT': float(os.getenv('LLM_GATEWAY_TIMEOUT', '60')),
+    'CONNECT_TIMEOUT': float(os.getenv('LLM_GATEWAY_CONNECT_TIMEOUT', '10')),
+    'MAX_RETRIES': int(os.getenv('LLM_GATEWAY_MAX_RETRIES', '2')),
+    'BACKOFF_BASE': float(os.getenv('LLM_GATEWAY_BACKOFF_BASE', '0.5')),
+    'BACKOFF_MAX': float(os.getenv('LLM_GATEWAY_BACKOFF_MAX', '8')),
+    'MAX_CONNECTIONS': int(os.getenv('LLM_GATEWAY_MAX_CONNECTIONS', '20')),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.getenv('LLM_GATEWAY_MAX_KEEPALIVE_CONNECTIONS', '10')),
+}
+# Exact-match LLM response cache, used by AI nodes with `cacheResponses` enabled
+# (persistent tier shares WORKFLOW_CACHE's DB_PATH; MAX_DB_ENTRIES bounds it by row count)
+LLM_RESPONSE_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('LLM_RESPONSE_CACHE_MAX_ENTRIES', '1024')),
+    'MAX_DB_ENTRIES': int(os.getenv('LLM_RESPONSE_CACHE_MAX_DB_ENTRIES', '20000')),
+    'TTL_SECONDS': int(os.getenv('LLM_RESPONSE_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+}
+
+# Semantic Cache Configuration
+# Opt-in cache answering near-identical stand-alone ai_chat questions from earlier responses
+# (embedding search uses NumPy over a memory-mapped matrix when NumPy is installed)
+SEMANTIC_CACHE = {
+    'ENABLED': os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true',
+    'DIR': os.getenv('SEMANTIC_CACHE_DIR') or str(BASE_DIR / 'semantic_cache'),
+    'DIM': int(os.getenv('SEMANTIC_CACHE_DIM', '512')),
+    'MAX_ENTRIES': int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '5000')),
+    'THRESHOLD': float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9')),
+    'TTL_SECONDS': int(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+}
+
+# Agent Memory Configuration
+# Database-backed conversation memory (agent-flow-db-memory nodes)
+AGENT_MEMORY = {
+    'DB_WORKERS': int(os.getenv('AGENT_MEMORY_DB_WORKERS', '4')),
+    'DB_TIMEOUT': float(os.getenv('AGENT_MEMORY_DB_TIMEOUT', '5')),
+    # Conversations are keyed per chat user/channel and spread over independently locked shards
+    'SHARDS': int(os.getenv('AGENT_MEMORY_SHARDS', '16')),
+    # Bounded in-process store for window-buffer conversations; evicted ones spill to the database
+    'STORE_MAX_ENTRIES': int(os.getenv('AGENT_MEMORY_STORE_MAX_ENTRIES', '1000')),
+    'STORE_MAX_BYTES': int(os.getenv('AGENT_MEMORY_STORE_MAX_BYTES', str(64 * 1024 * 1024))),
+    'STORE_TTL_SECONDS': int(os.getenv('AGENT_MEMORY_STORE_TTL_SECONDS', '3600')),
+    'STORE_SPILL': os.getenv('AGENT_MEMORY_STORE_SPILL', 'true').lower() == 'true',
+}
+
+# Agent Context Configuration
+# Token budget for the conversation history an AI Agent sends with each prompt
+AGENT_CONTEXT = {
+    'MAX_HISTORY_TOKENS': int(os.getenv('AGENT_CONTEXT_MAX_HISTORY_TOKENS', '4000')),
+    'RESERVED_TOKENS': int(os.getenv('AGENT_CONTEXT_RESERVED_TOKENS', '512')),
+    'MIN_TRUNCATED_TOKENS': int(os.getenv('AGENT_CONTEXT_MIN_TRUNCATED_TOKENS', '32')),
+    'CONTEXT_WINDOWS': {},
+}
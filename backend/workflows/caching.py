@@ -0,0 +1,335 @@
+"""
+Tiered Result Cache
+In-process LRU backed by an optional SQLite file, with TTL and size caps
+"""
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SETTINGS = {
+    'MAX_ENTRIES': 1024,  # Entries kept in the in-process LRU tier
+    'MAX_DB_ENTRIES': 10000,  # Rows kept in the SQLite tier (None disables the cap)
+    'MAX_BYTES': None,  # JSON-encoded bytes kept in each tier (None disables the cap)
+    'TTL_SECONDS': 3600,  # Default time-to-live (None never expires)
+    'DB_PATH': None,  # SQLite file for the persistent tier (None keeps the cache in memory only)
+}
+
+# Writes between checks of the SQLite tier's caps; a check also runs once
+# 1/DB_TRIM_BYTES_DIVISOR of max_bytes has been written since the last one
+DB_TRIM_INTERVAL = 64
+DB_TRIM_BYTES_DIVISOR = 16
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Stable sha256 of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier key/value cache.
+
+    Values live in an LRU dict first and in a SQLite table second, so they
+    survive process restarts and are shared by worker processes on one host.
+    Values that cannot be JSON-encoded are kept in memory only.
+
+    With max_bytes set, each tier also evicts least recently used entries
+    once their JSON-encoded size exceeds it, and larger values are not cached.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = DEFAULT_CACHE_SETTINGS['MAX_ENTRIES'],
+        ttl_seconds: Optional[float] = DEFAULT_CACHE_SETTINGS['TTL_SECONDS'],
+        db_path: Optional[str] = None,
+        max_db_entries: Optional[int] = DEFAULT_CACHE_SETTINGS['MAX_DB_ENTRIES'],
+        max_bytes: Optional[int] = DEFAULT_CACHE_SETTINGS['MAX_BYTES']
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = str(db_path) if db_path else None
+        self.max_db_entries = max_db_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (value, expires_at or None, encoded size)
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._db_local = threading.local()
+        self._db_ready = False
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self._db_writes = 0
+        self._db_written_bytes = 0
+
+    # ==================== SQLite tier ====================
+
+    @property
+    def _table(self) -> str:
+        return 'cache_' + ''.join(c if c.isalnum() else '_' for c in self.namespace)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Get this thread's connection to the persistent tier"""
+        if not self.db_path:
+            return None
+
+        connection = getattr(self._db_local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._db_local.connection = connection
+
+        if not self._db_ready:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {self._table} ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL, '
+                'size INTEGER NOT NULL DEFAULT 0)'
+            )
+            columns = {row[1] for row in connection.execute(f'PRAGMA table_info({self._table})')}
+            if 'size' not in columns:
+                # Tables created before the byte cap
+                connection.execute(f'ALTER TABLE {self._table} ADD COLUMN size INTEGER NOT NULL DEFAULT 0')
+                connection.execute(f'UPDATE {self._table} SET size = LENGTH(value)')
+            # Covers LRU ordering and byte totals without reading the values
+            connection.execute(f'DROP INDEX IF EXISTS {self._table}_accessed')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {self._table}_lru ON {self._table} (accessed_at, size)')
+            self._db_ready = True
+        return connection
+
+    def _db_get(self, key: str):
+        try:
+            connection = self._connection()
+            if connection is None:
+                return None
+            row = connection.execute(
+                f'SELECT value, expires_at FROM {self._table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < time.time():
+                connection.execute(f'DELETE FROM {self._table} WHERE key = ?', (key,))
+                return None
+            connection.execute(f'UPDATE {self._table} SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            return (json.loads(row[0]), row[1], len(row[0]))
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Cache '{self.namespace}' read failed: {str(e)}")
+            return None
+
+    def _db_set(self, key: str, encoded: str, expires_at: Optional[float]):
+        try:
+            connection = self._connection()
+            if connection is None:
+                return
+            connection.execute(
+                f'INSERT OR REPLACE INTO {self._table} (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)',
+                (key, encoded, expires_at, time.time(), len(encoded))
+            )
+            if (self.max_db_entries or self.max_bytes) and self._db_trim_due(len(encoded)):
+                self._db_trim(connection)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' write failed: {str(e)}")
+
+    def _db_trim_due(self, size: int) -> bool:
+        """Whether enough was written since the last check of the caps"""
+        with self._lock:
+            self._db_writes += 1
+            self._db_written_bytes += size
+            interval = min(DB_TRIM_INTERVAL, self.max_db_entries) if self.max_db_entries else DB_TRIM_INTERVAL
+            if self._db_writes < interval and not (
+                self.max_bytes and self._db_written_bytes * DB_TRIM_BYTES_DIVISOR >= self.max_bytes
+            ):
+                return False
+            self._db_writes = 0
+            self._db_written_bytes = 0
+            return True
+
+    def _db_trim(self, connection: sqlite3.Connection):
+        """
+        Delete the least recently used rows above MAX_DB_ENTRIES and MAX_BYTES.
+
+        Runs every DB_TRIM_INTERVAL writes (or 1/DB_TRIM_BYTES_DIVISOR of
+        MAX_BYTES), so the table may briefly exceed the caps by that much; the
+        oldest rows and the byte total are read from the (accessed_at, size)
+        index instead of sorting the table or reading the values.
+        """
+        if self.max_db_entries:
+            count = connection.execute(f'SELECT COUNT(*) FROM {self._table}').fetchone()[0]
+            excess = count - self.max_db_entries
+            if excess > 0:
+                connection.execute(
+                    f'DELETE FROM {self._table} WHERE key IN ('
+                    f'SELECT key FROM {self._table} ORDER BY accessed_at LIMIT ?)',
+                    (excess,)
+                )
+        if self.max_bytes:
+            total = connection.execute(f'SELECT COALESCE(SUM(size), 0) FROM {self._table}').fetchone()[0]
+            if total > self.max_bytes:
+                # Keep the most recently used rows that fit in max_bytes
+                connection.execute(
+                    f'DELETE FROM {self._table} WHERE rowid IN ('
+                    f'SELECT id FROM (SELECT rowid AS id, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS kept '
+                    f'FROM {self._table}) WHERE kept > ?)',
+                    (self.max_bytes,)
+                )
+
+    # ==================== Public API ====================
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a cached value, or default on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._discard(key)
+
+        entry = self._db_get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return default
+            self.db_hits += 1
+            self._store(key, *entry)
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Cache a value; ttl_seconds overrides the default TTL"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + float(ttl) if ttl else None
+
+        encoded = None
+        if self.db_path or self.max_bytes:
+            try:
+                encoded = json.dumps(value)
+            except (TypeError, ValueError):
+                pass
+        size = len(encoded) if encoded is not None else 0
+
+        if self.max_bytes and size > self.max_bytes:
+            # Too large to cache; drop any older value of the key
+            self.delete(key)
+            return
+
+        with self._lock:
+            self.sets += 1
+            self._store(key, value, expires_at, size)
+
+        if self.db_path and encoded is not None:
+            self._db_set(key, encoded, expires_at)
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float], size: int):
+        """Insert into the LRU tier; caller holds the lock"""
+        self._discard(key)
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted[2]
+            self.evictions += 1
+
+    def _discard(self, key: str):
+        """Remove a key from the LRU tier; caller holds the lock"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def delete(self, key: str):
+        """Remove a key from both tiers"""
+        with self._lock:
+            self._discard(key)
+        try:
+            connection = self._connection()
+            if connection is not None:
+                connection.execute(f'DELETE FROM {self._table} WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' delete failed: {str(e)}")
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        try:
+            connection = self._connection()
+            if connection is not None:
+                connection.execute(f'DELETE FROM {self._table}')
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.namespace}' clear failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'persistent': bool(self.db_path),
+                'hits': self.hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'sets': self.sets,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.db_hits) / lookups if lookups else 0.0,
+            }
+
+
+_caches: Dict[str, TieredCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace: str, setting_name: Optional[str] = None) -> TieredCache:
+    """
+    Get the process-wide cache of a namespace.
+
+    Configuration comes from WORKFLOW_CACHE, overridden by the optional
+    per-namespace setting dict (e.g. WORKFLOW_NODE_CACHE).
+    """
+    cache = _caches.get(namespace)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(namespace)
+            if cache is None:
+                from django.conf import settings
+
+                config = {
+                    **DEFAULT_CACHE_SETTINGS,
+                    **getattr(settings, 'WORKFLOW_CACHE', {}),
+                    **(getattr(settings, setting_name, {}) if setting_name else {})
+                }
+                cache = TieredCache(
+                    namespace,
+                    max_entries=config['MAX_ENTRIES'],
+                    ttl_seconds=config['TTL_SECONDS'],
+                    db_path=config['DB_PATH'],
+                    max_db_entries=config['MAX_DB_ENTRIES'],
+                    max_bytes=config['MAX_BYTES']
+                )
+                _caches[namespace] = cache
+    return cache
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get statistics of every cache created so far"""
+    return {namespace: cache.stats() for namespace, cache in list(_caches.items())}
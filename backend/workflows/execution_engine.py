@@ -3,24 +3,33 @@ Workflow Execution Engine
 Orchestrates the execution of workflow nodes in the correct order
 """
 from typing import Dict, Any, List, Optional, Set
+from collections import deque
 import asyncio
+import copy
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
-from .node_executors import (
-    BaseNodeExecutor,
-    AINodeExecutor,
-    TriggerNodeExecutor,
-    FlowNodeExecutor,
-    DataNodeExecutor,
-    ActionNodeExecutor,
-    OutputNodeExecutor
-)
-from .node_executors.ai_nodes import ChatModelExecutor, MemoryExecutor, ToolExecutor
+from django.conf import settings
+from .node_executors import BaseNodeExecutor
+from .node_executors.base import NodeExecutionError
+from .execution_plan import CompiledWorkflow, TRIGGER_NODE_TYPES, get_compiled_workflow, get_executor_class
+from .caching import get_cache, make_cache_key
+from .execution_registry import ExecutionRegistry, create_execution_registry
 
 logger = logging.getLogger(__name__)
 
-# Global memory storage for persistent memory across executions
-_global_memory_storage = {}
+# Default number of nodes allowed to run at the same time within one execution
+DEFAULT_MAX_CONCURRENT_NODES = 8
+
+# Default wall-clock limit for a whole execution, in seconds
+DEFAULT_EXECUTION_TIMEOUT = 1800
+
+
+class ExecutionDeadlineExceeded(Exception):
+    """Raised when an execution runs past its deadline"""
+    pass
 
 
 class ExecutionContext:
@@ -33,6 +42,15 @@ class ExecutionContext:
         self.node_states: Dict[str, Dict[str, Any]] = {}
         self.execution_order: List[str] = []
         self.errors: Dict[str, str] = {}
+        self.skipped_nodes: Set[str] = set()
+        # Node states of an earlier execution whose outputs may be reused
+        self.previous_node_states: Dict[str, Any] = {}
+        self.reusable_nodes: Set[str] = set()
+        # Epoch seconds after which no node may keep running (None for no limit)
+        self.deadline: Optional[float] = None
+        self.cancel_requested = False
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.start_time = datetime.now()
         self.end_time: Optional[datetime] = None
         self.status = 'running'
@@ -40,6 +58,75 @@ class ExecutionContext:
         self.credentials: Dict[str, Any] = {}
         self.chat_response: Optional[str] = None
         self.persistent_memory: Dict[str, Any] = {}  # Store persistent memory instances
+        self._subscribers: List[Any] = []  # Live event stream listeners (objects with put())
+        self._subscribers_lock = threading.Lock()
+    
+    def subscribe(self, events=None):
+        """
+        Register a listener for node state change events.
+
+        events is any object with a thread-safe put(event) (a new queue.Queue
+        by default); it is returned for unsubscribe().
+        """
+        if events is None:
+            events = queue.Queue()
+        with self._subscribers_lock:
+            self._subscribers.append(events)
+        return events
+    
+    def unsubscribe(self, events):
+        """Remove a listener registered with subscribe()"""
+        with self._subscribers_lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+    
+    def _emit(self, event: Dict[str, Any]):
+        """Push an event to every listener"""
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            events.put(event)
+    
+    def _node_event(self, node_id: str) -> Dict[str, Any]:
+        """Small per-node delta event (no inputs or outputs)"""
+        node_state = self.node_states.get(node_id, {})
+        event = {
+            'type': 'node',
+            'execution_id': self.execution_id,
+            'node_id': node_id,
+            'status': node_state.get('status'),
+            'timestamp': node_state.get('timestamp'),
+        }
+        if node_state.get('status') != 'running':
+            event['duration_ms'] = self.get_node_duration(node_id)
+        if 'error' in node_state:
+            event['error'] = node_state['error']
+        return event
+    
+    def summary_event(self) -> Dict[str, Any]:
+        """Final event sent when the execution finishes"""
+        duration = None
+        if self.end_time and self.start_time:
+            duration = (self.end_time - self.start_time).total_seconds()
+        
+        return {
+            'type': 'summary',
+            'execution_id': self.execution_id,
+            'status': self.status,
+            'duration': duration,
+            'execution_order': self.execution_order,
+            'errors': self.errors,
+            'chat_response': self.chat_response
+        }
+    
+    def snapshot_event(self) -> Dict[str, Any]:
+        """Current status of every node, sent to listeners when they connect"""
+        return {
+            'type': 'snapshot',
+            'execution_id': self.execution_id,
+            'status': self.status,
+            'nodes': {node_id: node_state.get('status') for node_id, node_state in list(self.node_states.items())}
+        }
     
     def set_node_state(self, node_id: str, status: str, **kwargs):
         """Update node execution state"""
@@ -60,6 +147,9 @@ class ExecutionContext:
         # If this is the first time we're setting this node, record start time
         if 'startTime' not in existing_state:
             self.node_states[node_id]['startTime'] = current_time.timestamp() * 1000
+        
+        if self._subscribers:
+            self._emit(self._node_event(node_id))
     
     def set_node_result(self, node_id: str, result: Any):
         """Store node execution result"""
@@ -80,6 +170,18 @@ class ExecutionContext:
         self.errors[node_id] = error
         self.set_node_state(node_id, 'error', error=error)
     
+    def skip_node(self, node_id: str, reason: str = 'unreachable'):
+        """Mark a node as skipped (on a branch that was not taken)"""
+        self.skipped_nodes.add(node_id)
+        self.set_node_state(node_id, 'skipped', reason=reason)
+    
+    def cancel_pending_nodes(self, node_ids: Set[str]):
+        """Mark scheduled nodes that never finished as cancelled"""
+        for node_id in node_ids:
+            status = self.node_states.get(node_id, {}).get('status')
+            if status is None or status == 'running':
+                self.set_node_state(node_id, 'cancelled')
+    
     def get_node_result(self, node_id: str) -> Any:
         """Get result from previously executed node"""
         return self.node_results.get(node_id)
@@ -88,6 +190,9 @@ class ExecutionContext:
         """Mark execution as complete"""
         self.status = status
         self.end_time = datetime.now()
+        
+        if self._subscribers:
+            self._emit(self.summary_event())
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for API response"""
@@ -115,6 +220,7 @@ class ExecutionContext:
             'duration': duration,
             'execution_order': self.execution_order,
             'node_states': enhanced_node_states,
+            'skipped_nodes': sorted(self.skipped_nodes),
             'errors': self.errors,
             'chat_response': self.chat_response
         }
@@ -124,132 +230,49 @@ class WorkflowExecutionEngine:
     """Engine for executing workflows"""
     
     def __init__(self):
-        self.active_executions: Dict[str, ExecutionContext] = {}
+        self.active_executions: ExecutionRegistry = create_execution_registry()
     
-    def _get_node_executor(self, node: Dict[str, Any]) -> BaseNodeExecutor:
+    def _get_node_executor(self, node: Dict[str, Any], plan: Optional[CompiledWorkflow] = None) -> BaseNodeExecutor:
         """Get appropriate executor for node type"""
         node_id = node['id']
         node_type = node['data']['type']
         node_data = node['data']
         
-        # Determine executor based on node type
-        executor_class = None
-        
-        # Trigger nodes
-        if node_type in ['when-chat-received', 'webhook', 'schedule', 'manual-trigger']:
-            executor_class = TriggerNodeExecutor
-        
-        # AI nodes
-        elif node_type in ['ai-agent', 'openai', 'anthropic', 'google-gemini', 'groq-llama', 'groq-gemma',
-                          'question-answer-chain', 'summarization-chain', 
-                          'information-extractor', 'text-classifier', 'sentiment-analysis']:
-            executor_class = AINodeExecutor
-        
-        # Chat model nodes
-        elif node_type in ['gpt-4-turbo', 'gpt-3.5-turbo', 'claude-3-opus', 'claude-3-sonnet']:
-            executor_class = ChatModelExecutor
-        
-        # Memory nodes
-        elif node_type in ['simple-memory', 'vector-memory', 'window-buffer-memory', 'agent-flow-db-memory']:
-            executor_class = MemoryExecutor
-        
-        # Tool nodes
-        elif node_type in ['calculator', 'web-search', 'duckduckgo-search', 'api-caller']:
-            executor_class = ToolExecutor
-        
-        # Flow control nodes
-        elif node_type in ['if-else', 'switch', 'merge']:
-            executor_class = FlowNodeExecutor
-        
-        # Data transformation nodes
-        elif node_type in ['filter', 'edit-fields', 'code']:
-            executor_class = DataNodeExecutor
-        
-        # Action nodes
-        elif node_type in ['http-request', 'google-sheets']:
-            executor_class = ActionNodeExecutor
-        
-        # Output nodes
-        elif node_type in ['respond-to-chat', 'readme-viewer']:
-            executor_class = OutputNodeExecutor
-        
-        else:
-            raise ValueError(f"Unknown node type: {node_type}")
+        # Use the executor class resolved at compile time when available
+        executor_class = plan.executor_classes.get(node_id) if plan else None
+        if executor_class is None:
+            executor_class = get_executor_class(node_type)
         
         return executor_class(node_id, node_type, node_data)
     
-    def _build_execution_graph(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> Dict[str, List[str]]:
-        """Build adjacency list of node dependencies"""
-        graph = {node['id']: [] for node in nodes}
-        
-        for edge in edges:
-            source = edge['source']
-            target = edge['target']
-            graph[target].append(source)
-        
-        return graph
-    
-    def _topological_sort(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> List[str]:
-        """Get execution order using topological sort"""
-        # Build adjacency lists
-        in_degree = {node['id']: 0 for node in nodes}
-        adjacency = {node['id']: [] for node in nodes}
-        
-        for edge in edges:
-            source = edge['source']
-            target = edge['target']
-            adjacency[source].append(target)
-            in_degree[target] += 1
-        
-        # Find nodes with no dependencies (triggers and standalone nodes)
-        queue = [node_id for node_id, degree in in_degree.items() if degree == 0]
-        execution_order = []
-        
-        while queue:
-            current = queue.pop(0)
-            execution_order.append(current)
-            
-            # Reduce in-degree for connected nodes
-            for neighbor in adjacency[current]:
-                in_degree[neighbor] -= 1
-                if in_degree[neighbor] == 0:
-                    queue.append(neighbor)
-        
-        # Check for cycles
-        if len(execution_order) != len(nodes):
-            raise ValueError("Workflow contains cycles or unreachable nodes")
-        
-        return execution_order
-    
-    def _get_node_inputs(self, node_id: str, edges: List[Dict[str, Any]], context: ExecutionContext) -> Dict[str, Any]:
+    def _get_node_inputs(self, node_id: str, plan: CompiledWorkflow, context: ExecutionContext) -> Dict[str, Any]:
         """Collect inputs for a node from its predecessors"""
         inputs = {}
         
-        for edge in edges:
-            if edge['target'] == node_id:
-                source_id = edge['source']
-                source_output = edge.get('sourceHandle', 'main')
-                target_input = edge.get('targetHandle', 'main')
-                
-                # Get result from source node
-                source_result = context.get_node_result(source_id)
+        for edge in plan.incoming_edges.get(node_id, []):
+            source_id = edge['source']
+            source_output = edge.get('sourceHandle', 'main')
+            target_input = edge.get('targetHandle', 'main')
+            
+            # Get result from source node
+            source_result = context.get_node_result(source_id)
+            
+            if source_result:
+                # Extract the specific output handle
+                if isinstance(source_result, dict) and source_output in source_result:
+                    output_data = source_result[source_output]
+                else:
+                    output_data = source_result
                 
-                if source_result:
-                    # Extract the specific output handle
-                    if isinstance(source_result, dict) and source_output in source_result:
-                        output_data = source_result[source_output]
-                    else:
-                        output_data = source_result
-                    
-                    # Store in inputs under the target handle name
-                    inputs[target_input] = output_data
+                # Store in inputs under the target handle name
+                inputs[target_input] = output_data
         
         return inputs
     
     async def execute_node(
         self, 
         node: Dict[str, Any], 
-        edges: List[Dict[str, Any]], 
+        plan: CompiledWorkflow, 
         context: ExecutionContext
     ) -> Dict[str, Any]:
         """Execute a single node"""
@@ -261,14 +284,14 @@ class WorkflowExecutionEngine:
             context.set_node_state(node_id, 'running')
             
             # Get inputs from connected nodes
-            inputs = self._get_node_inputs(node_id, edges, context)
+            inputs = self._get_node_inputs(node_id, plan, context)
             
             # Get node executor
-            executor = self._get_node_executor(node)
+            executor = self._get_node_executor(node, plan)
             
             # Debug logging for node data
-            logger.info(f"Node data for {node_id}: {node}")
-            logger.info(f"Node properties: {node.get('data', {}).get('properties', {})}")
+            logger.debug(f"Node data for {node_id}: {node}")
+            logger.debug(f"Node properties: {node.get('data', {}).get('properties', {})}")
             
             # Build execution context dict
             exec_context = {
@@ -279,16 +302,43 @@ class WorkflowExecutionEngine:
                 'anthropic_api_key': context.credentials.get('anthropic_api_key'),
                 'google_api_key': context.credentials.get('google_api_key'),
                 'groq_api_key': context.credentials.get('groq_api_key'),
+                'deadline': context.deadline,
             }
             
-            logger.info(f"Executing node {node_id} ({node_type})")
+            # Identifies this node's definition and inputs across executions
+            fingerprint = self._node_fingerprint(node, inputs, context)
+            state = {'input': inputs, 'fingerprint': fingerprint}
+            result = None
+            
+            # Reuse the previous execution's output when nothing upstream changed
+            if node_id in context.reusable_nodes:
+                previous = context.previous_node_states.get(node_id) or {}
+                if previous.get('status') == 'completed' and previous.get('fingerprint') == fingerprint and 'output' in previous:
+                    result = previous['output']
+                    state['reused'] = True
+            
+            # Serve deterministic nodes from the result cache when they opted in
+            if result is None and node_id in plan.cacheable_nodes:
+                node_cache = get_cache('node_results', 'WORKFLOW_NODE_CACHE')
+                cached = node_cache.get(fingerprint)
+                state['cache'] = {'hit': cached is not None, 'key': fingerprint}
+                # Copy so downstream nodes cannot mutate the cached value
+                result = copy.deepcopy(cached)
             
-            # Execute node
-            result = await executor.execute(inputs, exec_context)
+            if result is not None:
+                logger.info(f"Node {node_id} ({node_type}) {'reused from previous execution' if state.get('reused') else 'served from result cache'}")
+            else:
+                logger.info(f"Executing node {node_id} ({node_type})")
+                
+                # Execute node within its timeout and the execution deadline
+                result = await self._run_with_timeout(executor.execute(inputs, exec_context), node_id, plan, context)
+                
+                if 'cache' in state:
+                    node_cache.set(fingerprint, copy.deepcopy(result), node['data'].get('properties', {}).get('cacheTtl'))
             
             # Store result
             context.set_node_result(node_id, result)
-            context.set_node_state(node_id, 'completed', output=result, input=inputs)
+            context.set_node_state(node_id, 'completed', output=result, **state)
             context.execution_order.append(node_id)
             
             # Check for chat response
@@ -305,6 +355,37 @@ class WorkflowExecutionEngine:
             context.set_node_error(node_id, error_msg)
             raise
     
+    async def _run_with_timeout(self, coroutine, node_id: str, plan: CompiledWorkflow, context: ExecutionContext):
+        """Await a node's coroutine, bounded by its timeout and the execution deadline"""
+        timeout = plan.node_timeouts.get(node_id)
+        deadline_bound = False
+        if context.deadline is not None:
+            remaining = context.deadline - time.time()
+            if remaining <= 0:
+                coroutine.close()
+                raise ExecutionDeadlineExceeded("Execution deadline exceeded")
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+                deadline_bound = True
+        
+        if timeout is None:
+            return await coroutine
+        
+        try:
+            return await asyncio.wait_for(coroutine, timeout)
+        except asyncio.TimeoutError:
+            if deadline_bound:
+                raise ExecutionDeadlineExceeded("Execution deadline exceeded")
+            raise NodeExecutionError(f"Node {node_id} timed out after {timeout:g}s")
+    
+    def _node_fingerprint(self, node: Dict[str, Any], inputs: Dict[str, Any], context: ExecutionContext) -> str:
+        """Hash of a node's type, properties and resolved inputs (plus trigger data for triggers)"""
+        node_type = node['data']['type']
+        properties = node['data'].get('properties', {})
+        if node_type in TRIGGER_NODE_TYPES:
+            return make_cache_key(node_type, properties, inputs, context.trigger_data)
+        return make_cache_key(node_type, properties, inputs)
+    
     async def execute_workflow(
         self, 
         workflow_id: str,
@@ -313,109 +394,226 @@ class WorkflowExecutionEngine:
         edges: List[Dict[str, Any]],
         trigger_data: Optional[Dict[str, Any]] = None,
         credentials: Optional[Dict[str, Any]] = None,
-        start_node_id: Optional[str] = None
+        start_node_id: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        version: Optional[str] = None,
+        previous_node_states: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
     ) -> ExecutionContext:
-        """Execute entire workflow or from a specific node"""
+        """
+        Execute entire workflow or from a specific node
+        
+        When executing from a node, upstream nodes whose fingerprint matches
+        their entry in previous_node_states reuse that output instead of running.
+        
+        The execution is bounded by ``timeout`` seconds (WORKFLOW_EXECUTION_TIMEOUT
+        by default) and can be stopped with cancel_execution().
+        """
         
         # Create execution context
         context = ExecutionContext(workflow_id, execution_id)
         context.trigger_data = trigger_data or {}
         context.credentials = credentials or {}
+        context.previous_node_states = previous_node_states or {}
+        context._task = asyncio.current_task()
+        context._loop = asyncio.get_running_loop()
+        
+        if timeout is None:
+            timeout = getattr(settings, 'WORKFLOW_EXECUTION_TIMEOUT', DEFAULT_EXECUTION_TIMEOUT)
+        if timeout:
+            context.deadline = time.time() + timeout
         
         self.active_executions[execution_id] = context
         
+        if not max_concurrency:
+            max_concurrency = getattr(settings, 'WORKFLOW_MAX_CONCURRENT_NODES', DEFAULT_MAX_CONCURRENT_NODES)
+        
         try:
+            # Reuse the compiled plan of this workflow version
+            plan = get_compiled_workflow(workflow_id, nodes, edges, version)
+            
             if start_node_id:
                 # Execute single node and its dependencies
-                await self._execute_from_node(start_node_id, nodes, edges, context)
+                await self._execute_from_node(start_node_id, plan, context, max_concurrency)
             else:
-                # Execute entire workflow
-                execution_order = self._topological_sort(nodes, edges)
+                # Validate the graph before anything runs
+                if not plan.is_acyclic:
+                    raise ValueError("Workflow contains cycles or unreachable nodes")
                 
-                for node_id in execution_order:
-                    node = next(n for n in nodes if n['id'] == node_id)
-                    await self.execute_node(node, edges, context)
+                # Execute entire workflow
+                node_ids = self._apply_folded_nodes(plan, set(plan.node_index), context)
+                await self._run_scheduled(plan, node_ids, context, max_concurrency)
             
             context.complete('completed')
             
+        except asyncio.CancelledError:
+            if not context.cancel_requested:
+                raise
+            # Cancelled through cancel_execution(); finish normally as stopped
+            if hasattr(context._task, 'uncancel'):
+                context._task.uncancel()
+            logger.info(f"Workflow execution {execution_id} cancelled")
+            context.complete('stopped')
+            
         except Exception as e:
             logger.error(f"Workflow execution failed: {str(e)}")
             context.complete('error')
         
+        finally:
+            # Finished contexts become evictable
+            self.active_executions.mark_completed(execution_id)
+        
         return context
     
     async def _execute_from_node(
         self,
         start_node_id: str,
-        nodes: List[Dict[str, Any]],
-        edges: List[Dict[str, Any]],
-        context: ExecutionContext
+        plan: CompiledWorkflow,
+        context: ExecutionContext,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENT_NODES
     ):
         """Execute workflow starting from a specific node"""
         # Find all nodes that need to be executed (dependencies + target + downstream)
-        nodes_to_execute = self._get_execution_subgraph(start_node_id, nodes, edges)
+        nodes_to_execute = plan.get_execution_subgraph(start_node_id)
+        
+        # Validate the subgraph before anything runs
+        if not plan.is_subgraph_acyclic(nodes_to_execute):
+            raise ValueError("Workflow contains cycles or unreachable nodes")
+        
+        # Only upstream nodes may reuse earlier outputs; the target and downstream always run
+        if context.previous_node_states:
+            context.reusable_nodes = plan.get_dependencies(start_node_id)
         
-        # Execute in topological order
-        execution_order = self._topological_sort(
-            [n for n in nodes if n['id'] in nodes_to_execute],
-            [e for e in edges if e['source'] in nodes_to_execute and e['target'] in nodes_to_execute]
-        )
+        nodes_to_execute = self._apply_folded_nodes(plan, nodes_to_execute, context)
+        await self._run_scheduled(plan, nodes_to_execute, context, max_concurrency)
+    
+    def _apply_folded_nodes(self, plan: CompiledWorkflow, node_ids: Set[str], context: ExecutionContext) -> Set[str]:
+        """
+        Inject the compile-time outputs of static configuration nodes and
+        return the nodes that still need to be scheduled.
+        
+        Folded nodes are reported as completed with cached=True.
+        """
+        folded = [node_id for node_id in plan.topological_order if node_id in node_ids and node_id in plan.folded_results]
+        for node_id in folded:
+            # Copy so consumers cannot mutate the plan's shared result
+            result = copy.deepcopy(plan.folded_results[node_id])
+            context.set_node_result(node_id, result)
+            context.set_node_state(node_id, 'completed', output=result, input={}, cached=True, folded=True)
+            context.execution_order.append(node_id)
         
-        for node_id in execution_order:
-            node = next(n for n in nodes if n['id'] == node_id)
-            await self.execute_node(node, edges, context)
+        return node_ids - set(folded)
     
-    def _get_execution_subgraph(
+    async def _run_scheduled(
         self,
-        node_id: str,
-        nodes: List[Dict[str, Any]],
-        edges: List[Dict[str, Any]]
-    ) -> Set[str]:
-        """Get all nodes that should be executed when executing from a specific node"""
-        # Get dependencies (upstream nodes)
-        dependencies = self._get_dependencies(node_id, edges)
+        plan: CompiledWorkflow,
+        node_ids: Set[str],
+        context: ExecutionContext,
+        max_concurrency: int
+    ):
+        """
+        Run nodes as soon as all of their predecessors have finished.
+        
+        Every ready node is launched as its own asyncio task, with at most
+        ``max_concurrency`` nodes in flight. Ready nodes whose data inputs all
+        come from branches that were not taken are skipped instead of run.
+        The first failing node cancels the remaining tasks and its exception
+        is re-raised.
+        """
+        in_degree = {
+            node_id: sum(1 for edge in plan.incoming_edges[node_id] if edge['source'] in node_ids)
+            for node_id in node_ids
+        }
         
-        # Get downstream nodes
-        downstream = self._get_downstream(node_id, edges)
+        # Keep the compiled order for nodes that become ready together
+        ready = deque(node_id for node_id in plan.topological_order if in_degree.get(node_id) == 0)
+        running: Dict[asyncio.Task, str] = {}
+        limit = max(1, int(max_concurrency))
         
-        # Combine all
-        result = dependencies | {node_id} | downstream
+        def release(finished_node_id: str):
+            for edge in plan.outgoing_edges[finished_node_id]:
+                successor = edge['target']
+                if successor in in_degree:
+                    in_degree[successor] -= 1
+                    if in_degree[successor] == 0:
+                        ready.append(successor)
         
-        return result
+        try:
+            while ready or running:
+                while ready and len(running) < limit:
+                    node_id = ready.popleft()
+                    
+                    # Dead branch: skip without running (skips propagate downstream)
+                    if self._is_unreachable(node_id, plan, context):
+                        context.skip_node(node_id)
+                        release(node_id)
+                        continue
+                    
+                    task = asyncio.ensure_future(self.execute_node(plan.node_index[node_id], plan, context))
+                    running[task] = node_id
+                
+                if not running:
+                    continue
+                
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    node_id = running.pop(task)
+                    # Re-raise node failures so the whole execution stops
+                    task.result()
+                    release(node_id)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.keys(), return_exceptions=True)
+            # Nodes that were still running or never started
+            context.cancel_pending_nodes(node_ids)
     
-    def _get_dependencies(self, node_id: str, edges: List[Dict[str, Any]]) -> Set[str]:
-        """Get all upstream dependencies of a node"""
-        dependencies = set()
-        queue = [node_id]
-        
-        while queue:
-            current = queue.pop(0)
-            for edge in edges:
-                if edge['target'] == current and edge['source'] not in dependencies:
-                    dependencies.add(edge['source'])
-                    queue.append(edge['source'])
-        
-        return dependencies
+    def _is_unreachable(self, node_id: str, plan: CompiledWorkflow, context: ExecutionContext) -> bool:
+        """
+        A node is unreachable when it has data inputs and every one of them is
+        dead: the source was skipped, or the source handle carries None (the
+        untaken if-else/switch output, a filtered-out item).
+        
+        Configuration inputs (chat model, memory, tools) do not keep a node alive.
+        """
+        data_edges = plan.data_incoming_edges.get(node_id)
+        if not data_edges:
+            return False
+        
+        for edge in data_edges:
+            source_id = edge['source']
+            if source_id in context.skipped_nodes:
+                continue
+            
+            source_result = context.get_node_result(source_id)
+            source_output = edge.get('sourceHandle', 'main')
+            if isinstance(source_result, dict) and source_output in source_result and source_result[source_output] is None:
+                continue
+            
+            return False
+        
+        return True
     
-    def _get_downstream(self, node_id: str, edges: List[Dict[str, Any]]) -> Set[str]:
-        """Get all downstream nodes"""
-        downstream = set()
-        queue = [node_id]
-        
-        while queue:
-            current = queue.pop(0)
-            for edge in edges:
-                if edge['source'] == current and edge['target'] not in downstream:
-                    downstream.add(edge['target'])
-                    queue.append(edge['target'])
-        
-        return downstream
+    def cancel_execution(self, execution_id: str) -> bool:
+        """
+        Request cancellation of a running execution (safe from any thread).
+        
+        Returns False if the execution is not running in this process.
+        """
+        context = self.active_executions.get(execution_id)
+        if context is None or context.status != 'running' or context._task is None:
+            return False
+        
+        context.cancel_requested = True
+        context._loop.call_soon_threadsafe(context._task.cancel)
+        return True
     
     def get_execution(self, execution_id: str) -> Optional[ExecutionContext]:
-        """Get execution context by ID"""
+        """Get execution context by ID (None once evicted; use the persisted row)"""
         return self.active_executions.get(execution_id)
 
 
 # Global engine instance
 execution_engine = WorkflowExecutionEngine()
-
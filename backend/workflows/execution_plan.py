@@ -0,0 +1,377 @@
+"""
+Compiled Workflow Execution Plans
+Pre-computes graph bookkeeping once per workflow version and caches it
+"""
+from typing import Dict, Any, List, Optional, Set, Type
+from collections import OrderedDict, deque
+import hashlib
+import json
+import logging
+import threading
+from django.conf import settings
+from .node_executors import (
+    BaseNodeExecutor,
+    AINodeExecutor,
+    TriggerNodeExecutor,
+    FlowNodeExecutor,
+    DataNodeExecutor,
+    ActionNodeExecutor,
+    OutputNodeExecutor
+)
+from .node_executors.ai_nodes import ChatModelExecutor, MemoryExecutor, ToolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Default number of compiled workflows kept in the plan cache
+DEFAULT_PLAN_CACHE_SIZE = 128
+
+# Target handles that carry configuration rather than data; a node fed only
+# by dead data branches is skipped even if these are still connected
+CONFIG_INPUT_HANDLES = {'chat-model', 'memory', 'tools'}
+
+# Node types that start a workflow; their output depends on the trigger data
+TRIGGER_NODE_TYPES = {'when-chat-received', 'webhook', 'schedule', 'manual-trigger'}
+
+# Node types whose output depends only on their properties and inputs; their
+# results may be memoized when a node opts in with the `cacheResults` property
+DETERMINISTIC_NODE_TYPES = {
+    'gpt-4-turbo', 'gpt-3.5-turbo', 'claude-3-opus', 'claude-3-sonnet',
+    'simple-memory', 'vector-memory', 'window-buffer-memory', 'agent-flow-db-memory',
+    'calculator', 'web-search', 'duckduckgo-search', 'api-caller',
+    'edit-fields', 'filter', 'code',
+}
+
+# LLM node types that are deterministic only when pinned at temperature 0
+TEMPERATURE_PINNED_NODE_TYPES = {
+    'openai', 'anthropic', 'google-gemini', 'groq-llama', 'groq-gemma',
+    'question-answer-chain', 'summarization-chain',
+    'information-extractor', 'text-classifier', 'sentiment-analysis',
+}
+
+# Executors that only turn node properties into configuration; with no
+# incoming edges their output is folded into the plan at compile time
+CONFIG_EXECUTOR_CLASSES = (ChatModelExecutor, MemoryExecutor, ToolExecutor)
+
+# Default per-node timeouts in seconds, by node type ('default' for the rest);
+# overridden by WORKFLOW_NODE_TIMEOUTS and by a node's own `timeout` property
+DEFAULT_NODE_TIMEOUTS = {
+    'default': 60,
+    'ai-agent': 300,
+    'openai': 180,
+    'anthropic': 180,
+    'google-gemini': 180,
+    'groq-llama': 120,
+    'groq-gemma': 120,
+    'question-answer-chain': 180,
+    'summarization-chain': 180,
+    'information-extractor': 180,
+    'text-classifier': 120,
+    'sentiment-analysis': 120,
+    'http-request': 120,
+    'google-sheets': 120,
+    'code': 30,
+}
+
+# Node type -> executor class
+NODE_EXECUTOR_CLASSES: Dict[str, Type[BaseNodeExecutor]] = {}
+
+# Trigger nodes
+for _node_type in TRIGGER_NODE_TYPES:
+    NODE_EXECUTOR_CLASSES[_node_type] = TriggerNodeExecutor
+
+# AI nodes
+for _node_type in ['ai-agent', 'openai', 'anthropic', 'google-gemini', 'groq-llama', 'groq-gemma',
+                   'question-answer-chain', 'summarization-chain',
+                   'information-extractor', 'text-classifier', 'sentiment-analysis']:
+    NODE_EXECUTOR_CLASSES[_node_type] = AINodeExecutor
+
+# Chat model nodes
+for _node_type in ['gpt-4-turbo', 'gpt-3.5-turbo', 'claude-3-opus', 'claude-3-sonnet']:
+    NODE_EXECUTOR_CLASSES[_node_type] = ChatModelExecutor
+
+# Memory nodes
+for _node_type in ['simple-memory', 'vector-memory', 'window-buffer-memory', 'agent-flow-db-memory']:
+    NODE_EXECUTOR_CLASSES[_node_type] = MemoryExecutor
+
+# Tool nodes
+for _node_type in ['calculator', 'web-search', 'duckduckgo-search', 'api-caller']:
+    NODE_EXECUTOR_CLASSES[_node_type] = ToolExecutor
+
+# Flow control nodes
+for _node_type in ['if-else', 'switch', 'merge']:
+    NODE_EXECUTOR_CLASSES[_node_type] = FlowNodeExecutor
+
+# Data transformation nodes
+for _node_type in ['filter', 'edit-fields', 'code']:
+    NODE_EXECUTOR_CLASSES[_node_type] = DataNodeExecutor
+
+# Action nodes
+for _node_type in ['http-request', 'google-sheets']:
+    NODE_EXECUTOR_CLASSES[_node_type] = ActionNodeExecutor
+
+# Output nodes
+for _node_type in ['respond-to-chat', 'readme-viewer']:
+    NODE_EXECUTOR_CLASSES[_node_type] = OutputNodeExecutor
+
+
+def get_executor_class(node_type: str) -> Type[BaseNodeExecutor]:
+    """Get executor class for a node type"""
+    executor_class = NODE_EXECUTOR_CLASSES.get(node_type)
+    if executor_class is None:
+        raise ValueError(f"Unknown node type: {node_type}")
+    return executor_class
+
+
+def is_node_cacheable(node: Dict[str, Any]) -> bool:
+    """Check whether a node opted into result memoization and is deterministic"""
+    data = node.get('data', {})
+    properties = data.get('properties', {})
+    if not properties.get('cacheResults'):
+        return False
+
+    node_type = data.get('type')
+    if node_type in DETERMINISTIC_NODE_TYPES:
+        return True
+    if node_type in TEMPERATURE_PINNED_NODE_TYPES:
+        try:
+            return float(properties.get('temperature')) == 0
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def get_node_timeout(node: Dict[str, Any]) -> Optional[float]:
+    """Resolve a node's timeout in seconds (None or 0 disables it)"""
+    data = node.get('data', {})
+    timeout = data.get('properties', {}).get('timeout')
+    if timeout in (None, ''):
+        timeouts = {**DEFAULT_NODE_TIMEOUTS, **getattr(settings, 'WORKFLOW_NODE_TIMEOUTS', {})}
+        timeout = timeouts.get(data.get('type'), timeouts['default'])
+
+    try:
+        timeout = float(timeout)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid timeout {timeout!r} on node {node.get('id')}")
+        return None
+    return timeout if timeout > 0 else None
+
+
+def compute_workflow_hash(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> str:
+    """Get a stable content hash for a workflow definition"""
+    payload = json.dumps({'nodes': nodes, 'edges': edges}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CompiledWorkflow:
+    """Immutable, pre-indexed view of a workflow graph"""
+
+    def __init__(self, workflow_id: str, version: str, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        self.workflow_id = workflow_id
+        self.version = version
+        self.nodes = nodes
+        self.edges = edges
+
+        # Node lookups
+        self.node_index: Dict[str, Dict[str, Any]] = {node['id']: node for node in nodes}
+        self.type_index: Dict[str, List[str]] = {}
+        for node in nodes:
+            self.type_index.setdefault(node['data']['type'], []).append(node['id'])
+
+        # Adjacency
+        self.incoming_edges: Dict[str, List[Dict[str, Any]]] = {node_id: [] for node_id in self.node_index}
+        self.outgoing_edges: Dict[str, List[Dict[str, Any]]] = {node_id: [] for node_id in self.node_index}
+        for edge in edges:
+            self.outgoing_edges[edge['source']].append(edge)
+            self.incoming_edges[edge['target']].append(edge)
+        self.data_incoming_edges: Dict[str, List[Dict[str, Any]]] = {
+            node_id: [edge for edge in incoming if edge.get('targetHandle', 'main') not in CONFIG_INPUT_HANDLES]
+            for node_id, incoming in self.incoming_edges.items()
+        }
+
+        # Executor class per node (None for unknown types, which fail when executed)
+        self.executor_classes: Dict[str, Optional[Type[BaseNodeExecutor]]] = {
+            node_id: NODE_EXECUTOR_CLASSES.get(node['data']['type'])
+            for node_id, node in self.node_index.items()
+        }
+
+        # Per-node timeouts in seconds (None means no limit)
+        self.node_timeouts: Dict[str, Optional[float]] = {
+            node_id: get_node_timeout(node) for node_id, node in self.node_index.items()
+        }
+
+        # Nodes whose results may be served from the node result cache
+        self.cacheable_nodes: Set[str] = {
+            node_id for node_id, node in self.node_index.items() if is_node_cacheable(node)
+        }
+
+        self.topological_order = self._topological_sort()
+        self.is_acyclic = len(self.topological_order) == len(nodes)
+
+        # Outputs of static configuration nodes, evaluated once per workflow version
+        self.folded_results: Dict[str, Dict[str, Any]] = self._fold_config_nodes()
+
+    def _fold_config_nodes(self) -> Dict[str, Dict[str, Any]]:
+        """Evaluate configuration nodes that have no inputs"""
+        folded = {}
+        for node_id, executor_class in self.executor_classes.items():
+            if executor_class not in CONFIG_EXECUTOR_CLASSES or self.incoming_edges[node_id]:
+                continue
+
+            node = self.node_index[node_id]
+            try:
+                folded[node_id] = executor_class(node_id, node['data']['type'], node['data']).build_config()
+            except Exception as e:
+                # Leave it to the scheduler, which reports the error as usual
+                logger.debug(f"Could not fold configuration node {node_id}: {str(e)}")
+        return folded
+
+    def _topological_sort(self) -> List[str]:
+        """Kahn's algorithm over the whole graph"""
+        in_degree = {node_id: len(incoming) for node_id, incoming in self.incoming_edges.items()}
+        queue = deque(node_id for node_id, degree in in_degree.items() if degree == 0)
+        order = []
+
+        while queue:
+            current = queue.popleft()
+            order.append(current)
+            for edge in self.outgoing_edges[current]:
+                in_degree[edge['target']] -= 1
+                if in_degree[edge['target']] == 0:
+                    queue.append(edge['target'])
+
+        return order
+
+    def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """Get node definition by ID"""
+        return self.node_index.get(node_id)
+
+    def find_node_by_type(self, node_type: str) -> Optional[Dict[str, Any]]:
+        """Get the first node of the given type"""
+        node_ids = self.type_index.get(node_type)
+        return self.node_index[node_ids[0]] if node_ids else None
+
+    def get_dependencies(self, node_id: str) -> Set[str]:
+        """Get all upstream dependencies of a node"""
+        dependencies = set()
+        queue = deque([node_id])
+
+        while queue:
+            current = queue.popleft()
+            for edge in self.incoming_edges.get(current, []):
+                if edge['source'] not in dependencies:
+                    dependencies.add(edge['source'])
+                    queue.append(edge['source'])
+
+        return dependencies
+
+    def get_downstream(self, node_id: str) -> Set[str]:
+        """Get all downstream nodes"""
+        downstream = set()
+        queue = deque([node_id])
+
+        while queue:
+            current = queue.popleft()
+            for edge in self.outgoing_edges.get(current, []):
+                if edge['target'] not in downstream:
+                    downstream.add(edge['target'])
+                    queue.append(edge['target'])
+
+        return downstream
+
+    def get_execution_subgraph(self, node_id: str) -> Set[str]:
+        """Get all nodes that should be executed when executing from a specific node"""
+        return self.get_dependencies(node_id) | {node_id} | self.get_downstream(node_id)
+
+    def is_subgraph_acyclic(self, node_ids: Set[str]) -> bool:
+        """Check whether the subgraph induced by node_ids has no cycles"""
+        if self.is_acyclic:
+            return True
+
+        in_degree = {
+            node_id: sum(1 for edge in self.incoming_edges[node_id] if edge['source'] in node_ids)
+            for node_id in node_ids
+        }
+        queue = deque(node_id for node_id, degree in in_degree.items() if degree == 0)
+        visited = 0
+
+        while queue:
+            current = queue.popleft()
+            visited += 1
+            for edge in self.outgoing_edges[current]:
+                if edge['target'] in in_degree:
+                    in_degree[edge['target']] -= 1
+                    if in_degree[edge['target']] == 0:
+                        queue.append(edge['target'])
+
+        return visited == len(node_ids)
+
+
+class ExecutionPlanCache:
+    """Thread-safe LRU cache of compiled workflows keyed by (workflow id, version)"""
+
+    def __init__(self, max_size: int = DEFAULT_PLAN_CACHE_SIZE):
+        self.max_size = max_size
+        self._plans: 'OrderedDict[tuple, CompiledWorkflow]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(
+        self,
+        workflow_id: str,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        version: Optional[str] = None
+    ) -> CompiledWorkflow:
+        """Return the cached plan for this workflow version, compiling it if needed"""
+        version = version or compute_workflow_hash(nodes, edges)
+        key = (str(workflow_id), version)
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        plan = CompiledWorkflow(str(workflow_id), version, nodes, edges)
+        logger.info(f"Compiled execution plan for workflow {workflow_id} ({len(nodes)} nodes, {len(edges)} edges)")
+
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+        return plan
+
+    def invalidate(self, workflow_id: str):
+        """Drop every cached plan of a workflow"""
+        with self._lock:
+            for key in [key for key in self._plans if key[0] == str(workflow_id)]:
+                del self._plans[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'size': len(self._plans),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Global plan cache instance
+plan_cache = ExecutionPlanCache(getattr(settings, 'WORKFLOW_PLAN_CACHE_SIZE', DEFAULT_PLAN_CACHE_SIZE))
+
+
+def get_compiled_workflow(
+    workflow_id: str,
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]],
+    version: Optional[str] = None
+) -> CompiledWorkflow:
+    """Get compiled execution plan for a workflow version"""
+    return plan_cache.get_or_compile(workflow_id, nodes, edges, version)
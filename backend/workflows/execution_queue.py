@@ -0,0 +1,440 @@
+"""
+Workflow Execution Queue
+Runs workflow executions outside the HTTP request thread
+"""
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import asyncio
+import logging
+import os
+import socket
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .execution_engine import execution_engine, ExecutionContext
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SETTINGS = {
+    'BACKEND': 'local',  # 'local' (in-process worker pool) or 'database' (ExecutionJob table)
+    'WORKERS': 4,
+    'POLL_INTERVAL': 1.0,
+    'ASYNC_BY_DEFAULT': False,
+    'LEASE_SECONDS': 60,  # A running job whose worker stopped renewing its claim for this long is reclaimed
+    'MAX_ATTEMPTS': 3,  # Claims of a job before an abandoned job is marked failed
+}
+
+
+def get_queue_settings() -> Dict[str, Any]:
+    """Get execution queue settings merged with defaults"""
+    return {**DEFAULT_QUEUE_SETTINGS, **getattr(settings, 'WORKFLOW_EXECUTION_QUEUE', {})}
+
+
+class ExecutionRequest:
+    """Everything needed to run one workflow execution"""
+
+    def __init__(
+        self,
+        execution_id: str,
+        workflow_id: str,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        trigger_data: Optional[Dict[str, Any]] = None,
+        credentials: Optional[Dict[str, Any]] = None,
+        start_node_id: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        version: Optional[str] = None,
+        reuse_previous: bool = False
+    ):
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.nodes = nodes
+        self.edges = edges
+        self.trigger_data = trigger_data or {}
+        self.credentials = credentials or {}
+        self.start_node_id = start_node_id
+        self.max_concurrency = max_concurrency
+        self.version = version
+        self.reuse_previous = reuse_previous
+
+    def load_previous_node_states(self) -> Dict[str, Any]:
+        """Node states of the latest other execution of this workflow"""
+        from .models import WorkflowExecution
+
+        previous = (
+            WorkflowExecution.objects
+            .filter(workflow_id=self.workflow_id)
+            .exclude(id=self.execution_id)
+            .exclude(node_states={})
+            .order_by('-started_at')
+            .values_list('node_states', flat=True)
+            .first()
+        )
+        return previous or {}
+
+    def engine_kwargs(self) -> Dict[str, Any]:
+        """
+        Arguments for WorkflowExecutionEngine.execute_workflow
+
+        Queries the previous execution when reuse_previous is set, so call it
+        from synchronous code.
+        """
+        return {
+            'workflow_id': self.workflow_id,
+            'execution_id': self.execution_id,
+            'nodes': self.nodes,
+            'edges': self.edges,
+            'trigger_data': self.trigger_data,
+            'credentials': self.credentials,
+            'start_node_id': self.start_node_id,
+            'max_concurrency': self.max_concurrency,
+            'version': self.version,
+            'previous_node_states': self.load_previous_node_states() if self.reuse_previous else None,
+        }
+    
+    def to_payload(self) -> Dict[str, Any]:
+        """
+        Serialize for the database queue.
+
+        Credentials are never persisted; database workers use the provider
+        keys of their own environment (OPENAI_API_KEY etc.), as nodes do
+        whenever an execution carries no credentials.
+        """
+        return {
+            'nodes': self.nodes,
+            'edges': self.edges,
+            'trigger_data': self.trigger_data,
+            'start_node_id': self.start_node_id,
+            'max_concurrency': self.max_concurrency,
+            'version': self.version,
+            'reuse_previous': self.reuse_previous,
+        }
+
+    @classmethod
+    def from_job(cls, job) -> 'ExecutionRequest':
+        """Rebuild a request from an ExecutionJob row"""
+        payload = job.payload or {}
+        return cls(
+            execution_id=str(job.id),
+            workflow_id=str(job.workflow_id),
+            nodes=payload.get('nodes', []),
+            edges=payload.get('edges', []),
+            trigger_data=payload.get('trigger_data'),
+            start_node_id=payload.get('start_node_id'),
+            max_concurrency=payload.get('max_concurrency'),
+            version=payload.get('version'),
+            reuse_previous=payload.get('reuse_previous', False),
+        )
+
+
+def save_execution(request: ExecutionRequest, context: ExecutionContext, trigger_data: Optional[Dict[str, Any]] = None):
+    """Persist the outcome of an execution to its WorkflowExecution row"""
+    from .models import WorkflowExecution
+
+    WorkflowExecution.objects.update_or_create(
+        id=request.execution_id,
+        defaults={
+            'workflow_id': request.workflow_id,
+            'status': context.status,
+            'finished_at': context.end_time,
+            'execution_order': context.execution_order,
+            'node_states': context.node_states,
+            'errors': context.errors,
+            'trigger_data': request.trigger_data if trigger_data is None else trigger_data,
+        }
+    )
+
+
+_worker_state = threading.local()
+
+
+def _get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Get the long-lived event loop of the current worker thread"""
+    loop = getattr(_worker_state, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _worker_state.loop = loop
+    return loop
+
+
+def run_execution_request(request: ExecutionRequest) -> Optional[ExecutionContext]:
+    """
+    Run a queued execution to completion in the current (worker) thread
+
+    Returns None without running when the execution was cancelled while queued.
+    """
+    from .models import WorkflowExecution
+
+    close_old_connections()
+    try:
+        started = WorkflowExecution.objects.filter(id=request.execution_id, status='queued').update(
+            status='running',
+            started_at=timezone.now()
+        )
+        if not started:
+            logger.info(f"Skipping execution {request.execution_id}, it is no longer queued")
+            return None
+
+        context = _get_worker_loop().run_until_complete(
+            execution_engine.execute_workflow(**request.engine_kwargs())
+        )
+
+        save_execution(request, context)
+        return context
+    finally:
+        close_old_connections()
+
+
+class LocalExecutionQueue:
+    """Executes queued workflows on an in-process worker pool"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='workflow-exec')
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def enqueue(self, request: ExecutionRequest):
+        """Schedule an execution"""
+        with self._lock:
+            self.queued += 1
+        self._executor.submit(self._run, request)
+
+    def _run(self, request: ExecutionRequest):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+
+        failed = False
+        try:
+            run_execution_request(request)
+        except Exception as e:
+            failed = True
+            logger.error(f"Queued execution {request.execution_id} failed: {str(e)}")
+            _mark_execution_failed(request.execution_id, str(e))
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                if failed:
+                    self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        with self._lock:
+            return {
+                'backend': 'local',
+                'workers': self.workers,
+                'queued': self.queued,
+                'running': self.running,
+                'completed': self.completed,
+                'failed': self.failed,
+            }
+
+
+class DatabaseExecutionQueue:
+    """Stores queued workflows in the ExecutionJob table for worker processes"""
+
+    def enqueue(self, request: ExecutionRequest):
+        """Schedule an execution"""
+        from .models import ExecutionJob
+
+        if request.credentials:
+            logger.warning(
+                f"Execution {request.execution_id} carries credentials that are not stored in the database queue; "
+                f"the worker uses its environment's provider keys"
+            )
+        ExecutionJob.objects.create(
+            id=request.execution_id,
+            workflow_id=request.workflow_id,
+            payload=request.to_payload()
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        from django.db.models import Count
+        from .models import ExecutionJob
+
+        counts = dict(ExecutionJob.objects.values_list('status').annotate(count=Count('id')))
+        return {
+            'backend': 'database',
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'completed': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+        }
+
+
+class DatabaseExecutionWorker:
+    """
+    Claims and runs jobs from the ExecutionJob table.
+
+    A claim is a lease: the worker renews claimed_at while the job runs, and
+    a running job whose lease expired (its worker died) is claimed again, up
+    to MAX_ATTEMPTS claims, after which it is marked failed.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 1.0,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_QUEUE_SETTINGS['LEASE_SECONDS'],
+        max_attempts: int = DEFAULT_QUEUE_SETTINGS['MAX_ATTEMPTS']
+    ):
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._stopped = threading.Event()
+
+    def fail_abandoned(self, stale_before) -> int:
+        """Mark expired jobs that used up their attempts as failed"""
+        from .models import ExecutionJob
+
+        failed = 0
+        abandoned = ExecutionJob.objects.filter(
+            status='running', claimed_at__lt=stale_before, attempts__gte=self.max_attempts
+        ).values_list('id', 'attempts')
+        for job_id, attempts in abandoned:
+            error = f"Worker lost the job after {attempts} attempts"
+            if ExecutionJob.objects.filter(id=job_id, status='running', claimed_at__lt=stale_before).update(
+                status='failed', error=error, payload={}, finished_at=timezone.now()
+            ):
+                logger.error(f"Execution job {job_id} failed: {error}")
+                _mark_execution_failed(str(job_id), error)
+                failed += 1
+        return failed
+
+    def claim_next(self):
+        """Atomically claim the oldest queued or abandoned job, or return None"""
+        from django.db.models import Q
+        from .models import ExecutionJob, WorkflowExecution
+
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=self.lease_seconds)
+        self.fail_abandoned(stale_before)
+
+        candidates = ExecutionJob.objects.filter(
+            Q(status='queued') | Q(status='running', claimed_at__lt=stale_before, attempts__lt=self.max_attempts)
+        ).order_by('created_at')[:10]
+        for job in candidates:
+            # Conditional update works as a claim on every database backend
+            claimed = ExecutionJob.objects.filter(
+                id=job.id, status=job.status, claimed_at=job.claimed_at, attempts=job.attempts
+            ).update(
+                status='running',
+                worker_id=self.worker_id,
+                claimed_at=now,
+                attempts=job.attempts + 1
+            )
+            if claimed:
+                if job.status == 'running':
+                    logger.warning(f"Reclaiming execution job {job.id} abandoned by worker {job.worker_id}")
+                    # Let run_execution_request start the execution again
+                    WorkflowExecution.objects.filter(id=job.id, status='running').update(status='queued')
+                job.refresh_from_db()
+                return job
+        return None
+
+    def _renew_lease(self, job_id, done: threading.Event):
+        """Keep the claim of a running job fresh until it finishes (heartbeat thread)"""
+        from django.db import connection
+        from .models import ExecutionJob
+
+        try:
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    ExecutionJob.objects.filter(id=job_id, worker_id=self.worker_id, status='running').update(
+                        claimed_at=timezone.now()
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to renew the lease of execution job {job_id}: {str(e)}")
+        finally:
+            connection.close()
+
+    def run_once(self) -> bool:
+        """Run one job if available; returns whether a job was run"""
+        from .models import ExecutionJob
+
+        close_old_connections()
+        job = self.claim_next()
+        if job is None:
+            return False
+
+        request = ExecutionRequest.from_job(job)
+        done = threading.Event()
+        threading.Thread(
+            target=self._renew_lease, args=(job.id, done), name=f'lease-{job.id}', daemon=True
+        ).start()
+        # Only the current owner finishes the job (a reclaimed job belongs to another worker)
+        owned = ExecutionJob.objects.filter(id=job.id, worker_id=self.worker_id)
+        try:
+            run_execution_request(request)
+            owned.update(status='done', payload={}, finished_at=timezone.now())
+        except Exception as e:
+            logger.error(f"Execution job {job.id} failed: {str(e)}")
+            owned.update(status='failed', error=str(e), payload={}, finished_at=timezone.now())
+            _mark_execution_failed(request.execution_id, str(e))
+        finally:
+            done.set()
+        return True
+
+    def run_forever(self):
+        """Poll the queue until stopped"""
+        logger.info(f"Execution worker {self.worker_id} started")
+        while not self._stopped.is_set():
+            if not self.run_once():
+                self._stopped.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def _mark_execution_failed(execution_id: str, error: str):
+    """Record an execution that crashed outside the engine"""
+    from .models import WorkflowExecution
+
+    try:
+        WorkflowExecution.objects.filter(id=execution_id).update(
+            status='error',
+            finished_at=timezone.now(),
+            errors={'execution': error}
+        )
+    except Exception as e:
+        logger.error(f"Failed to mark execution {execution_id} as failed: {str(e)}")
+
+
+_execution_queue = None
+_execution_queue_lock = threading.Lock()
+
+
+def get_execution_queue():
+    """Get the configured execution queue"""
+    global _execution_queue
+    if _execution_queue is None:
+        with _execution_queue_lock:
+            if _execution_queue is None:
+                queue_settings = get_queue_settings()
+                if queue_settings['BACKEND'] == 'database':
+                    _execution_queue = DatabaseExecutionQueue()
+                else:
+                    _execution_queue = LocalExecutionQueue(queue_settings['WORKERS'])
+    return _execution_queue
+
+
+def submit_execution(request: ExecutionRequest):
+    """Record a queued execution and hand it to the queue"""
+    from .models import WorkflowExecution
+
+    WorkflowExecution.objects.create(
+        id=request.execution_id,
+        workflow_id=request.workflow_id,
+        status='queued',
+        trigger_data=request.trigger_data
+    )
+    get_execution_queue().enqueue(request)
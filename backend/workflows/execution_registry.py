@@ -0,0 +1,153 @@
+"""
+Execution Registry
+Bounded in-process store of live and recently finished ExecutionContexts
+"""
+from typing import Dict, Any
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_SETTINGS = {
+    'MAX_ENTRIES': 200,  # Finished contexts kept in memory
+    'MAX_BYTES': 64 * 1024 * 1024,  # Estimated size budget of finished contexts
+    'TTL_SECONDS': 300,  # How long a finished context stays resident
+}
+
+
+def estimate_context_size(context) -> int:
+    """Rough serialized size of an execution context in bytes"""
+    try:
+        payload = json.dumps(
+            {'node_states': context.node_states, 'node_results': context.node_results},
+            default=str
+        )
+        return len(payload.encode('utf-8'))
+    except Exception:
+        return 0
+
+
+class ExecutionRegistry:
+    """
+    Registry of execution contexts with TTL and LRU eviction.
+
+    Running executions are always kept. Once an execution finishes it is
+    sized once and becomes evictable by age, entry count and byte budget;
+    callers fall back to the persisted WorkflowExecution row afterwards.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._running: Dict[str, Any] = {}
+        # execution_id -> (context, size_bytes, completed_at), oldest first
+        self._finished: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._finished_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __setitem__(self, execution_id: str, context):
+        with self._lock:
+            self._drop(execution_id)
+            self._running[execution_id] = context
+
+    def __contains__(self, execution_id: str) -> bool:
+        return self.get(execution_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._running) + len(self._finished)
+
+    def get(self, execution_id: str):
+        """Get a resident context, or None if unknown or evicted"""
+        with self._lock:
+            self._expire()
+            context = self._running.get(execution_id)
+            if context is not None:
+                return context
+
+            entry = self._finished.get(execution_id)
+            if entry is None:
+                return None
+            self._finished.move_to_end(execution_id)
+            return entry[0]
+
+    def mark_completed(self, execution_id: str):
+        """Move a finished execution into the evictable set"""
+        with self._lock:
+            context = self._running.pop(execution_id, None)
+        if context is None:
+            return
+
+        # Size outside the lock, it walks the whole result tree
+        size = estimate_context_size(context)
+
+        with self._lock:
+            self._finished[execution_id] = (context, size, time.monotonic())
+            self._finished_bytes += size
+            self._expire()
+            self._evict()
+
+    def _drop(self, execution_id: str):
+        """Remove an entry; caller holds the lock"""
+        self._running.pop(execution_id, None)
+        entry = self._finished.pop(execution_id, None)
+        if entry is not None:
+            self._finished_bytes -= entry[1]
+
+    def _expire(self):
+        """Remove finished contexts older than the TTL; caller holds the lock"""
+        if self.ttl_seconds is None:
+            return
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [execution_id for execution_id, entry in self._finished.items() if entry[2] < deadline]
+        for execution_id in expired:
+            self._drop(execution_id)
+            self.expirations += 1
+
+    def _evict(self):
+        """Evict least recently used finished contexts over budget; caller holds the lock"""
+        while self._finished and (
+            len(self._finished) > self.max_entries or self._finished_bytes > self.max_bytes
+        ):
+            execution_id, entry = self._finished.popitem(last=False)
+            self._finished_bytes -= entry[1]
+            self.evictions += 1
+            logger.debug(f"Evicted execution context {execution_id} ({entry[1]} bytes)")
+
+    def purge_expired(self):
+        """Drop expired contexts now"""
+        with self._lock:
+            self._expire()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get registry statistics"""
+        with self._lock:
+            self._expire()
+            return {
+                'running': len(self._running),
+                'finished': len(self._finished),
+                'finished_bytes': self._finished_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def create_execution_registry() -> ExecutionRegistry:
+    """Build a registry from the WORKFLOW_EXECUTION_REGISTRY setting"""
+    from django.conf import settings
+
+    config = {**DEFAULT_REGISTRY_SETTINGS, **getattr(settings, 'WORKFLOW_EXECUTION_REGISTRY', {})}
+    return ExecutionRegistry(
+        max_entries=config['MAX_ENTRIES'],
+        max_bytes=config['MAX_BYTES'],
+        ttl_seconds=config['TTL_SECONDS']
+    )
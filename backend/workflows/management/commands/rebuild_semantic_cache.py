@@ -0,0 +1,26 @@
+"""
+Management command to rebuild the ai_chat semantic cache embedding matrix
+"""
+from django.core.management.base import BaseCommand
+from workflows.semantic_cache import get_semantic_cache
+
+
+class Command(BaseCommand):
+    help = 'Re-embed the semantic cache index into a fresh embedding matrix, dropping expired entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true',
+                            help='Remove every entry instead of rebuilding')
+
+    def handle(self, *args, **options):
+        cache = get_semantic_cache(force=True)
+
+        if options['clear']:
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS('Semantic cache cleared'))
+            return
+
+        kept = cache.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Semantic cache rebuilt: {kept} entries, {cache.dim} dimensions, capacity {cache.max_entries}'
+        ))
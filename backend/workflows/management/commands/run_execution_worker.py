@@ -0,0 +1,35 @@
+"""
+Management command to run queued workflow executions from the database queue
+"""
+from django.core.management.base import BaseCommand
+from workflows.execution_queue import DatabaseExecutionWorker, get_queue_settings
+
+
+class Command(BaseCommand):
+    help = 'Run workflow executions queued in the ExecutionJob table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Run at most one job and exit')
+
+    def handle(self, *args, **options):
+        queue_settings = get_queue_settings()
+        worker = DatabaseExecutionWorker(
+            poll_interval=options['poll_interval'] or queue_settings['POLL_INTERVAL'],
+            lease_seconds=queue_settings['LEASE_SECONDS'],
+            max_attempts=queue_settings['MAX_ATTEMPTS']
+        )
+
+        if options['once']:
+            ran = worker.run_once()
+            self.stdout.write(self.style.SUCCESS('Ran one job' if ran else 'No queued jobs'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Execution worker {worker.worker_id} started'))
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            worker.stop()
+            self.stdout.write('Execution worker stopped')
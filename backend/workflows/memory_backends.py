@@ -0,0 +1,694 @@
+"""
+Conversation Memory Backends
+Windowed, database-backed memory for AI Agent nodes with write-behind persistence
+"""
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+import asyncio
+import atexit
+import hashlib
+import logging
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENT_MEMORY_SETTINGS = {
+    'DB_WORKERS': 4,  # Threads running memory ORM calls (shared by every agent node)
+    'DB_TIMEOUT': 5.0,  # Seconds a synchronous memory call waits for the database
+    'SHARDS': 16,  # Independently locked partitions of the write buffer and the conversation store
+    # In-process conversation store (window-buffer-memory and legacy memory nodes)
+    'STORE_MAX_ENTRIES': 1000,  # Resident conversations
+    'STORE_MAX_BYTES': 64 * 1024 * 1024,  # Estimated size of all resident conversations
+    'STORE_TTL_SECONDS': 3600,  # Idle time before a conversation is evicted (None disables)
+    'STORE_SPILL': True,  # Save evicted conversations to the database and reload them on next use
+}
+
+# Estimated per-message overhead added to the content length when sizing conversations
+MESSAGE_OVERHEAD_BYTES = 256
+
+# Longer user/channel sessions are replaced by a digest to keep collection names within 255 characters
+MAX_SESSION_KEY_LENGTH = 64
+
+
+def get_agent_memory_settings() -> Dict[str, Any]:
+    """Get agent memory settings merged over the defaults"""
+    from django.conf import settings
+    return {**DEFAULT_AGENT_MEMORY_SETTINGS, **getattr(settings, 'AGENT_MEMORY', {})}
+
+
+def session_key(trigger_data: Optional[Dict[str, Any]]) -> str:
+    """
+    Conversation session of an execution from its chat trigger data.
+
+    Returns '' when the execution carries neither a user nor a channel
+    (manual, webhook and schedule runs), so those keep one conversation
+    per workflow node.
+    """
+    trigger_data = trigger_data or {}
+    user = str(trigger_data.get('user') or '').strip()
+    channel = str(trigger_data.get('channel') or '').strip()
+    if not user and not channel:
+        return ''
+    key = f"{user or 'anonymous'}@{channel or 'default'}"
+    if len(key) > MAX_SESSION_KEY_LENGTH:
+        key = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+    return key
+
+
+def shard_index(key: Any, shards: int) -> int:
+    """Stable shard of a key (the same across processes, unlike hash())"""
+    return zlib.crc32(str(key).encode('utf-8')) % shards
+
+
+def build_message(role: str, content: str):
+    """Build an Alith message object for a stored role"""
+    from alith import MessageBuilder
+
+    if role == 'user':
+        return MessageBuilder.new_human_message(content)
+    elif role == 'assistant':
+        return MessageBuilder.new_ai_message(content)
+    elif role == 'system':
+        return MessageBuilder.new_system_message(content)
+    return MessageBuilder.new_tool_message(content)
+
+
+class DBMemoryBackend:
+    """
+    MemoryMessage access for windowed conversation memory.
+
+    Reads fetch only the newest `window_size` rows through the
+    (collection, timestamp) index and trimming is one bulk DELETE, so the
+    cost per message does not grow with the age of a collection.
+
+    New messages are buffered per collection (write-behind) and written with
+    one bulk INSERT and one trim when the owning node flushes; whatever is
+    still buffered at interpreter exit is flushed then. The buffer is split
+    into shards by collection, so concurrent sessions do not share a lock.
+    """
+
+    def __init__(self, workers: int = DEFAULT_AGENT_MEMORY_SETTINGS['DB_WORKERS'],
+                 timeout: float = DEFAULT_AGENT_MEMORY_SETTINGS['DB_TIMEOUT'],
+                 shards: int = DEFAULT_AGENT_MEMORY_SETTINGS['SHARDS']):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='memory-db')
+        # Guards the counters only
+        self._lock = threading.Lock()
+        # Each shard: {'lock': Lock, 'pending': {collection id -> {'window_size', 'messages': [(role, content, timestamp)]}}}
+        self._shards = [{'lock': threading.Lock(), 'pending': {}} for _ in range(max(int(shards), 1))]
+        self.buffered = 0
+        self.flushes = 0
+        self.flushed_messages = 0
+        self.flush_errors = 0
+
+    # ==================== ORM calls (run on the executor) ====================
+
+    def get_or_create_collection(self, name: str, workflow_id: str, node_id: str, window_size: int) -> Tuple[Any, bool]:
+        from django.db import transaction
+        from .models import MemoryCollection
+
+        with transaction.atomic():
+            return MemoryCollection.objects.get_or_create(
+                name=name,
+                defaults={
+                    'workflow_id': workflow_id,
+                    'node_id': node_id,
+                    'window_size': window_size,
+                    'description': 'Agent Flow Database Memory'
+                }
+            )
+
+    def tail(self, collection_id, limit: int) -> List[Tuple[str, str]]:
+        """Get the newest `limit` messages as (role, content), oldest first"""
+        from .models import MemoryMessage
+
+        rows = list(
+            MemoryMessage.objects.filter(collection_id=collection_id)
+            .order_by('-timestamp')
+            .values_list('role', 'content')[:limit]
+        )
+        rows.reverse()
+        return rows
+
+    def write_batch(self, collection_id, messages: List[Tuple[str, str, Any]], window_size: int):
+        """Insert buffered (role, content, timestamp) messages and trim the collection once"""
+        from django.db import transaction
+        from .models import MemoryMessage
+
+        with transaction.atomic():
+            MemoryMessage.objects.bulk_create([
+                MemoryMessage(collection_id=collection_id, role=role, content=content, timestamp=timestamp)
+                for role, content, timestamp in messages
+            ])
+            self.trim(collection_id, window_size)
+
+    def trim(self, collection_id, window_size: int) -> int:
+        """Delete everything older than the newest `window_size` messages in one statement"""
+        from .models import MemoryMessage
+
+        messages = MemoryMessage.objects.filter(collection_id=collection_id)
+        boundary = (
+            messages.order_by('-timestamp')
+            .values_list('timestamp', flat=True)[max(window_size, 1) - 1:max(window_size, 1)]
+            .first()
+        )
+        if boundary is None:
+            return 0
+        deleted, _ = messages.filter(timestamp__lt=boundary).delete()
+        return deleted
+
+    def clear(self, collection_id):
+        from .models import MemoryMessage
+        MemoryMessage.objects.filter(collection_id=collection_id).delete()
+
+    # ==================== Write-behind buffer ====================
+
+    def _shard(self, collection_id) -> Dict[str, Any]:
+        return self._shards[shard_index(collection_id, len(self._shards))]
+
+    def enqueue(self, collection_id, role: str, content: str, window_size: int):
+        """Buffer a message; it is written on the next flush of its collection"""
+        from django.utils import timezone
+
+        shard = self._shard(collection_id)
+        with shard['lock']:
+            entry = shard['pending'].setdefault(collection_id, {'window_size': window_size, 'messages': []})
+            timestamp = timezone.now()
+            if entry['messages'] and timestamp <= entry['messages'][-1][2]:
+                # Keep insertion order when the clock does not advance between messages
+                timestamp = entry['messages'][-1][2] + timedelta(microseconds=1)
+            entry['messages'].append((role, content, timestamp))
+            entry['window_size'] = window_size
+        with self._lock:
+            self.buffered += 1
+
+    def discard(self, collection_id):
+        """Drop buffered messages of a collection"""
+        shard = self._shard(collection_id)
+        with shard['lock']:
+            shard['pending'].pop(collection_id, None)
+
+    def _take(self, collection_id=None) -> List[Tuple[Any, List, int]]:
+        """Remove and return buffered batches (all collections when collection_id is None)"""
+        shards = self._shards if collection_id is None else [self._shard(collection_id)]
+        batches = []
+        for shard in shards:
+            with shard['lock']:
+                keys = list(shard['pending']) if collection_id is None else [collection_id]
+                for key in keys:
+                    entry = shard['pending'].pop(key, None)
+                    if entry and entry['messages']:
+                        batches.append((key, entry['messages'], entry['window_size']))
+        return batches
+
+    def _requeue(self, collection_id, messages: List, window_size: int):
+        """Put a failed batch back in front of anything buffered since"""
+        shard = self._shard(collection_id)
+        with shard['lock']:
+            entry = shard['pending'].setdefault(collection_id, {'window_size': window_size, 'messages': []})
+            entry['messages'][:0] = messages
+        with self._lock:
+            self.flush_errors += 1
+
+    def _written(self, count: int):
+        with self._lock:
+            self.flushes += 1
+            self.flushed_messages += count
+
+    async def flush(self, collection_id):
+        """Write the buffered messages of a collection"""
+        for key, messages, window_size in self._take(collection_id):
+            try:
+                await self.run(self.write_batch, key, messages, window_size)
+            except Exception as e:
+                logger.warning(f"Memory flush failed, keeping {len(messages)} messages buffered: {str(e)}")
+                self._requeue(key, messages, window_size)
+            else:
+                self._written(len(messages))
+
+    def flush_all(self):
+        """
+        Write every buffered message from the calling thread.
+
+        Registered with atexit, when the executor no longer accepts work.
+        """
+        for key, messages, window_size in self._take():
+            try:
+                self.write_batch(key, messages, window_size)
+            except Exception as e:
+                logger.error(f"Memory flush at exit failed for {len(messages)} messages: {str(e)}")
+                self._requeue(key, messages, window_size)
+            else:
+                self._written(len(messages))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get write-behind statistics"""
+        pending_collections = pending_messages = 0
+        for shard in self._shards:
+            with shard['lock']:
+                pending_collections += len(shard['pending'])
+                pending_messages += sum(len(entry['messages']) for entry in shard['pending'].values())
+        with self._lock:
+            return {
+                'shards': len(self._shards),
+                'pending_collections': pending_collections,
+                'pending_messages': pending_messages,
+                'buffered': self.buffered,
+                'flushes': self.flushes,
+                'flushed_messages': self.flushed_messages,
+                'flush_errors': self.flush_errors,
+            }
+
+    # ==================== Dispatch ====================
+
+    async def run(self, func, *args):
+        """Await an ORM call on the shared executor"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def submit(self, func, *args) -> Future:
+        """Schedule an ORM call on the shared executor without waiting"""
+        return self._executor.submit(func, *args)
+
+    def run_sync(self, func, *args):
+        """Run an ORM call on the shared executor from synchronous code"""
+        return self._executor.submit(func, *args).result(timeout=self.timeout)
+
+
+class AgentFlowDBMemory:
+    """
+    Alith-compatible windowed memory persisted in MemoryMessage rows.
+
+    Only the last `window_size` messages are kept in memory. Writes are
+    buffered by the backend until aflush(), so adding a message never waits
+    on the database.
+    """
+
+    def __init__(self, backend: DBMemoryBackend, collection, window_size: int, messages: Optional[List] = None):
+        self.backend = backend
+        self.collection = collection
+        self.window_size = window_size
+        self._messages = list(messages or [])
+
+    @classmethod
+    async def load(cls, collection, window_size: int, backend: Optional[DBMemoryBackend] = None) -> 'AgentFlowDBMemory':
+        """Create a memory holding the newest `window_size` messages of a collection"""
+        backend = backend or get_db_memory_backend()
+        rows = await backend.run(backend.tail, collection.id, window_size)
+        return cls(backend, collection, window_size, [build_message(role, content) for role, content in rows])
+
+    def add_user_message(self, content: str):
+        self._append(build_message('user', content), 'user', content)
+
+    def add_ai_message(self, content: str):
+        self._append(build_message('assistant', content), 'assistant', content)
+
+    def add_message(self, message):
+        self._append(message, message.role, message.content)
+
+    def _append(self, message, role: str, content: str):
+        self._messages.append(message)
+        if len(self._messages) > self.window_size:
+            self._messages = self._messages[-self.window_size:]
+        self.backend.enqueue(self.collection.id, role, content, self.window_size)
+
+    async def aflush(self):
+        """Persist messages added since the last flush"""
+        await self.backend.flush(self.collection.id)
+
+    def messages(self) -> List:
+        return self._messages
+
+    def to_string(self) -> str:
+        return '\n'.join([f"{msg.role}: {msg.content}" for msg in self._messages])
+
+    def clear(self):
+        self._messages.clear()
+        self.backend.discard(self.collection.id)
+        try:
+            self.backend.run_sync(self.backend.clear, self.collection.id)
+        except Exception as e:
+            logger.warning(f"Failed to clear memory messages: {str(e)}")
+
+
+class ConversationMemoryStore:
+    """
+    Bounded process-wide store of in-memory conversations (e.g. WindowBufferMemory).
+
+    Conversations are evicted least recently used first when the entry count
+    or the estimated size budget is exceeded, and when idle longer than the
+    TTL. With spilling enabled an evicted conversation's window is saved as a
+    SpilledConversation row and replayed into a fresh memory object on next use.
+
+    acquire() pins a conversation until the matching release(); pinned
+    conversations are never evicted, so a running turn is always spilled
+    complete. The budget may be exceeded while every entry is pinned and is
+    enforced again on release.
+    """
+
+    def __init__(
+        self,
+        backend: DBMemoryBackend,
+        max_entries: int = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_MAX_ENTRIES'],
+        max_bytes: Optional[int] = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_MAX_BYTES'],
+        ttl_seconds: Optional[float] = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_TTL_SECONDS'],
+        spill: bool = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_SPILL']
+    ):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill = spill
+        self._lock = threading.Lock()
+        # key -> {'memory', 'window_size', 'workflow_id', 'node_id', 'accessed_at', 'size', 'pins'}
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # key -> future of a spill that has not finished yet
+        self._spilling: Dict[str, Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.rehydrated = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.spills = 0
+        self.spill_errors = 0
+
+    @staticmethod
+    def _measure(memory) -> int:
+        messages = memory.messages()
+        return sum(len(getattr(message, 'content', '') or '') + MESSAGE_OVERHEAD_BYTES for message in messages)
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return bool(self.ttl_seconds) and now - entry['accessed_at'] > self.ttl_seconds
+
+    # ==================== Public API ====================
+
+    async def acquire(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        window_size: int,
+        workflow_id: str = '',
+        node_id: str = ''
+    ) -> Tuple[Any, str]:
+        """
+        Get and pin the conversation of a key, creating it with factory() on a miss.
+
+        Returns (memory, status) where status is 'hit', 'rehydrated' or 'new'.
+        Every acquire() must be paired with a release() of the same key.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry['pins'] and self._expired(entry, now):
+                self._evict(key, expired=True)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry['accessed_at'] = now
+                entry['pins'] += 1
+                self.hits += 1
+                return entry['memory'], 'hit'
+            self.misses += 1
+
+        memory = factory()
+        status = 'new'
+        if self.spill:
+            rows = await self._load_spilled(key, window_size)
+            if rows:
+                for role, content in rows:
+                    if role == 'user':
+                        memory.add_user_message(content)
+                    elif role == 'assistant':
+                        memory.add_ai_message(content)
+                    elif hasattr(memory, 'add_message'):
+                        memory.add_message(build_message(role, content))
+                status = 'rehydrated'
+
+        with self._lock:
+            # Another execution may have created the conversation meanwhile
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                existing['pins'] += 1
+                return existing['memory'], 'hit'
+            if status == 'rehydrated':
+                self.rehydrated += 1
+            size = self._measure(memory)
+            self._entries[key] = {
+                'memory': memory,
+                'window_size': window_size,
+                'workflow_id': workflow_id,
+                'node_id': node_id,
+                'accessed_at': time.time(),
+                'size': size,
+                'pins': 1,
+            }
+            self._bytes += size
+            self._enforce_budget()
+        return memory, status
+
+    def release(self, key: str):
+        """Unpin a conversation after use, re-measure it and evict unpinned entries to stay within budget"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                logger.warning(f"Released conversation {key} is not in the memory store")
+                return
+            entry['pins'] = max(entry['pins'] - 1, 0)
+            size = self._measure(entry['memory'])
+            self._bytes += size - entry['size']
+            entry['size'] = size
+            entry['accessed_at'] = time.time()
+            self._enforce_budget()
+
+    def clear(self):
+        """Drop every resident conversation without spilling"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ==================== Eviction and spilling ====================
+
+    def _enforce_budget(self):
+        """Evict expired, then least recently used unpinned entries; caller holds the lock"""
+        now = time.time()
+        for key in [key for key, entry in self._entries.items() if not entry['pins'] and self._expired(entry, now)]:
+            self._evict(key, expired=True)
+
+        def over_budget():
+            return len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)
+
+        for key, entry in list(self._entries.items()):
+            if not over_budget():
+                break
+            if not entry['pins']:
+                self._evict(key)
+
+    def _evict(self, key: str, expired: bool = False):
+        """Remove an entry and spill it in the background; caller holds the lock"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+        if expired:
+            self.expirations += 1
+        else:
+            self.evictions += 1
+
+        if not self.spill:
+            return
+        rows = [
+            (getattr(message, 'role', 'user'), getattr(message, 'content', '') or '')
+            for message in entry['memory'].messages()
+        ][-entry['window_size']:]
+        if not rows:
+            return
+        try:
+            future = self.backend.submit(self._write_spill, key, rows, entry)
+        except RuntimeError:
+            # Executor already shut down (interpreter exit)
+            return
+        self._spilling[key] = future
+        future.add_done_callback(lambda done, key=key: self._spill_done(key, done))
+
+    def _spill_done(self, key: str, future: Future):
+        with self._lock:
+            if self._spilling.get(key) is future:
+                del self._spilling[key]
+            if future.exception() is not None:
+                self.spill_errors += 1
+                logger.warning(f"Failed to spill conversation {key}: {str(future.exception())}")
+            else:
+                self.spills += 1
+
+    def _write_spill(self, key: str, rows: List[Tuple[str, str]], entry: Dict[str, Any]):
+        """Replace the spilled window of a key (runs on the backend executor)"""
+        from .models import SpilledConversation
+
+        # One row per key (unique), so concurrent spills of a key update the same row
+        SpilledConversation.objects.update_or_create(
+            key=key,
+            defaults={
+                'workflow_id': entry['workflow_id'],
+                'node_id': entry['node_id'],
+                'window_size': entry['window_size'],
+                'messages': [list(row) for row in rows],
+            }
+        )
+
+    def _read_spill(self, key: str, window_size: int) -> List[Tuple[str, str]]:
+        from .models import SpilledConversation
+
+        messages = SpilledConversation.objects.filter(key=key).values_list('messages', flat=True).first()
+        return [tuple(message) for message in (messages or [])][-max(window_size, 1):]
+
+    async def _load_spilled(self, key: str, window_size: int) -> List[Tuple[str, str]]:
+        """Read a spilled window, waiting for an in-flight spill of the same key first"""
+        with self._lock:
+            pending = self._spilling.get(key)
+        try:
+            if pending is not None:
+                await asyncio.wrap_future(pending)
+            return await self.backend.run(self._read_spill, key, window_size)
+        except Exception as e:
+            logger.warning(f"Failed to load spilled conversation {key}: {str(e)}")
+            return []
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'pinned': sum(1 for entry in self._entries.values() if entry['pins']),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'spill': self.spill,
+                'hits': self.hits,
+                'misses': self.misses,
+                'rehydrated': self.rehydrated,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'spills': self.spills,
+                'spills_in_flight': len(self._spilling),
+                'spill_errors': self.spill_errors,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ShardedConversationMemoryStore:
+    """
+    ConversationMemoryStore split into independently locked shards by key.
+
+    Conversation keys include the chat session, so concurrent sessions land
+    on different shards and do not wait on each other's lookups, budget
+    enforcement or spills. Each shard gets an equal part of the entry and
+    byte budgets (at least one entry) and evicts within itself.
+    """
+
+    def __init__(
+        self,
+        backend: DBMemoryBackend,
+        shards: int = DEFAULT_AGENT_MEMORY_SETTINGS['SHARDS'],
+        max_entries: int = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_MAX_ENTRIES'],
+        max_bytes: Optional[int] = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_MAX_BYTES'],
+        ttl_seconds: Optional[float] = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_TTL_SECONDS'],
+        spill: bool = DEFAULT_AGENT_MEMORY_SETTINGS['STORE_SPILL']
+    ):
+        count = max(int(shards), 1)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._shards = [
+            ConversationMemoryStore(
+                backend,
+                max_entries=max(-(-max_entries // count), 1),
+                max_bytes=max(-(-max_bytes // count), 1) if max_bytes else max_bytes,
+                ttl_seconds=ttl_seconds,
+                spill=spill
+            )
+            for _ in range(count)
+        ]
+
+    def shard(self, key: str) -> ConversationMemoryStore:
+        """Get the shard owning a key"""
+        return self._shards[shard_index(key, len(self._shards))]
+
+    async def acquire(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        window_size: int,
+        workflow_id: str = '',
+        node_id: str = ''
+    ) -> Tuple[Any, str]:
+        """Get the conversation of a key from its shard (see ConversationMemoryStore.acquire)"""
+        return await self.shard(key).acquire(key, factory, window_size, workflow_id, node_id)
+
+    def release(self, key: str):
+        self.shard(key).release(key)
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get statistics summed over the shards"""
+        totals: Dict[str, Any] = {}
+        for shard_stats in (shard.stats() for shard in self._shards):
+            for name in ('entries', 'pinned', 'bytes', 'hits', 'misses', 'rehydrated', 'evictions',
+                         'expirations', 'spills', 'spills_in_flight', 'spill_errors'):
+                totals[name] = totals.get(name, 0) + shard_stats[name]
+            totals['ttl_seconds'] = shard_stats['ttl_seconds']
+            totals['spill'] = shard_stats['spill']
+        lookups = totals['hits'] + totals['misses']
+        return {
+            **totals,
+            'shards': len(self._shards),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hit_rate': totals['hits'] / lookups if lookups else 0.0,
+        }
+
+
+_db_memory_backend: Optional[DBMemoryBackend] = None
+_db_memory_backend_lock = threading.Lock()
+
+
+def get_db_memory_backend() -> DBMemoryBackend:
+    """Get the process-wide database memory backend, creating it from settings on first use"""
+    global _db_memory_backend
+    if _db_memory_backend is None:
+        with _db_memory_backend_lock:
+            if _db_memory_backend is None:
+                config = get_agent_memory_settings()
+                _db_memory_backend = DBMemoryBackend(
+                    workers=config['DB_WORKERS'], timeout=config['DB_TIMEOUT'], shards=config['SHARDS']
+                )
+                atexit.register(_db_memory_backend.flush_all)
+    return _db_memory_backend
+
+
+_memory_store: Optional[ShardedConversationMemoryStore] = None
+_memory_store_lock = threading.Lock()
+
+
+def get_memory_store() -> ShardedConversationMemoryStore:
+    """Get the process-wide in-memory conversation store, creating it from settings on first use"""
+    global _memory_store
+    if _memory_store is None:
+        with _memory_store_lock:
+            if _memory_store is None:
+                config = get_agent_memory_settings()
+                _memory_store = ShardedConversationMemoryStore(
+                    get_db_memory_backend(),
+                    shards=config['SHARDS'],
+                    max_entries=config['STORE_MAX_ENTRIES'],
+                    max_bytes=config['STORE_MAX_BYTES'],
+                    ttl_seconds=config['STORE_TTL_SECONDS'],
+                    spill=config['STORE_SPILL']
+                )
+    return _memory_store
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0006_executionjob_workflowexecution_queued_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='memorymessage',
+            index=models.Index(fields=['collection', 'timestamp'], name='workflows_m_collect_f8290f_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0007_memorymessage_collection_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='memorymessage',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
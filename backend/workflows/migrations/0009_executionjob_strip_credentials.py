@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def strip_credentials(apps, schema_editor):
+    """Remove provider keys persisted by earlier versions of the database queue"""
+    ExecutionJob = apps.get_model('workflows', 'ExecutionJob')
+    ExecutionJob.objects.filter(status__in=['done', 'failed']).update(payload={})
+    for job in ExecutionJob.objects.filter(payload__has_key='credentials').only('id', 'payload'):
+        payload = dict(job.payload)
+        payload.pop('credentials', None)
+        ExecutionJob.objects.filter(id=job.id).update(payload=payload)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0008_memorymessage_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_credentials, migrations.RunPython.noop),
+    ]
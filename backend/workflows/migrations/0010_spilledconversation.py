@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:59
+
+import uuid
+from django.db import migrations, models
+
+
+def move_spilled_collections(apps, schema_editor):
+    """Move 'spill:<key>' memory collections of earlier versions into SpilledConversation"""
+    MemoryCollection = apps.get_model('workflows', 'MemoryCollection')
+    MemoryMessage = apps.get_model('workflows', 'MemoryMessage')
+    SpilledConversation = apps.get_model('workflows', 'SpilledConversation')
+
+    spilled = MemoryCollection.objects.filter(user__isnull=True, name__startswith='spill:')
+    # Oldest first, so the newest duplicate of a key wins
+    for collection in spilled.order_by('updated_at'):
+        rows = list(
+            MemoryMessage.objects.filter(collection_id=collection.id)
+            .order_by('-timestamp')
+            .values_list('role', 'content')[:max(collection.window_size, 1)]
+        )
+        rows.reverse()
+        SpilledConversation.objects.update_or_create(
+            key=collection.name[len('spill:'):],
+            defaults={
+                'workflow_id': collection.workflow_id,
+                'node_id': collection.node_id,
+                'window_size': collection.window_size,
+                'messages': [list(row) for row in rows],
+            }
+        )
+    spilled.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workflows', '0009_executionjob_strip_credentials'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpilledConversation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('workflow_id', models.CharField(blank=True, max_length=255)),
+                ('node_id', models.CharField(blank=True, max_length=255)),
+                ('window_size', models.IntegerField(default=20)),
+                ('messages', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_spilled_collections, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ Django models for workflows
 """
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
 
@@ -33,6 +34,7 @@ class WorkflowExecution(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='executions')
     status = models.CharField(max_length=50, choices=[
+        ('queued', 'Queued'),
         ('running', 'Running'),
         ('completed', 'Completed'),
         ('error', 'Error'),
@@ -52,6 +54,34 @@ class WorkflowExecution(models.Model):
         return f"{self.workflow.name} - {self.status} - {self.started_at}"
 
 
+class ExecutionJob(models.Model):
+    """Queued workflow execution, shared between processes"""
+    id = models.UUIDField(primary_key=True, editable=False)  # Same as the execution ID
+    workflow = models.ForeignKey(Workflow, on_delete=models.CASCADE, related_name='execution_jobs')
+    status = models.CharField(max_length=50, default='queued', choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ])
+    payload = models.JSONField(default=dict)
+    worker_id = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.workflow_id} - {self.status} - {self.created_at}"
+
+
 class MemoryCollection(models.Model):
     """Memory collection for storing conversation memory"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -87,15 +117,34 @@ class MemoryMessage(models.Model):
         ('tool', 'Tool')
     ])
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the message is added, not when a buffered batch is written
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['collection', 'timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.role}: {self.content[:50]}..."
 
 
+class SpilledConversation(models.Model):
+    """Window of an in-process agent conversation evicted from the memory store"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    key = models.CharField(max_length=255, unique=True)
+    workflow_id = models.CharField(max_length=255, blank=True)
+    node_id = models.CharField(max_length=255, blank=True)
+    window_size = models.IntegerField(default=20)
+    # [[role, content], ...], oldest first
+    messages = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return self.key
+
+
 class Credential(models.Model):
     """Stored credentials for integrations"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -1,10 +1,128 @@
 """
 Action/Integration Node Executors
 """
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from .base import BaseNodeExecutor, NodeExecutionError
+from .http_client import get_http_pool
+from .http_cache import conditional_headers, fresh_until, get_response_cache, has_validator, is_storable, lookup_response, store_response
+import asyncio
+import copy
 import httpx
 import json
+import logging
+import math
+import os
+import re
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_NODE_SETTINGS = {
+    'MAX_IN_MEMORY_BYTES': 5 * 1024 * 1024,  # Larger bodies are spilled to a file
+    'SPILL_DIR': None,  # Defaults to <system temp>/agentflow-http-spill
+    'SPILL_TTL_SECONDS': 3600,  # Spill files older than this are removed
+    'MAX_PAGES': 100,  # Upper bound on pages fetched by auto-pagination
+    'PAGE_CONCURRENCY': 4,  # Concurrent page fetches when the total is known
+    'MAX_PAGINATED_BYTES': 50 * 1024 * 1024,  # Pagination stops once this much response data is buffered
+}
+
+_JSON_PATH_TOKEN = re.compile(r'\[(\d+|\*)\]|\.?([^.\[\]]+)')
+
+
+def get_http_node_settings() -> Dict[str, Any]:
+    """Get HTTP Request node settings merged with defaults"""
+    from django.conf import settings
+    return {**DEFAULT_HTTP_NODE_SETTINGS, **getattr(settings, 'HTTP_REQUEST_NODE', {})}
+
+
+def _parse_json_path(path: str) -> List[Any]:
+    """Split '$.data.items[0].name' / 'data.items[*].id' into keys, indexes and '*'"""
+    path = path.strip()
+    if path.startswith('$'):
+        path = path[1:]
+    tokens = []
+    for index, key in _JSON_PATH_TOKEN.findall(path):
+        if index:
+            tokens.append('*' if index == '*' else int(index))
+        elif key:
+            tokens.append(key)
+    return tokens
+
+
+def _walk_json_path(data: Any, tokens: List[Any]) -> Any:
+    for position, token in enumerate(tokens):
+        if token == '*':
+            if not isinstance(data, list):
+                return None
+            return [_walk_json_path(item, tokens[position + 1:]) for item in data]
+        if isinstance(token, int):
+            data = data[token] if isinstance(data, list) and -len(data) <= token < len(data) else None
+        else:
+            data = data.get(token) if isinstance(data, dict) else None
+        if data is None:
+            return None
+    return data
+
+
+def project_json_path(data: Any, path: str) -> Any:
+    """Select part of a parsed JSON document (None when the path does not match)"""
+    return _walk_json_path(data, _parse_json_path(path))
+
+
+def parse_total(value: Any) -> Optional[int]:
+    """Read an item total reported by an API, or None when it is missing or not a count"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        total = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return total if total >= 0 else None
+
+
+def project_json_file(file_path: str, path: str) -> Any:
+    """
+    Select part of a JSON file without loading the whole document.
+
+    Uses the optional `ijson` package for incremental parsing of the leading
+    object keys; without it, spilled bodies are not projected.
+    """
+    try:
+        import ijson
+    except ImportError:
+        logger.warning("Install `ijson` to apply jsonPath to spilled HTTP responses")
+        return None
+
+    tokens = _parse_json_path(path)
+    # ijson prefixes address object keys only; resolve the rest in memory
+    prefix_tokens = []
+    for token in tokens:
+        if not isinstance(token, str) or token == '*':
+            break
+        prefix_tokens.append(token)
+
+    with open(file_path, 'rb') as file:
+        for item in ijson.items(file, '.'.join(prefix_tokens)):
+            return _walk_json_path(item, tokens[len(prefix_tokens):])
+    return None
+
+
+def open_spill_file():
+    """Create a spill file for a large response body, removing expired ones"""
+    config = get_http_node_settings()
+    spill_dir = config['SPILL_DIR'] or os.path.join(tempfile.gettempdir(), 'agentflow-http-spill')
+    os.makedirs(spill_dir, exist_ok=True)
+
+    expire_before = time.time() - config['SPILL_TTL_SECONDS']
+    for entry in os.scandir(spill_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < expire_before:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+    return tempfile.NamedTemporaryFile(dir=spill_dir, prefix='response-', suffix='.body', delete=False)
 
 
 class ActionNodeExecutor(BaseNodeExecutor):
@@ -45,45 +163,295 @@ class ActionNodeExecutor(BaseNodeExecutor):
             if key:
                 headers_dict[key] = value
         
+        # Bodies larger than this are written to a spill file instead of memory
+        max_in_memory = get_http_node_settings()['MAX_IN_MEMORY_BYTES']
+        max_in_memory_mb = self.get_property('maxInMemoryMB')
+        if max_in_memory_mb not in (None, ''):
+            try:
+                max_in_memory_mb = float(max_in_memory_mb)
+            except (TypeError, ValueError):
+                raise NodeExecutionError(f"Max In-Memory Size (MB) must be a number, got {max_in_memory_mb!r}")
+            if not math.isfinite(max_in_memory_mb) or max_in_memory_mb < 0:
+                raise NodeExecutionError(f"Max In-Memory Size (MB) must be a non-negative number, got {max_in_memory_mb}")
+            max_in_memory = int(max_in_memory_mb * 1024 * 1024)
+        json_path = self.get_property('jsonPath', '')
+        
         self.log_execution(f"Making {method} request to {url}")
         
         try:
-            async with httpx.AsyncClient() as client:
-                if method == 'GET':
-                    response = await client.get(url, headers=headers_dict)
-                elif method == 'POST':
-                    body_data = json.loads(body) if isinstance(body, str) else body
-                    response = await client.post(url, headers=headers_dict, json=body_data)
-                elif method == 'PUT':
-                    body_data = json.loads(body) if isinstance(body, str) else body
-                    response = await client.put(url, headers=headers_dict, json=body_data)
-                elif method == 'PATCH':
-                    body_data = json.loads(body) if isinstance(body, str) else body
-                    response = await client.patch(url, headers=headers_dict, json=body_data)
-                elif method == 'DELETE':
-                    response = await client.delete(url, headers=headers_dict)
+            # Redirects are returned as-is unless the node opts in (custom headers follow them)
+            request_kwargs = {'headers': headers_dict, 'follow_redirects': bool(self.get_property('followRedirects', False))}
+            if method in ('POST', 'PUT', 'PATCH'):
+                request_kwargs['json'] = json.loads(body) if isinstance(body, str) else body
+            elif method not in ('GET', 'DELETE'):
+                raise NodeExecutionError(f"Unsupported HTTP method: {method}")
+            
+            pagination = self.get_property('pagination', 'none')
+            if pagination and pagination != 'none':
+                return {'main': await self._execute_paginated(pagination, method, url, request_kwargs)}
+            
+            # Optional HTTP cache for GET requests
+            cache_responses = method == 'GET' and self.get_property('cacheResponses', False)
+            cache_key = None
+            cached = None
+            if cache_responses:
+                cache_key, cached = lookup_response(url, json_path, headers_dict)
+                if cached and cached['fresh_until'] > time.time():
+                    self.log_execution("Serving fresh response from HTTP cache")
+                    return {'main': self._cached_result(cached, revalidated=False)}
+                if cached:
+                    request_kwargs['headers'] = {**headers_dict, **conditional_headers(cached)}
+            
+            # Shared pooled client; the body is streamed so large responses never sit in memory
+            pool = get_http_pool()
+            
+            async def send() -> Tuple[httpx.Response, bytes, Optional[str], int]:
+                # Runs on the pool's loop, where the streamed response can be read
+                async with pool.stream(method, url, **request_kwargs) as response:
+                    if response.status_code == 304 and cached:
+                        return response, b'', None, 0
+                    response.raise_for_status()
+                    return (response, *await self._read_body(response, max_in_memory))
+            
+            response, content, spill_path, size = await pool.run(send())
+            
+            if response.status_code == 304 and cached:
+                # Not modified: refresh the stored headers and freshness
+                cached['headers'] = {**cached['headers'], **dict(response.headers)}
+                cached['fresh_until'] = fresh_until(response.headers)
+                if is_storable(cached['headers'], headers_dict):
+                    get_response_cache().set(cache_key, cached)
                 else:
-                    raise NodeExecutionError(f"Unsupported HTTP method: {method}")
-                
-                response.raise_for_status()
-                
+                    get_response_cache().delete(cache_key)
+                self.log_execution("Cached response revalidated (304 Not Modified)")
+                return {'main': self._cached_result(cached, revalidated=True)}
+            
+            self.log_execution(f"HTTP request completed with status: {response.status_code} ({size} bytes)")
+            
+            result = {
+                'status_code': response.status_code,
+                'headers': dict(response.headers),
+                'from_cache': False
+            }
+            
+            if spill_path:
+                # Downstream nodes get a handle to the body instead of the body itself
+                result['data'] = project_json_file(spill_path, json_path) if json_path else None
+                result['body_file'] = {
+                    'path': spill_path,
+                    'size': size,
+                    'content_type': response.headers.get('content-type', '')
+                }
+                self.log_execution(f"Response body spilled to {spill_path}")
+            else:
                 try:
-                    response_data = response.json()
-                except:
-                    response_data = response.text
+                    response_data = json.loads(content)
+                except ValueError:
+                    response_data = content.decode(response.encoding or 'utf-8', errors='replace')
                 
-                self.log_execution(f"HTTP request completed with status: {response.status_code}")
+                if json_path and not isinstance(response_data, str):
+                    response_data = project_json_path(response_data, json_path)
+                result['data'] = response_data
                 
-                return {
-                    'main': {
-                        'status_code': response.status_code,
+                # Keep responses that can be reused or revalidated later
+                expires_at = fresh_until(response.headers)
+                if cache_responses and is_storable(response.headers, headers_dict) and (expires_at > time.time() or has_validator(response.headers)):
+                    store_response(url, json_path, headers_dict, response.headers, {
+                        'status_code': result['status_code'],
+                        'headers': result['headers'],
                         'data': response_data,
-                        'headers': dict(response.headers)
-                    }
-                }
+                        'fresh_until': expires_at
+                    })
+            
+            return {'main': result}
         except httpx.HTTPError as e:
             raise NodeExecutionError(f"HTTP request failed: {str(e)}")
     
+    async def _fetch_page(self, method: str, url: str, request_kwargs: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> Tuple[httpx.Response, Any]:
+        """Fetch one page and parse its JSON body"""
+        response = await get_http_pool().request(method, url, params=params, **request_kwargs)
+        response.raise_for_status()
+        try:
+            return response, response.json()
+        except ValueError:
+            raise NodeExecutionError(f"Paginated response from {url} is not JSON")
+    
+    def _page_items(self, body: Any) -> List[Any]:
+        """Extract the items of one page"""
+        items_path = self.get_property('itemsPath', '')
+        items = project_json_path(body, items_path) if items_path else body
+        if items is None:
+            return []
+        return items if isinstance(items, list) else [items]
+    
+    async def _execute_paginated(self, mode: str, method: str, url: str, request_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Follow pagination and collect every item
+        
+        Modes: 'cursor' (next cursor read from cursorPath), 'page' (page number),
+        'offset' (offset/limit) and 'link' (RFC 8288 Link: rel="next").
+        Page and offset modes fetch the remaining pages concurrently once the
+        total item count is known from totalPath.
+        
+        Pages are buffered until the node finishes (the engine passes a node's
+        output downstream once), so fetching stops after maxPages pages or
+        MAX_PAGINATED_BYTES of response data and the result is marked truncated.
+        """
+        config = get_http_node_settings()
+        max_pages = int(self.get_property('maxPages') or config['MAX_PAGES'])
+        max_bytes = config['MAX_PAGINATED_BYTES']
+        concurrency = max(1, int(self.get_property('pageConcurrency') or config['PAGE_CONCURRENCY']))
+        page_size = int(self.get_property('pageSize') or 100)
+        total_path = self.get_property('totalPath', '')
+        
+        pages: List[List[Any]] = []
+        status_code = None
+        buffered = 0
+        # Set when pages were left unfetched because of maxPages or max_bytes
+        capped = False
+        
+        def add_page(response: httpx.Response, body: Any):
+            nonlocal buffered
+            pages.append(self._page_items(body))
+            buffered += len(response.content)
+        
+        def over_budget() -> bool:
+            return bool(max_bytes) and buffered >= max_bytes
+        
+        if mode in ('page', 'offset'):
+            if mode == 'page':
+                page_param = self.get_property('pageParam', 'page')
+                start_page = int(self.get_property('startPage', 1))
+                size_param = self.get_property('pageSizeParam', 'per_page')
+                params_for = lambda index: {page_param: start_page + index, size_param: page_size}
+            else:
+                offset_param = self.get_property('offsetParam', 'offset')
+                limit_param = self.get_property('limitParam', 'limit')
+                params_for = lambda index: {offset_param: index * page_size, limit_param: page_size}
+            
+            response, body = await self._fetch_page(method, url, request_kwargs, params_for(0))
+            status_code = response.status_code
+            add_page(response, body)
+            
+            raw_total = project_json_path(body, total_path) if total_path else None
+            total = parse_total(raw_total)
+            if raw_total is not None and total is None:
+                self.log_execution(f"Ignoring non-numeric total {raw_total!r}; fetching until an empty page")
+            if total is not None:
+                # Total known: fetch the remaining pages concurrently, keeping their order
+                needed = -(-total // page_size)
+                page_count = min(max_pages, needed)
+                if max_bytes and buffered:
+                    # Assume the other pages are about the size of the first
+                    page_count = min(page_count, max(1, max_bytes // buffered))
+                capped = page_count < needed
+                semaphore = asyncio.Semaphore(concurrency)
+                
+                async def fetch(index: int) -> Tuple[httpx.Response, Any]:
+                    async with semaphore:
+                        return await self._fetch_page(method, url, request_kwargs, params_for(index))
+                
+                for page_response, page_body in await asyncio.gather(*(fetch(index) for index in range(1, page_count))):
+                    add_page(page_response, page_body)
+            else:
+                # Unknown total: walk pages until a short or empty one
+                while len(pages[-1]) >= page_size and len(pages) < max_pages and not over_budget():
+                    response, body = await self._fetch_page(method, url, request_kwargs, params_for(len(pages)))
+                    add_page(response, body)
+                capped = len(pages[-1]) >= page_size
+        
+        elif mode == 'cursor':
+            cursor_path = self.get_property('cursorPath', 'next_cursor')
+            cursor_param = self.get_property('cursorParam', 'cursor')
+            params = None
+            while len(pages) < max_pages and not over_budget():
+                response, body = await self._fetch_page(method, url, request_kwargs, params)
+                status_code = response.status_code
+                add_page(response, body)
+                cursor = project_json_path(body, cursor_path)
+                if not cursor or not pages[-1]:
+                    break
+                params = {cursor_param: cursor}
+            else:
+                capped = True
+        
+        elif mode == 'link':
+            next_url = url
+            while next_url and len(pages) < max_pages and not over_budget():
+                response, body = await self._fetch_page(method, next_url, request_kwargs)
+                status_code = response.status_code
+                add_page(response, body)
+                next_url = response.links.get('next', {}).get('url')
+            capped = bool(next_url)
+        
+        else:
+            raise NodeExecutionError(f"Unsupported pagination mode: {mode}")
+        
+        # Hand items downstream in fixed-size batches
+        items = [item for page in pages for item in page]
+        batch_size = max(1, int(self.get_property('batchSize') or page_size))
+        batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+        
+        truncated = capped
+        self.log_execution(f"Fetched {len(items)} items from {len(pages)} pages ({mode} pagination)")
+        if truncated:
+            self.log_execution(f"Pagination stopped after {len(pages)} pages and {buffered} bytes (maxPages / MAX_PAGINATED_BYTES)")
+        
+        return {
+            'status_code': status_code,
+            'pagination': mode,
+            'page_count': len(pages),
+            'item_count': len(items),
+            'bytes': buffered,
+            'truncated': truncated,
+            'batches': batches,
+            'from_cache': False
+        }
+    
+    def _cached_result(self, entry: Dict[str, Any], revalidated: bool) -> Dict[str, Any]:
+        """Build node output from an HTTP cache entry"""
+        return {
+            'status_code': entry['status_code'],
+            'headers': dict(entry['headers']),
+            # Copy so downstream nodes cannot mutate the cached body
+            'data': copy.deepcopy(entry['data']),
+            'from_cache': True,
+            'revalidated': revalidated
+        }
+    
+    async def _read_body(self, response: httpx.Response, max_in_memory: int) -> Tuple[bytes, Optional[str], int]:
+        """
+        Read a streamed body, spilling to a file once it exceeds max_in_memory bytes
+        
+        Returns (in-memory content, spill file path or None, total size).
+        """
+        chunks: List[bytes] = []
+        size = 0
+        spill_file = None
+        
+        try:
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if spill_file is None and size > max_in_memory:
+                    spill_file = open_spill_file()
+                    spill_file.writelines(chunks)
+                    chunks = []
+                
+                if spill_file is not None:
+                    spill_file.write(chunk)
+                else:
+                    chunks.append(chunk)
+        except BaseException:
+            if spill_file is not None:
+                spill_file.close()
+                os.unlink(spill_file.name)
+            raise
+        
+        if spill_file is not None:
+            spill_file.close()
+            return b'', spill_file.name, size
+        return b''.join(chunks), None, size
+    
     async def _execute_google_sheets(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Google Sheets node"""
         self.validate_inputs(inputs, ['main'])
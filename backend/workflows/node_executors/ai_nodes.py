@@ -1,102 +1,13 @@
 """
 AI Node Executors using Alith SDK
 """
-from typing import Dict, Any, List
+from typing import Dict, Any
 from .base import BaseNodeExecutor, NodeExecutionError
+from .llm_pool import run_llm_call, provider_for_model
+from .llm_gateway import get_llm_gateway, resolve_credentials
+from ..token_budget import TokenBudgetedMemory, estimate_tokens, get_agent_context_settings, history_budget
 import os
 import json
-from datetime import datetime
-
-
-class AgentFlowDBMemory:
-    """Custom memory class that uses Django database for persistent storage"""
-    
-    def __init__(self, collection, window_size: int = 20):
-        self.collection = collection
-        self.window_size = window_size
-    
-    def add_user_message(self, content: str):
-        """Add a user message to memory"""
-        from ..models import MemoryMessage
-        MemoryMessage.objects.create(
-            collection=self.collection,
-            role='user',
-            content=content,
-            timestamp=datetime.now()
-        )
-        self._enforce_window_size()
-    
-    def add_ai_message(self, content: str):
-        """Add an AI message to memory"""
-        from ..models import MemoryMessage
-        MemoryMessage.objects.create(
-            collection=self.collection,
-            role='assistant',
-            content=content,
-            timestamp=datetime.now()
-        )
-        self._enforce_window_size()
-    
-    def add_message(self, message):
-        """Add a message object to memory"""
-        from ..models import MemoryMessage
-        MemoryMessage.objects.create(
-            collection=self.collection,
-            role=message.role,
-            content=message.content,
-            timestamp=datetime.now()
-        )
-        self._enforce_window_size()
-    
-    def messages(self) -> List:
-        """Get all messages from memory"""
-        from ..models import MemoryMessage
-        from alith import MessageBuilder
-        
-        db_messages = MemoryMessage.objects.filter(
-            collection=self.collection
-        ).order_by('timestamp')
-        
-        # Convert to Alith message objects
-        messages = []
-        for msg in db_messages:
-            if msg.role == 'user':
-                message = MessageBuilder.new_human_message(msg.content)
-            elif msg.role == 'assistant':
-                message = MessageBuilder.new_ai_message(msg.content)
-            elif msg.role == 'system':
-                message = MessageBuilder.new_system_message(msg.content)
-            else:
-                message = MessageBuilder.new_tool_message(msg.content)
-            
-            messages.append(message)
-        
-        return messages
-    
-    def to_string(self) -> str:
-        """Convert memory to string format"""
-        messages = self.messages()
-        return '\n'.join([f"{msg.role}: {msg.content}" for msg in messages])
-    
-    def clear(self):
-        """Clear all messages from memory"""
-        from ..models import MemoryMessage
-        MemoryMessage.objects.filter(collection=self.collection).delete()
-    
-    def _enforce_window_size(self):
-        """Remove oldest messages if we exceed window size"""
-        from ..models import MemoryMessage
-        
-        total_messages = MemoryMessage.objects.filter(collection=self.collection).count()
-        if total_messages > self.window_size:
-            # Delete oldest messages
-            messages_to_delete = total_messages - self.window_size
-            oldest_messages = MemoryMessage.objects.filter(
-                collection=self.collection
-            ).order_by('timestamp')[:messages_to_delete]
-            
-            for msg in oldest_messages:
-                msg.delete()
 
 
 class AINodeExecutor(BaseNodeExecutor):
@@ -125,8 +36,37 @@ class AINodeExecutor(BaseNodeExecutor):
         
         return await handler(inputs, context)
     
+    def _response_cache_allowed(self) -> bool:
+        """LLM responses are cached only when the node opts in with cacheResponses"""
+        return bool(self.get_property('cacheResponses', False))
+    
+    async def _complete(
+        self,
+        provider: str,
+        model: str,
+        prompt: str,
+        api_key: str,
+        base_url: str,
+        system: str = None,
+        temperature: float = None,
+        **options
+    ) -> Dict[str, Any]:
+        """Run a single-turn completion through the shared LLM gateway"""
+        cache_enabled = self._response_cache_allowed()
+        response = await get_llm_gateway().complete(
+            provider, model, [{'role': 'user', 'content': prompt}], api_key,
+            base_url=base_url, system=system, temperature=temperature, cache=cache_enabled, **options
+        )
+        if response['cached']:
+            self.log_execution("LLM response served from cache")
+        response['llm_cache'] = {'enabled': cache_enabled, 'hit': response['cached']}
+        return response
+    
     async def _execute_ai_agent(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute AI Agent node"""
+        # Set once a conversation is pinned in the in-memory store; released when the node finishes
+        memory_store = None
+        memory_key = None
         try:
             from alith import Agent, WindowBufferMemory
             
@@ -152,191 +92,61 @@ class AINodeExecutor(BaseNodeExecutor):
             # Create memory if provided
             memory = None
             if memory_input:
+                from ..memory_backends import session_key
+                
                 # Get window size from memory input (could be windowSize or maxMessages for legacy)
                 window_size = memory_input.get('window_size', memory_input.get('maxMessages', 20))
                 memory_type = memory_input.get('type', 'WindowBufferMemory')
                 
+                # Handle both ExecutionContext object and dict
+                workflow_id = context.workflow_id if hasattr(context, 'workflow_id') else context.get('workflow_id', 'unknown')
+                trigger_data = context.trigger_data if hasattr(context, 'trigger_data') else context.get('trigger_data')
+                # Chat executions get one conversation per user and channel
+                session = session_key(trigger_data)
+                session_suffix = f"_session_{session}" if session else ''
+                if session:
+                    self.log_execution(f"Using conversation session: {session}")
+                
                 # Handle different memory types
                 if memory_type == 'AgentFlowDBMemory':
                     # Use Django database for persistent memory
-                    from ..models import MemoryCollection, MemoryMessage
-                    from django.db import transaction
-                    from asgiref.sync import sync_to_async
-                    
-                    workflow_id = context.workflow_id if hasattr(context, 'workflow_id') else context.get('workflow_id', 'unknown')
-                    collection_name = f"workflow_{workflow_id}_node_{self.node_id}"
+                    from ..memory_backends import AgentFlowDBMemory, get_db_memory_backend
                     
-                    # Get or create memory collection using sync_to_async
-                    @sync_to_async
-                    def get_or_create_collection():
-                        with transaction.atomic():
-                            collection, created = MemoryCollection.objects.get_or_create(
-                                name=collection_name,
-                                defaults={
-                                    'workflow_id': workflow_id,
-                                    'node_id': self.node_id,
-                                    'window_size': window_size,
-                                    'description': 'Agent Flow Database Memory'
-                                }
-                            )
-                        return collection, created
+                    collection_name = f"workflow_{workflow_id}_node_{self.node_id}{session_suffix}"
                     
-                    collection, created = await get_or_create_collection()
+                    backend = get_db_memory_backend()
+                    collection, created = await backend.run(
+                        backend.get_or_create_collection, collection_name, workflow_id, self.node_id, window_size
+                    )
                     
                     if created:
                         self.log_execution(f"Created new database memory collection: {collection_name}")
                     else:
                         self.log_execution(f"Loaded existing database memory collection: {collection_name}")
                     
-                    # Create a custom memory class that uses Django database with proper persistence
-                    # We'll use a thread-safe approach to avoid async context issues
-                    import threading
-                    from concurrent.futures import ThreadPoolExecutor
-                    
-                    class ThreadSafeDBMemory:
-                        def __init__(self, collection, window_size):
-                            self.collection = collection
-                            self.window_size = window_size
-                            self._messages = []
-                            self._executor = ThreadPoolExecutor(max_workers=1)
-                            self._load_messages_from_db()
-                        
-                        def _load_messages_from_db(self):
-                            """Load messages from database using thread pool"""
-                            def _load():
-                                try:
-                                    from ..models import MemoryMessage
-                                    db_messages = MemoryMessage.objects.filter(
-                                        collection=self.collection
-                                    ).order_by('timestamp')
-                                    
-                                    from alith import MessageBuilder
-                                    messages = []
-                                    for msg in db_messages:
-                                        if msg.role == 'user':
-                                            message = MessageBuilder.new_human_message(msg.content)
-                                        elif msg.role == 'assistant':
-                                            message = MessageBuilder.new_ai_message(msg.content)
-                                        elif msg.role == 'system':
-                                            message = MessageBuilder.new_system_message(msg.content)
-                                        else:
-                                            message = MessageBuilder.new_tool_message(msg.content)
-                                        
-                                        messages.append(message)
-                                    return messages
-                                except Exception as e:
-                                    print(f"Error loading messages from DB: {e}")
-                                    return []
-                            
-                            try:
-                                future = self._executor.submit(_load)
-                                self._messages = future.result(timeout=5)
-                            except Exception as e:
-                                print(f"Error in thread pool: {e}")
-                                self._messages = []
-                        
-                        def add_user_message(self, content: str):
-                            from alith import MessageBuilder
-                            message = MessageBuilder.new_human_message(content)
-                            self._messages.append(message)
-                            self._enforce_window_size()
-                            self._save_to_db('user', content)
-                        
-                        def add_ai_message(self, content: str):
-                            from alith import MessageBuilder
-                            message = MessageBuilder.new_ai_message(content)
-                            self._messages.append(message)
-                            self._enforce_window_size()
-                            self._save_to_db('assistant', content)
-                        
-                        def add_message(self, message):
-                            self._messages.append(message)
-                            self._enforce_window_size()
-                            self._save_to_db(message.role, message.content)
-                        
-                        def messages(self):
-                            return self._messages
-                        
-                        def to_string(self):
-                            return '\n'.join([f"{msg.role}: {msg.content}" for msg in self._messages])
-                        
-                        def clear(self):
-                            self._messages.clear()
-                            def _clear():
-                                try:
-                                    from ..models import MemoryMessage
-                                    MemoryMessage.objects.filter(collection=self.collection).delete()
-                                except Exception as e:
-                                    print(f"Error clearing DB messages: {e}")
-                            
-                            try:
-                                future = self._executor.submit(_clear)
-                                future.result(timeout=5)
-                            except Exception as e:
-                                print(f"Error in clear thread: {e}")
-                        
-                        def _enforce_window_size(self):
-                            if len(self._messages) > self.window_size:
-                                # Remove oldest messages
-                                messages_to_remove = len(self._messages) - self.window_size
-                                self._messages = self._messages[messages_to_remove:]
-                        
-                        def _save_to_db(self, role: str, content: str):
-                            """Save message to database using thread pool"""
-                            def _save():
-                                try:
-                                    from ..models import MemoryMessage
-                                    MemoryMessage.objects.create(
-                                        collection=self.collection,
-                                        role=role,
-                                        content=content,
-                                        timestamp=datetime.now()
-                                    )
-                                    self._enforce_window_size_db()
-                                except Exception as e:
-                                    print(f"Error saving to DB: {e}")
-                            
-                            try:
-                                future = self._executor.submit(_save)
-                                future.result(timeout=5)
-                            except Exception as e:
-                                print(f"Error in save thread: {e}")
-                        
-                        def _enforce_window_size_db(self):
-                            """Enforce window size in database"""
-                            try:
-                                from ..models import MemoryMessage
-                                total_messages = MemoryMessage.objects.filter(collection=self.collection).count()
-                                if total_messages > self.window_size:
-                                    messages_to_delete = total_messages - self.window_size
-                                    oldest_messages = MemoryMessage.objects.filter(
-                                        collection=self.collection
-                                    ).order_by('timestamp')[:messages_to_delete]
-                                    
-                                    for msg in oldest_messages:
-                                        msg.delete()
-                            except Exception as e:
-                                print(f"Error enforcing DB window size: {e}")
-                    
-                    memory = ThreadSafeDBMemory(collection, window_size)
+                    # Only the newest window_size messages are read
+                    memory = await AgentFlowDBMemory.load(collection, window_size, backend)
                     
                     # Get message count
                     message_count = len(memory.messages())
                     self.log_execution(f"Database memory has {message_count} messages")
                     
                 else:
-                    # Use global memory storage for in-memory persistence
-                    from ..execution_engine import _global_memory_storage
-                    # Handle both ExecutionContext object and dict
-                    workflow_id = context.workflow_id if hasattr(context, 'workflow_id') else context.get('workflow_id', 'unknown')
-                    memory_key = f"memory_{self.node_id}_{workflow_id}"
+                    # Bounded in-process store; evicted conversations are spilled to the database
+                    from ..memory_backends import get_memory_store
+                    key = f"memory_{self.node_id}_{workflow_id}{session_suffix}"
+                    store = get_memory_store()
                     
-                    if memory_key in _global_memory_storage:
-                        memory = _global_memory_storage[memory_key]
+                    memory, memory_status = await store.acquire(
+                        key, lambda: WindowBufferMemory(window_size=window_size),
+                        window_size, workflow_id, self.node_id
+                    )
+                    memory_store, memory_key = store, key
+                    if memory_status == 'hit':
                         self.log_execution(f"Loaded existing WindowBufferMemory with {len(memory.messages())} messages")
+                    elif memory_status == 'rehydrated':
+                        self.log_execution(f"Rehydrated WindowBufferMemory with {len(memory.messages())} messages")
                     else:
-                        memory = WindowBufferMemory(window_size=window_size)
-                        _global_memory_storage[memory_key] = memory
                         self.log_execution(f"Created new WindowBufferMemory with window_size: {window_size}")
                 
                 # Log current memory state
@@ -392,18 +202,21 @@ class AINodeExecutor(BaseNodeExecutor):
                         tool_type = tool_config.get('tool_type', '')
                         
                         if tool_type == 'duckduckgo-search':
-                            from .duckduckgo_tool import create_duckduckgo_tool
+                            from .duckduckgo_tool import (
+                                create_duckduckgo_tool, create_brave_search_tool, create_duckduckgo_multi_search_tool
+                            )
                             max_results = tool_config.get('maxResults', 5)
                             region = tool_config.get('region', 'us-en')
                             duckduckgo_tool = create_duckduckgo_tool(max_results=max_results, region=region)
                             tool_instances.append(duckduckgo_tool)
                             
-                            # Also create a brave_search alias to handle AI model preferences
-                            brave_tool = create_duckduckgo_tool(max_results=max_results, region=region)
-                            # Override the name to be brave_search
-                            brave_tool.name = "brave_search"
-                            brave_tool.description = "Search the web using DuckDuckGo for privacy-focused search results (Brave Search compatible)"
-                            tool_instances.append(brave_tool)
+                            # Also add a brave_search alias to handle AI model preferences
+                            # (both names share one cached search backend)
+                            tool_instances.append(create_brave_search_tool(max_results=max_results, region=region))
+                            
+                            # Batch variant: the agent runtime runs tool calls one at a time, so
+                            # independent searches are fanned out inside a single call instead
+                            tool_instances.append(create_duckduckgo_multi_search_tool(max_results=max_results, region=region))
                             
                             self.log_execution(f"Added DuckDuckGo tool with maxResults={max_results}, region={region}")
                             self.log_execution(f"Also added brave_search alias for AI model compatibility")
@@ -443,9 +256,28 @@ class AINodeExecutor(BaseNodeExecutor):
                 if tool_info:
                     enhanced_system_prompt += f"\n\nAvailable tools:\n" + "\n".join(tool_info)
                     enhanced_system_prompt += "\n\nIMPORTANT: Only use the exact tool names listed above. Do not use alternative names like 'brave_search' - use the exact names provided."
+                    if any(getattr(tool, 'name', '') == 'duckduckgo_multi_search' for tool in tool_instances):
+                        enhanced_system_prompt += "\nWhen you need several independent searches, make one duckduckgo_multi_search call with all queries instead of separate searches."
             
             self.log_execution(f"Enhanced system prompt: {enhanced_system_prompt[:200]}...")
             
+            # Get prompt from input
+            prompt = main_input.get('text') or main_input.get('message') or main_input.get('prompt', '')
+            if not prompt:
+                raise NodeExecutionError("No prompt provided to AI Agent")
+            
+            # The agent sees only the newest history that fits the model's token budget
+            context_config = get_agent_context_settings()
+            system_tokens = estimate_tokens(enhanced_system_prompt)
+            prompt_tokens = estimate_tokens(prompt)
+            agent_memory = memory
+            if memory:
+                budget = history_budget(
+                    model, system_tokens, prompt_tokens, max_tokens, memory_input.get('token_budget'), context_config
+                )
+                agent_memory = TokenBudgetedMemory(memory, budget, prompt, context_config['MIN_TRUNCATED_TOKENS'])
+                self.log_execution(f"Conversation history budget: {budget} tokens")
+            
             # Create agent
             agent = Agent(
                 name=self.label,
@@ -453,15 +285,10 @@ class AINodeExecutor(BaseNodeExecutor):
                 api_key=api_key,
                 base_url=base_url,
                 preamble=enhanced_system_prompt,
-                memory=memory,
+                memory=agent_memory,
                 tools=tool_instances if tool_instances else []
             )
             
-            # Get prompt from input
-            prompt = main_input.get('text') or main_input.get('message') or main_input.get('prompt', '')
-            if not prompt:
-                raise NodeExecutionError("No prompt provided to AI Agent")
-            
             self.log_execution(f"Executing AI Agent with prompt: {prompt[:100]}...")
             
             # Log memory state before execution
@@ -471,8 +298,13 @@ class AINodeExecutor(BaseNodeExecutor):
                 if current_messages:
                     self.log_execution(f"Latest message: {current_messages[-1].content[:50]}...")
             
-            # Execute
-            response = agent.prompt(prompt)
+            # Execute off the event loop
+            try:
+                response = await run_llm_call(provider_for_model(model), agent.prompt, prompt)
+            finally:
+                # Write the turn's buffered memory messages in one batch
+                if hasattr(memory, 'aflush'):
+                    await memory.aflush()
             
             # Log memory state after execution
             if memory:
@@ -481,12 +313,28 @@ class AINodeExecutor(BaseNodeExecutor):
             
             self.log_execution(f"AI Agent response: {response[:100]}...")
             
+            # Estimated token counts of this request
+            history_report = agent_memory.report if isinstance(agent_memory, TokenBudgetedMemory) else {}
+            token_usage = {
+                'estimated': True,
+                'system': system_tokens,
+                'prompt': prompt_tokens,
+                'history': history_report.get('history_tokens', 0),
+                'completion': estimate_tokens(response),
+                **history_report,
+            }
+            token_usage['total'] = (
+                token_usage['system'] + token_usage['prompt'] + token_usage['history'] + token_usage['completion']
+            )
+            self.log_execution(f"Estimated tokens: {token_usage['total']} (history {token_usage['history']})")
+            
             return {
                 'main': {
                     'text': response,
                     'prompt': prompt,
                     'model': model,
-                    'temperature': temperature
+                    'temperature': temperature,
+                    'token_usage': token_usage
                 }
             }
             
@@ -494,13 +342,15 @@ class AINodeExecutor(BaseNodeExecutor):
             raise NodeExecutionError("Alith SDK not installed. Please install: pip install alith")
         except Exception as e:
             raise NodeExecutionError(f"AI Agent execution failed: {str(e)}")
+        finally:
+            # Unpin the conversation and account for its new size in the store budget
+            if memory_store is not None:
+                memory_store.release(memory_key)
     
     async def _execute_openai(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute OpenAI node"""
         try:
-            from alith import Agent
-            
-            api_key = context.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
+            api_key, base_url = resolve_credentials('openai', context, self.get_property('api_key', ''))
             if not api_key:
                 raise NodeExecutionError("OpenAI API key not found")
             
@@ -513,20 +363,18 @@ class AINodeExecutor(BaseNodeExecutor):
             if not message:
                 raise NodeExecutionError("No message provided to OpenAI node")
             
-            agent = Agent(
-                name=self.label,
-                model='gpt-4-turbo',
-                api_key=api_key
-            )
-            
             self.log_execution(f"Calling OpenAI with message: {message[:100]}...")
-            response = agent.prompt(message)
+            response = await self._complete(
+                'openai', 'gpt-4-turbo', message, api_key, base_url,
+                temperature=self.get_property('temperature')
+            )
             
             return {
                 'main': {
-                    'text': response,
+                    'text': response['text'],
                     'operation': operation,
-                    'input': message
+                    'input': message,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -536,17 +384,10 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_groq(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Groq node"""
         try:
-            from alith import Agent
-            
             # Get API key from node properties first, then context, then environment
-            api_key = self.get_property('api_key', '') or context.get('groq_api_key') or os.getenv('GROQ_API_KEY')
+            api_key, base_url = resolve_credentials('groq', context, self.get_property('api_key', ''))
             
-            # Debug logging
-            self.log_execution(f"Groq API key sources:")
-            self.log_execution(f"  - Node properties: {self.properties}")
-            self.log_execution(f"  - Context groq_api_key: {context.get('groq_api_key')}")
-            self.log_execution(f"  - Environment GROQ_API_KEY: {os.getenv('GROQ_API_KEY')}")
-            self.log_execution(f"  - Final API key: {api_key[:10] + '...' if api_key else 'None'}")
+            self.log_execution(f"Groq API key: {api_key[:10] + '...' if api_key else 'None'}")
             
             if not api_key:
                 raise NodeExecutionError("Groq API key not found. Please configure it in the node settings.")
@@ -571,29 +412,26 @@ class AINodeExecutor(BaseNodeExecutor):
                         'model': model,
                         'temperature': temperature,
                         'max_tokens': max_tokens,
-                        'base_url': "https://api.groq.com/openai/v1",
+                        'base_url': base_url,
                         'api_key': api_key  # Pass API key to AI Agent
                     }
                 }
             
             # If there is input, execute the model
-            agent = Agent(
-                name=self.label,
-                model=model,
-                api_key=api_key,
-                base_url="https://api.groq.com/openai/v1"
-            )
-            
             self.log_execution(f"Calling Groq ({model}) with message: {message[:100]}...")
-            response = agent.prompt(message)
+            response = await self._complete(
+                'groq', model, message, api_key, base_url,
+                temperature=temperature, max_tokens=max_tokens
+            )
             
             return {
                 'main': {
-                    'text': response,
+                    'text': response['text'],
                     'model': model,
                     'temperature': temperature,
                     'max_tokens': max_tokens,
-                    'input': message
+                    'input': message,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -603,9 +441,7 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_anthropic(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Anthropic (Claude) node"""
         try:
-            from alith import Agent
-            
-            api_key = context.get('anthropic_api_key') or os.getenv('ANTHROPIC_API_KEY')
+            api_key, base_url = resolve_credentials('anthropic', context, self.get_property('api_key', ''))
             if not api_key:
                 raise NodeExecutionError("Anthropic API key not found")
             
@@ -618,21 +454,18 @@ class AINodeExecutor(BaseNodeExecutor):
             if not prompt:
                 raise NodeExecutionError("No prompt provided to Anthropic node")
             
-            agent = Agent(
-                name=self.label,
-                model=model,
-                api_key=api_key,
-                base_url="https://api.anthropic.com/v1"
-            )
-            
             self.log_execution(f"Calling Anthropic ({model}) with prompt: {prompt[:100]}...")
-            response = agent.prompt(prompt)
+            response = await self._complete(
+                'anthropic', model, prompt, api_key, base_url,
+                temperature=self.get_property('temperature')
+            )
             
             return {
                 'main': {
-                    'text': response,
+                    'text': response['text'],
                     'model': model,
-                    'input': prompt
+                    'input': prompt,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -642,9 +475,7 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_google_gemini(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Google Gemini node"""
         try:
-            from alith import Agent
-            
-            api_key = context.get('google_api_key') or os.getenv('GOOGLE_API_KEY')
+            api_key, base_url = resolve_credentials('google', context, self.get_property('api_key', ''))
             if not api_key:
                 raise NodeExecutionError("Google API key not found")
             
@@ -657,21 +488,18 @@ class AINodeExecutor(BaseNodeExecutor):
             if not prompt:
                 raise NodeExecutionError("No prompt provided to Google Gemini node")
             
-            agent = Agent(
-                name=self.label,
-                model=model,
-                api_key=api_key,
-                base_url="https://generativelanguage.googleapis.com/v1"
-            )
-            
             self.log_execution(f"Calling Google Gemini ({model}) with prompt: {prompt[:100]}...")
-            response = agent.prompt(prompt)
+            response = await self._complete(
+                'google', model, prompt, api_key, base_url,
+                temperature=self.get_property('temperature')
+            )
             
             return {
                 'main': {
-                    'text': response,
+                    'text': response['text'],
                     'model': model,
-                    'input': prompt
+                    'input': prompt,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -706,7 +534,7 @@ class AINodeExecutor(BaseNodeExecutor):
                 chunks = chunk_text(doc, max_chunk_token_size=200)
                 all_chunks.extend(chunks)
             
-            store.save_docs(all_chunks)
+            await run_llm_call('openai', store.save_docs, all_chunks)
             
             # Create agent with RAG
             api_key = context.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
@@ -718,7 +546,7 @@ class AINodeExecutor(BaseNodeExecutor):
             )
             
             self.log_execution(f"Answering question: {question}")
-            answer = agent.prompt(question)
+            answer = await run_llm_call('openai', agent.prompt, question)
             
             return {
                 'main': {
@@ -734,8 +562,6 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_summarization(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Summarization Chain"""
         try:
-            from alith import Agent
-            
             self.validate_inputs(inputs, ['main'])
             
             text = inputs.get('main', {}).get('text', '')
@@ -744,22 +570,24 @@ class AINodeExecutor(BaseNodeExecutor):
             
             max_length = self.get_property('maxLength', 500)
             
-            api_key = context.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
-            agent = Agent(
-                name=self.label,
-                model='gpt-4-turbo',
-                api_key=api_key,
-                preamble=f"You are a summarization assistant. Summarize the following text in approximately {max_length} words or less."
-            )
+            api_key, base_url = resolve_credentials('openai', context, self.get_property('api_key', ''))
+            if not api_key:
+                raise NodeExecutionError("OpenAI API key not found")
             
             self.log_execution(f"Summarizing text of length: {len(text)}")
-            summary = agent.prompt(text)
+            response = await self._complete(
+                'openai', 'gpt-4-turbo', text, api_key, base_url,
+                system=f"You are a summarization assistant. Summarize the following text in approximately {max_length} words or less.",
+                temperature=self.get_property('temperature')
+            )
+            summary = response['text']
             
             return {
                 'main': {
                     'summary': summary,
                     'original_length': len(text),
-                    'summary_length': len(summary)
+                    'summary_length': len(summary),
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -769,9 +597,6 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_extractor(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Information Extractor"""
         try:
-            from alith import Agent, Extractor
-            from pydantic import BaseModel, create_model
-            
             self.validate_inputs(inputs, ['main'])
             
             text = inputs.get('main', {}).get('text', '')
@@ -785,22 +610,37 @@ class AINodeExecutor(BaseNodeExecutor):
             if not fields:
                 raise NodeExecutionError("No extraction schema defined")
             
-            # Create dynamic Pydantic model
-            field_definitions = {field: (str, ...) for field in fields}
-            ExtractionModel = create_model('ExtractionModel', **field_definitions)
+            api_key, base_url = resolve_credentials('openai', context, self.get_property('api_key', ''))
+            if not api_key:
+                raise NodeExecutionError("OpenAI API key not found")
             
-            api_key = context.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
-            agent = Agent(model='gpt-4-turbo', api_key=api_key)
+            self.log_execution(f"Extracting fields: {', '.join(fields)}")
+            response = await self._complete(
+                'openai', 'gpt-4-turbo', text, api_key, base_url,
+                system=(
+                    "You extract information from text. Respond with a JSON object whose keys are exactly: "
+                    f"{', '.join(fields)}. Every value must be a string."
+                ),
+                temperature=self.get_property('temperature'),
+                response_format={'type': 'json_object'}
+            )
             
-            extractor = Extractor(agent=agent, model=ExtractionModel)
+            # JSON mode returns an object; fall back to the outermost braces if the model wrapped it
+            content = response['text'].strip()
+            try:
+                data = json.loads(content)
+            except ValueError:
+                data = json.loads(content[content.find('{'):content.rfind('}') + 1])
             
-            self.log_execution(f"Extracting fields: {', '.join(fields)}")
-            result = extractor.extract(text)
+            missing = [field for field in fields if field not in data]
+            if missing:
+                raise NodeExecutionError(f"Extraction result is missing fields: {', '.join(missing)}")
             
             return {
                 'main': {
-                    'extracted': result.dict(),
-                    'fields': fields
+                    'extracted': {field: '' if data[field] is None else str(data[field]) for field in fields},
+                    'fields': fields,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -810,8 +650,6 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_classifier(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Text Classifier"""
         try:
-            from alith import Agent
-            
             text = self.get_property('text', '')
             if not text:
                 text = inputs.get('main', {}).get('text', '')
@@ -822,22 +660,23 @@ class AINodeExecutor(BaseNodeExecutor):
             categories = self.get_property('categories', 'positive, negative, neutral')
             category_list = [cat.strip() for cat in categories.split(',')]
             
-            api_key = context.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
-            agent = Agent(
-                name=self.label,
-                model='gpt-4-turbo',
-                api_key=api_key,
-                preamble=f"You are a text classifier. Classify the following text into one of these categories: {', '.join(category_list)}. Respond with only the category name."
-            )
+            api_key, base_url = resolve_credentials('openai', context, self.get_property('api_key', ''))
+            if not api_key:
+                raise NodeExecutionError("OpenAI API key not found")
             
             self.log_execution(f"Classifying text into categories: {category_list}")
-            category = agent.prompt(text)
+            response = await self._complete(
+                'openai', 'gpt-4-turbo', text, api_key, base_url,
+                system=f"You are a text classifier. Classify the following text into one of these categories: {', '.join(category_list)}. Respond with only the category name.",
+                temperature=self.get_property('temperature')
+            )
             
             return {
                 'main': {
-                    'category': category.strip(),
+                    'category': response['text'].strip(),
                     'text': text,
-                    'available_categories': category_list
+                    'available_categories': category_list,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -847,8 +686,6 @@ class AINodeExecutor(BaseNodeExecutor):
     async def _execute_sentiment(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute Sentiment Analysis"""
         try:
-            from alith import Agent
-            
             text = self.get_property('text', '')
             if not text:
                 text = inputs.get('main', {}).get('text', '')
@@ -856,16 +693,17 @@ class AINodeExecutor(BaseNodeExecutor):
             if not text:
                 raise NodeExecutionError("No text provided for sentiment analysis")
             
-            api_key = context.get('openai_api_key') or os.getenv('OPENAI_API_KEY')
-            agent = Agent(
-                name=self.label,
-                model='gpt-4-turbo',
-                api_key=api_key,
-                preamble="You are a sentiment analysis assistant. Analyze the sentiment of the text and respond with: positive, negative, or neutral, followed by a confidence score (0-1)."
-            )
+            api_key, base_url = resolve_credentials('openai', context, self.get_property('api_key', ''))
+            if not api_key:
+                raise NodeExecutionError("OpenAI API key not found")
             
             self.log_execution("Analyzing sentiment...")
-            result = agent.prompt(text)
+            response = await self._complete(
+                'openai', 'gpt-4-turbo', text, api_key, base_url,
+                system="You are a sentiment analysis assistant. Analyze the sentiment of the text and respond with: positive, negative, or neutral, followed by a confidence score (0-1).",
+                temperature=self.get_property('temperature')
+            )
+            result = response['text']
             
             # Parse result
             parts = result.lower().split()
@@ -882,7 +720,8 @@ class AINodeExecutor(BaseNodeExecutor):
                 'main': {
                     'sentiment': sentiment,
                     'confidence': confidence,
-                    'text': text
+                    'text': text,
+                    'llm_cache': response['llm_cache']
                 }
             }
             
@@ -895,6 +734,10 @@ class ChatModelExecutor(BaseNodeExecutor):
     
     async def execute(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute chat model nodes - these provide configuration for AI agents"""
+        return self.build_config()
+    
+    def build_config(self) -> Dict[str, Any]:
+        """Build the chat model configuration from node properties alone"""
         model = self.get_property('model', 'gpt-4-turbo')
         temperature = self.get_property('temperature', 0.7)
         max_tokens = self.get_property('max_tokens', 1024)
@@ -926,7 +769,10 @@ class MemoryExecutor(BaseNodeExecutor):
     
     async def execute(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute memory nodes - these provide memory configuration using Alith SDK"""
-        
+        return self.build_config()
+    
+    def build_config(self) -> Dict[str, Any]:
+        """Build the memory configuration from node properties alone"""
         try:
             from alith import WindowBufferMemory
             
@@ -940,6 +786,7 @@ class MemoryExecutor(BaseNodeExecutor):
                 memory_config.update({
                     'type': 'WindowBufferMemory',
                     'window_size': window_size,
+                    'token_budget': self.get_property('maxContextTokens'),
                     'description': 'Maintains a sliding window of recent messages using Alith SDK'
                 })
                 
@@ -948,6 +795,7 @@ class MemoryExecutor(BaseNodeExecutor):
                 memory_config.update({
                     'type': 'AgentFlowDBMemory',
                     'window_size': window_size,
+                    'token_budget': self.get_property('maxContextTokens'),
                     'description': 'Persistent memory storage using Django database',
                     'storage_type': 'database'
                 })
@@ -989,7 +837,10 @@ class ToolExecutor(BaseNodeExecutor):
     
     async def execute(self, inputs: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute tool nodes - these provide tools for AI agents"""
-        
+        return self.build_config()
+    
+    def build_config(self) -> Dict[str, Any]:
+        """Build the tool configuration from node properties alone"""
         if self.node_type == 'calculator':
             precision = self.get_property('precision', 2)
             return {
@@ -0,0 +1,106 @@
+"""
+Long-lived background event loop for loop-bound shared resources
+Lets pooled httpx clients and asyncio semaphores outlive the per-call loops of async_to_sync
+"""
+from typing import Any, AsyncIterator, Awaitable, Optional
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a bridged async iterator
+_EXHAUSTED = object()
+
+
+class BackgroundLoop:
+    """
+    Event loop running forever on a daemon thread.
+
+    httpx clients and asyncio primitives are bound to the loop they are first
+    used on, while async_to_sync runs every synchronous entry point on a new
+    loop. Resources that should be shared process-wide are created and used
+    only on this loop; callers on any other loop or thread hand their
+    coroutines over with run() or run_sync().
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The background loop, started on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def is_current(self) -> bool:
+        """Whether the caller is running on the background loop"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def run(self, coroutine: Awaitable) -> Any:
+        """
+        Await a coroutine on the background loop from any event loop.
+
+        Cancelling the caller cancels the coroutine on the background loop.
+        """
+        if self.is_current():
+            return await coroutine
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    def run_sync(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop from synchronous code"""
+        if self.is_current():
+            raise RuntimeError(f"run_sync() called from the {self.name} loop itself")
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=timeout)
+
+    async def iterate(self, iterator: AsyncIterator) -> AsyncIterator:
+        """Consume an async iterator that runs on the background loop"""
+        if self.is_current():
+            async for item in iterator:
+                yield item
+            return
+
+        async def step():
+            try:
+                return await iterator.__anext__()
+            except StopAsyncIteration:
+                return _EXHAUSTED
+
+        try:
+            while True:
+                item = await self.run(step())
+                if item is _EXHAUSTED:
+                    return
+                yield item
+        finally:
+            aclose = getattr(iterator, 'aclose', None)
+            if aclose is not None:
+                try:
+                    await self.run(aclose())
+                except Exception as e:
+                    logger.debug(f"Failed to close bridged iterator: {str(e)}")
+
+    def close(self, cleanup: Optional[Awaitable] = None, timeout: float = 5.0):
+        """Run an optional cleanup coroutine, then stop the loop (used at interpreter exit)"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None or loop.is_closed():
+            if cleanup is not None and asyncio.iscoroutine(cleanup):
+                cleanup.close()
+            return
+        try:
+            if cleanup is not None:
+                asyncio.run_coroutine_threadsafe(cleanup, loop).result(timeout=timeout)
+        except Exception as e:
+            logger.debug(f"{self.name} cleanup failed: {str(e)}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
@@ -7,7 +7,8 @@ import json
 from urllib.parse import quote_plus
 from alith import Tool
 from pydantic import BaseModel
-from ddgs import DDGS
+from .search_backend import get_search_backend
+from .tool_dispatch import get_tool_dispatcher
 
 
 class DuckDuckGoSearchParameters(BaseModel):
@@ -15,6 +16,11 @@ class DuckDuckGoSearchParameters(BaseModel):
     query: str
 
 
+class DuckDuckGoMultiSearchParameters(BaseModel):
+    """Parameters for the batch DuckDuckGo search tool"""
+    queries: List[str]
+
+
 class DuckDuckGoSearchTool:
     """DuckDuckGo search tool for AI agents"""
     
@@ -24,46 +30,8 @@ class DuckDuckGoSearchTool:
         self.base_url = "https://api.duckduckgo.com/"
     
     def search(self, query: str) -> Dict[str, Any]:
-        """Perform a DuckDuckGo search using DDGS library"""
-        try:
-            print(f"Searching for: {query}")
-            print(f"Max results: {self.max_results}")
-            print(f"Region: {self.region}")
-            
-            # Use DDGS library for better search results
-            with DDGS() as ddgs:
-                results = []
-                search_results = ddgs.text(
-                    query=query, 
-                    region=self.region, 
-                    max_results=self.max_results
-                )
-                
-                for result in search_results:
-                    results.append({
-                        'title': result.get('title', ''),
-                        'snippet': result.get('body', ''),
-                        'url': result.get('href', ''),
-                        'type': 'web_result'
-                    })
-                
-                print(f"Found {len(results)} results")
-                
-                return {
-                    'query': query,
-                    'results': results,
-                    'total_results': len(results),
-                    'region': self.region
-                }
-            
-        except Exception as e:
-            print(f"Search error: {e}")
-            return {
-                'query': query,
-                'error': f"Search failed: {str(e)}",
-                'results': [],
-                'total_results': 0
-            }
+        """Perform a DuckDuckGo search through the shared, cached backend"""
+        return get_search_backend().search(query, region=self.region, max_results=self.max_results)
     
     def get_tool_definition(self) -> Dict[str, Any]:
         """Get tool definition for AI agent"""
@@ -102,11 +70,25 @@ class DuckDuckGoSearchTool:
             )
         
         return f"Search results for '{query}':\n\n" + "\n".join(formatted_results)
+    
+    def execute_batch(self, queries: List[str]) -> str:
+        """Run several searches concurrently and return the formatted results in query order"""
+        results = get_tool_dispatcher().map(self.execute_tool, queries)
+        sections = [
+            f"Search error for '{query}': {result}" if isinstance(result, Exception) else result
+            for query, result in zip(queries, results)
+        ]
+        return "\n\n---\n\n".join(sections)
 
 
-def create_duckduckgo_tool(max_results: int = 5, region: str = 'us-en') -> Tool:
+def create_duckduckgo_tool(
+    max_results: int = 5,
+    region: str = 'us-en',
+    name: str = "duckduckgo_search",
+    description: str = "Search the web using DuckDuckGo for privacy-focused search results"
+) -> Tool:
     """Create a DuckDuckGo search tool instance"""
-    # Create the search tool instance
+    # Create the search tool instance (all instances share one cached search backend)
     search_tool = DuckDuckGoSearchTool(max_results=max_results, region=region)
     
     # Create Alith Tool with proper handler
@@ -116,15 +98,37 @@ def create_duckduckgo_tool(max_results: int = 5, region: str = 'us-en') -> Tool:
     
     # Create and return Alith Tool
     return Tool(
-        name="duckduckgo_search",
-        description="Search the web using DuckDuckGo for privacy-focused search results",
+        name=name,
+        description=description,
         parameters=DuckDuckGoSearchParameters,
         handler=search_handler,
         version="1.0.0",
         author="Agent Flow"
     )
 
+def create_duckduckgo_multi_search_tool(max_results: int = 5, region: str = 'us-en') -> Tool:
+    """Create a tool that runs several DuckDuckGo searches in one call"""
+    search_tool = DuckDuckGoSearchTool(max_results=max_results, region=region)
+    
+    def multi_search_handler(queries: List[str]) -> str:
+        """Handler function for the batch search tool"""
+        return search_tool.execute_batch(queries)
+    
+    return Tool(
+        name="duckduckgo_multi_search",
+        description="Run several DuckDuckGo web searches at once; pass every query you need in one call",
+        parameters=DuckDuckGoMultiSearchParameters,
+        handler=multi_search_handler,
+        version="1.0.0",
+        author="Agent Flow"
+    )
+
 def create_brave_search_tool(max_results: int = 5, region: str = 'us-en') -> Tool:
     """Create a Brave search tool instance (alias for DuckDuckGo)"""
-    # This is actually the same as DuckDuckGo tool but with different name
-    return create_duckduckgo_tool(max_results=max_results, region=region)
\ No newline at end of file
+    # Same backend and cache as DuckDuckGo, exposed under the name some models prefer
+    return create_duckduckgo_tool(
+        max_results=max_results,
+        region=region,
+        name="brave_search",
+        description="Search the web using DuckDuckGo for privacy-focused search results (Brave Search compatible)"
+    )
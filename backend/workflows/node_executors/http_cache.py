@@ -0,0 +1,146 @@
+"""
+HTTP response cache for HTTP Request nodes
+Freshness and revalidation follow Cache-Control, Expires, ETag and Last-Modified
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from email.utils import parsedate_to_datetime
+import time
+
+from ..caching import make_cache_key
+
+# Upper bound for heuristic freshness of responses that only carry Last-Modified
+MAX_HEURISTIC_FRESHNESS = 24 * 60 * 60
+
+# Request headers that identify the caller
+CREDENTIAL_HEADERS = ('authorization', 'proxy-authorization', 'cookie')
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: argument}"""
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, argument = part.partition('=')
+        directives[name.strip().lower()] = argument.strip().strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def has_credentials(request_headers: Dict[str, str]) -> bool:
+    """Whether a request carries Authorization, cookies or an API key header"""
+    for name in request_headers:
+        name = name.lower()
+        if name in CREDENTIAL_HEADERS or any(marker in name for marker in ('api-key', 'api_key', 'apikey')):
+            return True
+    return False
+
+
+def vary_headers(headers) -> Optional[List[str]]:
+    """Request header names a response varies on, or None for `Vary: *`"""
+    names = sorted({name.strip().lower() for name in (headers.get('vary') or '').split(',') if name.strip()})
+    return None if '*' in names else names
+
+
+def is_storable(headers, request_headers: Optional[Dict[str, str]] = None) -> bool:
+    """
+    Whether a response may be kept in the cache, which is shared by every
+    workflow: `no-store`, `private` and `Vary: *` responses never are, and
+    responses to requests with credentials only when marked `public` or
+    given an `s-maxage`.
+    """
+    directives = parse_cache_control(headers.get('cache-control'))
+    if 'no-store' in directives or 'private' in directives or vary_headers(headers) is None:
+        return False
+    if request_headers and has_credentials(request_headers):
+        return 'public' in directives or 's-maxage' in directives
+    return True
+
+
+def fresh_until(headers, now: Optional[float] = None) -> float:
+    """Epoch time until which a response can be served without revalidation"""
+    now = time.time() if now is None else now
+    directives = parse_cache_control(headers.get('cache-control'))
+
+    if 'no-cache' in directives:
+        return 0.0
+
+    for directive in ('s-maxage', 'max-age'):
+        if directives.get(directive):
+            try:
+                age = float(headers.get('age') or 0)
+                return now + max(0.0, float(directives[directive]) - age)
+            except ValueError:
+                return 0.0
+
+    expires = _http_date(headers.get('expires'))
+    if expires is not None:
+        date = _http_date(headers.get('date')) or now
+        return now + max(0.0, expires - date)
+
+    # Heuristic freshness: 10% of the time since the last modification
+    last_modified = _http_date(headers.get('last-modified'))
+    if last_modified is not None:
+        return now + min(MAX_HEURISTIC_FRESHNESS, max(0.0, (now - last_modified) * 0.1))
+
+    return 0.0
+
+
+def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+    """Validators to send when revalidating a cached entry"""
+    headers = {}
+    stored = entry.get('headers', {})
+    if stored.get('etag'):
+        headers['If-None-Match'] = stored['etag']
+    if stored.get('last-modified'):
+        headers['If-Modified-Since'] = stored['last-modified']
+    return headers
+
+
+def has_validator(headers) -> bool:
+    return bool(headers.get('etag') or headers.get('last-modified'))
+
+
+def get_response_cache():
+    """Get the shared HTTP response cache"""
+    from ..caching import get_cache
+    return get_cache('http_responses', 'HTTP_RESPONSE_CACHE')
+
+
+def _variant_key(url: str, json_path: str, request_headers: Dict[str, str], vary: List[str]) -> str:
+    """Key of the response stored for the request headers a response varies on"""
+    headers = {name.lower(): value for name, value in request_headers.items()}
+    return make_cache_key(url, json_path, {name: headers.get(name) for name in vary})
+
+
+def lookup_response(url: str, json_path: str, request_headers: Dict[str, str]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Find the cached response matching a request.
+
+    The Vary header names of the last stored response are kept under the
+    URL, and the response itself under the URL plus the values of those
+    request headers. Returns (entry key, entry) or (None, None).
+    """
+    cache = get_response_cache()
+    vary = cache.get(make_cache_key('vary', url, json_path))
+    if vary is None:
+        return None, None
+    key = _variant_key(url, json_path, request_headers, vary)
+    return key, cache.get(key)
+
+
+def store_response(url: str, json_path: str, request_headers: Dict[str, str], response_headers, entry: Dict[str, Any]):
+    """Cache a storable response for later requests with matching Vary headers"""
+    vary = vary_headers(response_headers)
+    cache = get_response_cache()
+    cache.set(make_cache_key('vary', url, json_path), vary)
+    cache.set(_variant_key(url, json_path, request_headers, vary), entry)
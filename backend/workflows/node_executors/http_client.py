@@ -0,0 +1,164 @@
+"""
+Shared HTTP client pool for node executors
+Reuses keep-alive (and HTTP/2 when available) connections across node runs
+"""
+from typing import Dict, Any, AsyncIterator, Optional
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+import asyncio
+import atexit
+import logging
+import threading
+import httpx
+
+from .background_loop import BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_CLIENT_SETTINGS = {
+    'TIMEOUT': 30.0,  # Read/write/pool timeout in seconds
+    'CONNECT_TIMEOUT': 10.0,
+    'MAX_CONNECTIONS': 100,  # Shared by every execution in the process
+    'MAX_KEEPALIVE_CONNECTIONS': 20,
+    'KEEPALIVE_EXPIRY': 30.0,
+    'PER_HOST_LIMIT': 10,  # Concurrent requests per host
+    'HTTP2': True,  # Used only when the optional `h2` package is installed
+}
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HTTPClientPool:
+    """
+    Process-wide httpx.AsyncClient shared by every node execution.
+
+    The client and its per-host semaphores live on one background event loop
+    (async_to_sync gives each synchronous execution its own short-lived loop,
+    which would otherwise get a fresh client every run). Requests from any
+    loop are handed to that loop, so keep-alive connections are reused across
+    executions and the per-host limits are process-wide.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = {**DEFAULT_HTTP_CLIENT_SETTINGS, **config}
+        self.http2 = bool(self.config['HTTP2']) and HTTP2_AVAILABLE
+        self._background = BackgroundLoop('http-client-pool')
+        self._lock = threading.Lock()
+        # Created on the background loop on first use
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.errors = 0
+        self.clients_created = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        config = self.config
+        self.clients_created += 1
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(config['TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=config['MAX_CONNECTIONS'],
+                max_keepalive_connections=config['MAX_KEEPALIVE_CONNECTIONS'],
+                keepalive_expiry=config['KEEPALIVE_EXPIRY']
+            )
+        )
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Get the shared client; only usable on the pool's loop (inside run())"""
+        if not self._background.is_current():
+            raise RuntimeError("The shared HTTP client can only be used inside HTTPClientPool.run()")
+        with self._lock:
+            if self._client is None:
+                self._client = self._build_client()
+            return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.config['PER_HOST_LIMIT'])
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    async def run(self, coroutine):
+        """
+        Await a coroutine on the pool's loop.
+
+        Work that reads a streamed body with stream() must run entirely inside
+        one run() call, since the response is bound to the pool's loop.
+        """
+        return await self._background.run(coroutine)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request on the shared client, bounded per host"""
+        return await self._background.run(self._request(method, url, **kwargs))
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client = self.get_client()
+        async with self._host_semaphore(url):
+            self.requests += 1
+            try:
+                return await client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                self.errors += 1
+                raise
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Send a request whose body is read incrementally, bounded per host (inside run() only)"""
+        client = self.get_client()
+        async with self._host_semaphore(url):
+            self.requests += 1
+            try:
+                async with client.stream(method, url, **kwargs) as response:
+                    yield response
+            except httpx.HTTPError:
+                self.errors += 1
+                raise
+
+    async def _aclose_client(self):
+        with self._lock:
+            client, self._client = self._client, None
+            self._semaphores.clear()
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        """Close the shared client and stop the pool's loop (used at interpreter exit)"""
+        self._background.close(self._aclose_client())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            open_clients = int(self._client is not None)
+        return {
+            'http2': self.http2,
+            'open_clients': open_clients,
+            'clients_created': self.clients_created,
+            'requests': self.requests,
+            'errors': self.errors,
+            'per_host_limit': self.config['PER_HOST_LIMIT'],
+            'max_connections': self.config['MAX_CONNECTIONS'],
+        }
+
+
+_http_pool: Optional[HTTPClientPool] = None
+_http_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HTTPClientPool:
+    """Get the process-wide HTTP client pool, creating it from settings on first use"""
+    global _http_pool
+    if _http_pool is None:
+        with _http_pool_lock:
+            if _http_pool is None:
+                from django.conf import settings
+                _http_pool = HTTPClientPool(getattr(settings, 'HTTP_CLIENT_POOL', {}))
+                atexit.register(_http_pool.close)
+    return _http_pool
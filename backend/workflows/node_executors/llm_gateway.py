@@ -0,0 +1,500 @@
+"""
+Async LLM provider gateway
+One pooled HTTP client per (provider, api_key, base_url) with shared timeout, retry and metrics
+"""
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import httpx
+
+from ..caching import get_cache, make_cache_key
+from .background_loop import BackgroundLoop
+from .llm_pool import DEFAULT_PROVIDER_LIMITS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LLM_GATEWAY_SETTINGS = {
+    'TIMEOUT': 60.0,  # Read/write/pool timeout in seconds
+    'CONNECT_TIMEOUT': 10.0,
+    'MAX_RETRIES': 2,  # Retries after the first attempt on 429, 5xx and transport errors
+    'BACKOFF_BASE': 0.5,  # First retry delay in seconds, doubled per attempt (with jitter)
+    'BACKOFF_MAX': 8.0,  # Upper bound for one retry delay, including Retry-After
+    'MAX_CONNECTIONS': 20,  # Per client
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 60.0,
+    'ANTHROPIC_VERSION': '2023-06-01',
+}
+
+# Default base URL of every provider
+PROVIDER_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'groq': 'https://api.groq.com/openai/v1',
+    'anthropic': 'https://api.anthropic.com/v1',
+    'google': 'https://generativelanguage.googleapis.com/v1beta/openai',
+}
+
+# Context key and environment variable holding each provider's API key
+PROVIDER_KEY_SOURCES = {
+    'openai': ('openai_api_key', 'OPENAI_API_KEY'),
+    'groq': ('groq_api_key', 'GROQ_API_KEY'),
+    'anthropic': ('anthropic_api_key', 'ANTHROPIC_API_KEY'),
+    'google': ('google_api_key', 'GOOGLE_API_KEY'),
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def get_response_cache():
+    """Get the shared exact-match LLM response cache"""
+    return get_cache('llm_responses', 'LLM_RESPONSE_CACHE')
+
+
+class LLMGatewayError(Exception):
+    """Raised when a provider call fails after all retries"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def resolve_credentials(
+    provider: str,
+    context: Optional[Dict[str, Any]] = None,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolve the API key and base URL of a provider.
+
+    Keys come from the explicit value, then the execution context, then the
+    environment; base URLs default to the provider's public endpoint.
+    """
+    if not api_key:
+        context_key, env_key = PROVIDER_KEY_SOURCES.get(provider, (None, None))
+        if context_key:
+            api_key = (context or {}).get(context_key) or os.getenv(env_key)
+    return api_key or None, (base_url or PROVIDER_BASE_URLS.get(provider) or '').rstrip('/') or None
+
+
+def _error_message(response: httpx.Response) -> str:
+    """Extract the provider's error message from a failed response"""
+    try:
+        body = response.json()
+    except ValueError:
+        return response.text[:500] or response.reason_phrase
+    error = body.get('error', body) if isinstance(body, dict) else body
+    if isinstance(error, dict):
+        return str(error.get('message') or error)
+    return str(error)
+
+
+class LLMGateway:
+    """
+    Process-wide gateway to chat completion APIs.
+
+    OpenAI, Groq, Gemini and custom endpoints go through the OpenAI-compatible
+    chat/completions API; Anthropic uses its native messages API. Clients and
+    the per-provider semaphores live on the gateway's background event loop
+    and every call runs there, whichever loop the caller is on, so pooled
+    connections and LLM_PROVIDER_CONCURRENCY limits are process-wide.
+    """
+
+    def __init__(self, config: Dict[str, Any], provider_limits: Optional[Dict[str, int]] = None):
+        self.config = {**DEFAULT_LLM_GATEWAY_SETTINGS, **config}
+        self.provider_limits = {**DEFAULT_PROVIDER_LIMITS, **(provider_limits or {})}
+        self._background = BackgroundLoop('llm-gateway')
+        self._lock = threading.Lock()
+        # (provider, key hash, base_url) -> client
+        self._clients: Dict[tuple, httpx.AsyncClient] = {}
+        # provider -> semaphore
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self.clients_created = 0
+
+    # ==================== Clients ====================
+
+    def _build_client(self, provider: str, api_key: str, base_url: str) -> httpx.AsyncClient:
+        config = self.config
+        if provider == 'anthropic':
+            headers = {'x-api-key': api_key, 'anthropic-version': config['ANTHROPIC_VERSION']}
+        else:
+            headers = {'Authorization': f'Bearer {api_key}'}
+
+        self.clients_created += 1
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(config['TIMEOUT'], connect=config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=config['MAX_CONNECTIONS'],
+                max_keepalive_connections=config['MAX_KEEPALIVE_CONNECTIONS'],
+                keepalive_expiry=config['KEEPALIVE_EXPIRY']
+            )
+        )
+
+    def _client(self, provider: str, api_key: str, base_url: str) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        """Get the pooled client and provider semaphore (on the gateway's loop only)"""
+        if not self._background.is_current():
+            raise RuntimeError("LLM gateway clients can only be used on the gateway's loop")
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+        client_key = (provider, key_hash, base_url)
+
+        with self._lock:
+            client = self._clients.get(client_key)
+            if client is None:
+                client = self._build_client(provider, api_key, base_url)
+                self._clients[client_key] = client
+
+            semaphore = self._semaphores.get(provider)
+            if semaphore is None:
+                limit = self.provider_limits.get(provider, self.provider_limits['default'])
+                semaphore = asyncio.Semaphore(max(1, limit))
+                self._semaphores[provider] = semaphore
+            return client, semaphore
+
+    # ==================== Requests ====================
+
+    @staticmethod
+    def _endpoint(provider: str, base_url: str) -> str:
+        if provider == 'anthropic':
+            # Accept base URLs with or without the version segment
+            return '/messages' if base_url.endswith('/v1') else '/v1/messages'
+        return '/chat/completions'
+
+    def _payload(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        system: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        stream: bool,
+        extra: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if provider == 'anthropic':
+            payload = {'model': model, 'messages': messages, 'max_tokens': int(max_tokens or 1024)}
+            if system:
+                payload['system'] = system
+        else:
+            payload = {
+                'model': model,
+                'messages': ([{'role': 'system', 'content': system}] if system else []) + messages
+            }
+            if max_tokens:
+                payload['max_tokens'] = int(max_tokens)
+        if temperature is not None:
+            payload['temperature'] = float(temperature)
+        if stream:
+            payload['stream'] = True
+        payload.update(extra)
+        return payload
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Backoff before the next attempt, honouring a numeric Retry-After"""
+        delay = self.config['BACKOFF_BASE'] * (2 ** attempt) * (0.5 + random.random() / 2)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get('retry-after', '')))
+            except ValueError:
+                pass
+        return min(delay, self.config['BACKOFF_MAX'])
+
+    def _provider_stats(self, provider: str) -> Dict[str, Any]:
+        """Get (or create) the counters of a provider; caller holds the lock"""
+        if provider not in self._stats:
+            self._stats[provider] = {
+                'requests': 0,
+                'streams': 0,
+                'in_flight': 0,
+                'retries': 0,
+                'errors': 0,
+                'cache_hits': 0,
+                'cache_misses': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'total_latency_ms': 0.0,
+            }
+        return self._stats[provider]
+
+    def _count(self, provider: str, **increments):
+        with self._lock:
+            stats = self._provider_stats(provider)
+            for name, value in increments.items():
+                stats[name] += value
+
+    async def _send(self, provider: str, api_key: str, base_url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST a request with retries; returns the successful response"""
+        client, semaphore = self._client(provider, api_key, base_url)
+        endpoint = self._endpoint(provider, base_url)
+        max_retries = int(self.config['MAX_RETRIES'])
+
+        for attempt in range(max_retries + 1):
+            try:
+                async with semaphore:
+                    response = await client.post(endpoint, json=payload)
+            except httpx.TransportError as e:
+                if attempt >= max_retries:
+                    raise LLMGatewayError(f"{provider} request failed: {str(e) or type(e).__name__}")
+                self._count(provider, retries=1)
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code < 400:
+                return response
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries:
+                self._count(provider, retries=1)
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                continue
+            raise LLMGatewayError(
+                f"{provider} returned HTTP {response.status_code}: {_error_message(response)}",
+                response.status_code
+            )
+
+    async def complete(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        api_key: str,
+        base_url: Optional[str] = None,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        cache: bool = False,
+        **extra
+    ) -> Dict[str, Any]:
+        """
+        Run one chat completion.
+
+        Returns {'text', 'model', 'provider', 'usage', 'latency_ms', 'cached'};
+        extra keyword arguments are passed through in the request body (e.g.
+        response_format). With cache=True an identical earlier request is
+        answered from the LLM response cache without calling the provider.
+        """
+        return await self._background.run(self._complete(
+            provider, model, messages, api_key, base_url, system, temperature, max_tokens, cache, **extra
+        ))
+
+    async def _complete(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        api_key: str,
+        base_url: Optional[str],
+        system: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        cache: bool,
+        **extra
+    ) -> Dict[str, Any]:
+        api_key, base_url = resolve_credentials(provider, api_key=api_key, base_url=base_url)
+        if not api_key or not base_url:
+            raise LLMGatewayError(f"{provider} requires an API key and a base URL")
+
+        cache_key = None
+        if cache:
+            cache_key = make_cache_key(provider, base_url, model, system, messages, temperature, max_tokens, extra)
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                self._count(provider, cache_hits=1)
+                return {**cached, 'latency_ms': 0.0, 'cached': True}
+            self._count(provider, cache_misses=1)
+
+        payload = self._payload(provider, model, messages, system, temperature, max_tokens, False, extra)
+        started_at = time.monotonic()
+        self._count(provider, requests=1, in_flight=1)
+        try:
+            response = await self._send(provider, api_key, base_url, payload)
+            body = response.json()
+        except (LLMGatewayError, ValueError):
+            self._count(provider, errors=1)
+            raise
+        finally:
+            self._count(provider, in_flight=-1, total_latency_ms=(time.monotonic() - started_at) * 1000)
+
+        if provider == 'anthropic':
+            text = ''.join(block.get('text', '') for block in body.get('content', []) if block.get('type') == 'text')
+            usage = body.get('usage', {})
+            prompt_tokens, completion_tokens = usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+        else:
+            choices = body.get('choices') or [{}]
+            text = (choices[0].get('message') or {}).get('content') or ''
+            usage = body.get('usage') or {}
+            prompt_tokens, completion_tokens = usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0)
+
+        self._count(provider, prompt_tokens=prompt_tokens or 0, completion_tokens=completion_tokens or 0)
+        result = {
+            'text': text,
+            'model': body.get('model', model),
+            'provider': provider,
+            'usage': {'prompt_tokens': prompt_tokens or 0, 'completion_tokens': completion_tokens or 0},
+        }
+        if cache_key:
+            get_response_cache().set(cache_key, result)
+        return {**result, 'latency_ms': (time.monotonic() - started_at) * 1000, 'cached': False}
+
+    async def stream(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        api_key: str,
+        base_url: Optional[str] = None,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        **extra
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas.
+
+        Failed attempts are retried only until the first delta has been
+        yielded.
+        """
+        deltas = self._stream(provider, model, messages, api_key, base_url, system, temperature, max_tokens, **extra)
+        async for delta in self._background.iterate(deltas):
+            yield delta
+
+    async def _stream(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        api_key: str,
+        base_url: Optional[str],
+        system: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        **extra
+    ) -> AsyncIterator[str]:
+        api_key, base_url = resolve_credentials(provider, api_key=api_key, base_url=base_url)
+        if not api_key or not base_url:
+            raise LLMGatewayError(f"{provider} requires an API key and a base URL")
+
+        client, semaphore = self._client(provider, api_key, base_url)
+        endpoint = self._endpoint(provider, base_url)
+        payload = self._payload(provider, model, messages, system, temperature, max_tokens, True, extra)
+        max_retries = int(self.config['MAX_RETRIES'])
+        started_at = time.monotonic()
+        self._count(provider, streams=1, in_flight=1)
+
+        try:
+            for attempt in range(max_retries + 1):
+                retry_response = None
+                try:
+                    async with semaphore, client.stream('POST', endpoint, json=payload) as response:
+                        if response.status_code >= 400:
+                            await response.aread()
+                            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= max_retries:
+                                raise LLMGatewayError(
+                                    f"{provider} returned HTTP {response.status_code}: {_error_message(response)}",
+                                    response.status_code
+                                )
+                            retry_response = response
+                        else:
+                            async for line in response.aiter_lines():
+                                delta = self._stream_delta(provider, line)
+                                if delta:
+                                    yield delta
+                            return
+                except httpx.TransportError as e:
+                    if attempt >= max_retries:
+                        raise LLMGatewayError(f"{provider} stream failed: {str(e) or type(e).__name__}")
+
+                self._count(provider, retries=1)
+                await asyncio.sleep(self._retry_delay(attempt, retry_response))
+        except LLMGatewayError:
+            self._count(provider, errors=1)
+            raise
+        finally:
+            self._count(provider, in_flight=-1, total_latency_ms=(time.monotonic() - started_at) * 1000)
+
+    @staticmethod
+    def _stream_delta(provider: str, line: str) -> Optional[str]:
+        """Extract the text delta of one server-sent event line"""
+        if not line.startswith('data:'):
+            return None
+        data = line[5:].strip()
+        if not data or data == '[DONE]':
+            return None
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return None
+
+        if provider == 'anthropic':
+            if event.get('type') == 'content_block_delta':
+                return event.get('delta', {}).get('text')
+            return None
+        choices = event.get('choices') or [{}]
+        return (choices[0].get('delta') or {}).get('content')
+
+    # ==================== Sync bridge ====================
+
+    def run_sync(self, coroutine) -> Any:
+        """Run a gateway coroutine from synchronous code"""
+        return self._background.run_sync(coroutine)
+
+    async def _aclose_clients(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._semaphores.clear()
+
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug(f"Failed to close LLM client: {str(e)}")
+
+    def close(self):
+        """Close every pooled client and stop the gateway's loop (used at interpreter exit)"""
+        self._background.close(self._aclose_clients())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get gateway statistics"""
+        with self._lock:
+            providers = {}
+            for provider, stats in self._stats.items():
+                calls = (stats['requests'] + stats['streams']) or 1
+                providers[provider] = {
+                    **{key: value for key, value in stats.items() if not key.startswith('total_')},
+                    'avg_latency_ms': stats['total_latency_ms'] / calls,
+                }
+            open_clients = len(self._clients)
+
+        return {
+            'open_clients': open_clients,
+            'clients_created': self.clients_created,
+            'max_retries': self.config['MAX_RETRIES'],
+            'timeout': self.config['TIMEOUT'],
+            'providers': providers,
+        }
+
+
+_llm_gateway: Optional[LLMGateway] = None
+_llm_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the process-wide LLM gateway, creating it from settings on first use"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _llm_gateway_lock:
+            if _llm_gateway is None:
+                from django.conf import settings
+                _llm_gateway = LLMGateway(
+                    getattr(settings, 'LLM_GATEWAY', {}),
+                    provider_limits=getattr(settings, 'LLM_PROVIDER_CONCURRENCY', None)
+                )
+                atexit.register(_llm_gateway.close)
+    return _llm_gateway
@@ -0,0 +1,186 @@
+"""
+Bounded thread pool for blocking LLM SDK calls
+Keeps synchronous Alith `agent.prompt` calls off the event loop
+"""
+from typing import Dict, Any, Callable, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default total number of worker threads for LLM calls
+DEFAULT_POOL_SIZE = 16
+
+# Default number of concurrent calls per provider
+DEFAULT_PROVIDER_LIMITS = {
+    'openai': 8,
+    'groq': 8,
+    'anthropic': 4,
+    'google': 4,
+    'default': 4,
+}
+
+
+def provider_for_model(model: Optional[str]) -> str:
+    """Get provider name for a model identifier"""
+    model = model or ''
+    if model.startswith('llama-') or model.startswith('mixtral-') or model.startswith('gemma-'):
+        return 'groq'
+    elif model.startswith('claude-'):
+        return 'anthropic'
+    elif model.startswith('gemini-'):
+        return 'google'
+    elif model.startswith('gpt-'):
+        return 'openai'
+    return 'default'
+
+
+class LLMThreadPool:
+    """
+    Shared worker pool with a concurrency limit per provider.
+
+    Calls above a provider's limit wait in that provider's queue instead of
+    occupying a worker thread, so one slow provider cannot starve the others.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_POOL_SIZE, provider_limits: Optional[Dict[str, int]] = None):
+        self.max_workers = max_workers
+        self.provider_limits = {**DEFAULT_PROVIDER_LIMITS, **(provider_limits or {})}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-call')
+        self._lock = threading.Lock()
+        self._queues: Dict[str, deque] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _provider_stats(self, provider: str) -> Dict[str, Any]:
+        """Get (or create) the counters of a provider; caller holds the lock"""
+        if provider not in self._stats:
+            limit = self.provider_limits.get(provider, self.provider_limits['default'])
+            self._stats[provider] = {
+                'limit': max(1, min(limit, self.max_workers)),
+                'in_flight': 0,
+                'queued': 0,
+                'peak_in_flight': 0,
+                'peak_queued': 0,
+                'submitted': 0,
+                'completed': 0,
+                'errors': 0,
+                'total_wait_ms': 0.0,
+                'total_run_ms': 0.0,
+            }
+            self._queues[provider] = deque()
+        return self._stats[provider]
+
+    def submit(self, provider: str, func: Callable, *args, **kwargs) -> Future:
+        """Schedule a blocking call for a provider"""
+        job_future: Future = Future()
+        job = (job_future, func, args, kwargs, time.monotonic())
+
+        with self._lock:
+            stats = self._provider_stats(provider)
+            stats['submitted'] += 1
+            if stats['in_flight'] < stats['limit']:
+                self._start(provider, stats, job)
+            else:
+                self._queues[provider].append(job)
+                stats['queued'] += 1
+                stats['peak_queued'] = max(stats['peak_queued'], stats['queued'])
+
+        return job_future
+
+    async def run(self, provider: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call in the pool and await its result"""
+        return await asyncio.wrap_future(self.submit(provider, func, *args, **kwargs))
+
+    def _start(self, provider: str, stats: Dict[str, Any], job: tuple):
+        """Hand a job to a worker thread; caller holds the lock"""
+        stats['in_flight'] += 1
+        stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+        self._executor.submit(self._run_job, provider, job)
+
+    def _run_job(self, provider: str, job: tuple):
+        """Worker thread body"""
+        job_future, func, args, kwargs, queued_at = job
+        started_at = time.monotonic()
+        failed = False
+
+        try:
+            # Skip jobs whose caller already gave up
+            if job_future.set_running_or_notify_cancel():
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as e:
+                    failed = True
+                    job_future.set_exception(e)
+                else:
+                    job_future.set_result(result)
+        finally:
+            self._release(provider, failed, (started_at - queued_at) * 1000, (time.monotonic() - started_at) * 1000)
+
+    def _release(self, provider: str, failed: bool, wait_ms: float, run_ms: float):
+        """Free a provider slot and start the next queued job"""
+        with self._lock:
+            stats = self._stats[provider]
+            stats['in_flight'] -= 1
+            stats['completed'] += 1
+            stats['total_wait_ms'] += wait_ms
+            stats['total_run_ms'] += run_ms
+            if failed:
+                stats['errors'] += 1
+
+            queue = self._queues[provider]
+            while queue:
+                job = queue.popleft()
+                stats['queued'] -= 1
+                if not job[0].cancelled():
+                    self._start(provider, stats, job)
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool saturation metrics"""
+        with self._lock:
+            providers = {}
+            for provider, stats in self._stats.items():
+                completed = stats['completed'] or 1
+                providers[provider] = {
+                    **{key: value for key, value in stats.items() if not key.startswith('total_')},
+                    'saturation': stats['in_flight'] / stats['limit'],
+                    'avg_wait_ms': stats['total_wait_ms'] / completed,
+                    'avg_run_ms': stats['total_run_ms'] / completed,
+                }
+            in_flight = sum(stats['in_flight'] for stats in self._stats.values())
+            queued = sum(stats['queued'] for stats in self._stats.values())
+
+        return {
+            'max_workers': self.max_workers,
+            'in_flight': in_flight,
+            'queued': queued,
+            'saturation': in_flight / self.max_workers,
+            'providers': providers,
+        }
+
+
+_llm_pool: Optional[LLMThreadPool] = None
+_llm_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMThreadPool:
+    """Get the process-wide LLM thread pool, creating it from settings on first use"""
+    global _llm_pool
+    if _llm_pool is None:
+        with _llm_pool_lock:
+            if _llm_pool is None:
+                from django.conf import settings
+                _llm_pool = LLMThreadPool(
+                    max_workers=getattr(settings, 'LLM_THREAD_POOL_SIZE', DEFAULT_POOL_SIZE),
+                    provider_limits=getattr(settings, 'LLM_PROVIDER_CONCURRENCY', None)
+                )
+    return _llm_pool
+
+
+async def run_llm_call(provider: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking LLM SDK call on the shared pool"""
+    return await get_llm_pool().run(provider, func, *args, **kwargs)
@@ -0,0 +1,134 @@
+"""
+Shared web search backend for agent search tools
+One cached, de-duplicated DuckDuckGo client behind every search tool name
+"""
+from typing import Dict, Any, Tuple
+from concurrent.futures import Future
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SearchBackend:
+    """
+    DuckDuckGo text search with an LRU+TTL result cache and single-flight.
+
+    Identical concurrent queries wait for the first caller's request instead
+    of issuing their own; failed searches are not cached.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, str, int], Future] = {}
+        self.searches = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _key(query: str, region: str, max_results: int) -> Tuple[str, str, int]:
+        return (' '.join(query.lower().split()), region, int(max_results))
+
+    def search(self, query: str, region: str = 'us-en', max_results: int = 5) -> Dict[str, Any]:
+        """Search, serving repeated queries from the cache"""
+        key = self._key(query, region, max_results)
+        cache_key = '|'.join(str(part) for part in key)
+
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return {**cached, 'query': query, 'from_cache': True}
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return {**future.result(), 'query': query}
+
+        try:
+            result = self._fetch(query, region, max_results)
+            if not result.get('error'):
+                self.cache.set(cache_key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _fetch(self, query: str, region: str, max_results: int) -> Dict[str, Any]:
+        """Run the search against DuckDuckGo"""
+        from ddgs import DDGS
+
+        self.searches += 1
+        try:
+            print(f"Searching for: {query}")
+            print(f"Max results: {max_results}")
+            print(f"Region: {region}")
+
+            with DDGS() as ddgs:
+                results = []
+                search_results = ddgs.text(
+                    query=query,
+                    region=region,
+                    max_results=max_results
+                )
+
+                for result in search_results:
+                    results.append({
+                        'title': result.get('title', ''),
+                        'snippet': result.get('body', ''),
+                        'url': result.get('href', ''),
+                        'type': 'web_result'
+                    })
+
+            print(f"Found {len(results)} results")
+
+            return {
+                'query': query,
+                'results': results,
+                'total_results': len(results),
+                'region': region
+            }
+
+        except Exception as e:
+            print(f"Search error: {e}")
+            return {
+                'query': query,
+                'error': f"Search failed: {str(e)}",
+                'results': [],
+                'total_results': 0
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            'searches': self.searches,
+            'coalesced': self.coalesced,
+            'in_flight': in_flight,
+            'cache': self.cache.stats(),
+        }
+
+
+_search_backend = None
+_search_backend_lock = threading.Lock()
+
+
+def get_search_backend() -> SearchBackend:
+    """Get the process-wide search backend"""
+    global _search_backend
+    if _search_backend is None:
+        with _search_backend_lock:
+            if _search_backend is None:
+                from ..caching import get_cache
+                _search_backend = SearchBackend(get_cache('web_search', 'WEB_SEARCH_CACHE'))
+    return _search_backend
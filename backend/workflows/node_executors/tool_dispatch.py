@@ -0,0 +1,84 @@
+"""
+Concurrent dispatch of independent agent tool calls
+Runs a batch of blocking tool invocations on a bounded pool, results in call order
+"""
+from typing import Any, Callable, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default number of tool calls running at the same time (process-wide)
+DEFAULT_TOOL_CONCURRENCY = 4
+
+
+class ToolCallDispatcher:
+    """
+    Bounded thread pool for tool calls.
+
+    Tool handlers are invoked synchronously by the agent runtime, which itself
+    runs on the LLM thread pool; a separate pool keeps a batch of tool calls
+    from competing with (or deadlocking on) the LLM workers.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_TOOL_CONCURRENCY):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool-call')
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.calls = 0
+        self.errors = 0
+
+    def map(self, func: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Call func on every item concurrently and return results in item order.
+
+        A failing call yields its exception in place of a result, so one bad
+        call does not discard the others.
+        """
+        items = list(items)
+        with self._lock:
+            self.batches += 1
+            self.calls += len(items)
+
+        if len(items) <= 1:
+            futures = None
+        else:
+            futures = [self._executor.submit(func, item) for item in items]
+
+        results = []
+        for index, item in enumerate(items):
+            try:
+                results.append(futures[index].result() if futures else func(item))
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.warning(f"Tool call failed: {str(e)}")
+                results.append(e)
+        return results
+
+    def stats(self):
+        """Get dispatcher statistics"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'batches': self.batches,
+                'calls': self.calls,
+                'errors': self.errors,
+            }
+
+
+_dispatcher: Optional[ToolCallDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_tool_dispatcher() -> ToolCallDispatcher:
+    """Get the process-wide tool call dispatcher, creating it from settings on first use"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                from django.conf import settings
+                _dispatcher = ToolCallDispatcher(getattr(settings, 'AGENT_TOOL_CONCURRENCY', DEFAULT_TOOL_CONCURRENCY))
+    return _dispatcher
@@ -0,0 +1,352 @@
+"""
+Semantic Response Cache
+Answers near-identical assistant questions from earlier responses by embedding similarity
+"""
+from typing import Dict, Any, List, Optional
+from array import array
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+DEFAULT_SEMANTIC_CACHE_SETTINGS = {
+    'ENABLED': False,
+    'DIR': None,  # Directory for the entry index and the embedding matrix
+    'DIM': 512,  # Embedding dimensions
+    'MAX_ENTRIES': 5000,  # Rows in the embedding matrix; the least recently used entry is evicted when full
+    'THRESHOLD': 0.9,  # Minimum cosine similarity for a hit
+    'TTL_SECONDS': 7 * 24 * 3600,  # None keeps entries until evicted
+}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Function words that do not change what a question is about
+_STOPWORDS = frozenset(
+    'a an the i me my you your we to do does did can could would should please is are was be '
+    'of in on at for with and or it this that there'.split()
+)
+
+
+def embed_text(text: str, dim: int) -> List[float]:
+    """
+    Embed text with signed feature hashing.
+
+    Content words, word bigrams and character trigrams are hashed into `dim`
+    buckets and the vector is L2-normalized, so paraphrases that share most
+    of their wording land close together without an embedding model.
+    """
+    tokens = [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+    features = [(token, 1.0) for token in tokens]
+    features += [(f'{first} {second}', 1.0) for first, second in zip(tokens, tokens[1:])]
+    for token in tokens:
+        padded = f'#{token}#'
+        features += [(f'#3{padded[i:i + 3]}', 0.5) for i in range(len(padded) - 2)]
+
+    vector = [0.0] * dim
+    for feature, weight in features:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+        vector[digest % dim] += weight if digest >> 63 else -weight
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class SemanticCache:
+    """
+    Fixed-capacity embedding matrix with an SQLite entry index.
+
+    Each entry occupies one row ("slot") of the matrix. With NumPy the matrix
+    is a memory-mapped float32 file searched with one matrix-vector product;
+    without it vectors are kept as arrays and searched in Python. The matrix
+    can always be rebuilt from the questions stored in the index.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dim: int = DEFAULT_SEMANTIC_CACHE_SETTINGS['DIM'],
+        max_entries: int = DEFAULT_SEMANTIC_CACHE_SETTINGS['MAX_ENTRIES'],
+        threshold: float = DEFAULT_SEMANTIC_CACHE_SETTINGS['THRESHOLD'],
+        ttl_seconds: Optional[float] = DEFAULT_SEMANTIC_CACHE_SETTINGS['TTL_SECONDS']
+    ):
+        self.directory = str(directory)
+        self.dim = int(dim)
+        self.max_entries = int(max_entries)
+        self.threshold = float(threshold)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._connection: Optional[sqlite3.Connection] = None
+        self._vectors = None
+        # Per-slot state; a None scope marks a free slot
+        self._scopes: List[Optional[str]] = []
+        self._expires: List[Optional[float]] = []
+        self._accessed: List[float] = []
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, 'index.sqlite3')
+
+    @property
+    def matrix_path(self) -> str:
+        return os.path.join(self.directory, f'vectors-{self.dim}.f32')
+
+    # ==================== Storage ====================
+
+    def _load(self):
+        """Open the index and the embedding matrix; caller holds the lock"""
+        if self._loaded:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(self.index_path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'slot INTEGER PRIMARY KEY, scope TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL, '
+            'created_at REAL NOT NULL, accessed_at REAL NOT NULL, expires_at REAL, hits INTEGER NOT NULL DEFAULT 0)'
+        )
+        self._connection = connection
+
+        self._scopes = [None] * self.max_entries
+        self._expires = [None] * self.max_entries
+        self._accessed = [0.0] * self.max_entries
+
+        # Rows beyond a reduced MAX_ENTRIES stay in the index until rebuild() compacts it
+        rows = connection.execute(
+            'SELECT slot, scope, question, accessed_at, expires_at FROM entries WHERE slot < ?', (self.max_entries,)
+        ).fetchall()
+
+        expected_size = self.max_entries * self.dim * 4
+        matrix_valid = os.path.exists(self.matrix_path) and os.path.getsize(self.matrix_path) == expected_size
+        self._vectors = self._open_matrix(create=not matrix_valid)
+
+        for slot, scope, question, accessed_at, expires_at in rows:
+            self._scopes[slot] = scope
+            self._expires[slot] = expires_at
+            self._accessed[slot] = accessed_at
+            if not matrix_valid or not NUMPY_AVAILABLE:
+                self._write_vector(slot, embed_text(question, self.dim))
+
+        if NUMPY_AVAILABLE and not matrix_valid:
+            self._vectors.flush()
+        self._loaded = True
+
+    def _open_matrix(self, create: bool):
+        if not NUMPY_AVAILABLE:
+            return [None] * self.max_entries
+        return np.memmap(
+            self.matrix_path, dtype=np.float32, mode='w+' if create else 'r+',
+            shape=(self.max_entries, self.dim)
+        )
+
+    def _write_vector(self, slot: int, vector: List[float]):
+        if NUMPY_AVAILABLE:
+            self._vectors[slot] = vector
+        else:
+            self._vectors[slot] = array('f', vector)
+
+    def _best_match(self, scope: str, vector: List[float], now: float):
+        """Find the most similar live slot of a scope; returns (slot, similarity)"""
+        live = [
+            slot for slot, slot_scope in enumerate(self._scopes)
+            if slot_scope == scope and (self._expires[slot] is None or self._expires[slot] > now)
+        ]
+        if not live:
+            return None, 0.0
+
+        if NUMPY_AVAILABLE:
+            similarities = self._vectors[live] @ np.asarray(vector, dtype=np.float32)
+            best = int(similarities.argmax())
+            return live[best], float(similarities[best])
+
+        best_slot, best_similarity = None, -1.0
+        for slot in live:
+            similarity = sum(a * b for a, b in zip(self._vectors[slot], vector))
+            if similarity > best_similarity:
+                best_slot, best_similarity = slot, similarity
+        return best_slot, best_similarity
+
+    def _free_slot(self, now: float) -> int:
+        """Pick a slot for a new entry: a free one, else expired, else least recently used"""
+        for slot, scope in enumerate(self._scopes):
+            if scope is None:
+                return slot
+
+        expired = [slot for slot, expires in enumerate(self._expires) if expires is not None and expires <= now]
+        slot = expired[0] if expired else min(range(self.max_entries), key=self._accessed.__getitem__)
+        self.evictions += 1
+        return slot
+
+    # ==================== Public API ====================
+
+    def lookup(self, scope: str, question: str) -> Optional[Dict[str, Any]]:
+        """Get the stored answer of the most similar question above the threshold"""
+        vector = embed_text(question, self.dim)
+        now = time.time()
+        with self._lock:
+            try:
+                self._load()
+                slot, similarity = self._best_match(scope, vector, now)
+                if slot is None or similarity < self.threshold:
+                    self.misses += 1
+                    return None
+
+                row = self._connection.execute(
+                    'SELECT question, answer FROM entries WHERE slot = ?', (slot,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._connection.execute(
+                    'UPDATE entries SET accessed_at = ?, hits = hits + 1 WHERE slot = ?', (now, slot)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Semantic cache lookup failed: {str(e)}")
+                return None
+
+            self._accessed[slot] = now
+            self.hits += 1
+        return {'question': row[0], 'answer': row[1], 'similarity': similarity}
+
+    def store(self, scope: str, question: str, answer: str):
+        """Add a question/answer pair, evicting an entry when the matrix is full"""
+        vector = embed_text(question, self.dim)
+        now = time.time()
+        expires_at = now + float(self.ttl_seconds) if self.ttl_seconds else None
+        with self._lock:
+            try:
+                self._load()
+                slot = self._free_slot(now)
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO entries (slot, scope, question, answer, created_at, accessed_at, expires_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (slot, scope, question, answer, now, now, expires_at)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Semantic cache store failed: {str(e)}")
+                return
+
+            self._write_vector(slot, vector)
+            self._scopes[slot] = scope
+            self._expires[slot] = expires_at
+            self._accessed[slot] = now
+            self.stores += 1
+
+    def rebuild(self) -> int:
+        """
+        Drop expired entries, compact the index and re-embed every question.
+
+        Run after changing DIM, MAX_ENTRIES or the embedder; returns the number
+        of entries kept.
+        """
+        now = time.time()
+        with self._lock:
+            self._load()
+            connection = self._connection
+            rows = connection.execute(
+                'SELECT scope, question, answer, created_at, accessed_at, expires_at, hits FROM entries '
+                'WHERE expires_at IS NULL OR expires_at > ? ORDER BY accessed_at DESC LIMIT ?',
+                (now, self.max_entries)
+            ).fetchall()
+
+            connection.execute('BEGIN')
+            connection.execute('DELETE FROM entries')
+            connection.executemany(
+                'INSERT INTO entries (slot, scope, question, answer, created_at, accessed_at, expires_at, hits) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(slot, *row) for slot, row in enumerate(rows)]
+            )
+            connection.execute('COMMIT')
+
+            # Write the new matrix next to the old one and swap it in
+            self._vectors = None
+            temporary_path = self.matrix_path + '.tmp'
+            if NUMPY_AVAILABLE:
+                matrix = np.memmap(temporary_path, dtype=np.float32, mode='w+', shape=(self.max_entries, self.dim))
+                for slot, row in enumerate(rows):
+                    matrix[slot] = embed_text(row[1], self.dim)
+                matrix.flush()
+                del matrix
+                os.replace(temporary_path, self.matrix_path)
+
+            connection.close()
+            self._connection = None
+            self._loaded = False
+            self._load()
+            return len(rows)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._load()
+            self._connection.execute('DELETE FROM entries')
+            self._scopes = [None] * self.max_entries
+            self._expires = [None] * self.max_entries
+            self._accessed = [0.0] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': sum(1 for scope in self._scopes if scope is not None),
+                'max_entries': self.max_entries,
+                'dim': self.dim,
+                'threshold': self.threshold,
+                'numpy': NUMPY_AVAILABLE,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def get_semantic_cache_settings() -> Dict[str, Any]:
+    """Get semantic cache settings merged over the defaults"""
+    from django.conf import settings
+    config = {**DEFAULT_SEMANTIC_CACHE_SETTINGS, **getattr(settings, 'SEMANTIC_CACHE', {})}
+    if not config['DIR']:
+        config['DIR'] = os.path.join(str(settings.BASE_DIR), 'semantic_cache')
+    return config
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache(force: bool = False) -> Optional[SemanticCache]:
+    """Get the process-wide semantic cache, or None when it is disabled (force opens it anyway)"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        config = get_semantic_cache_settings()
+        if not config['ENABLED'] and not force:
+            return None
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(
+                    config['DIR'],
+                    dim=config['DIM'],
+                    max_entries=config['MAX_ENTRIES'],
+                    threshold=config['THRESHOLD'],
+                    ttl_seconds=config['TTL_SECONDS']
+                )
+    return _semantic_cache
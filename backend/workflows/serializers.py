@@ -41,6 +41,8 @@ class ExecuteWorkflowSerializer(serializers.Serializer):
     trigger_data = serializers.JSONField(required=False, default=dict)
     start_node_id = serializers.CharField(required=False, allow_null=True)
     credentials = serializers.JSONField(required=False, default=dict)
+    max_concurrency = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    run_async = serializers.BooleanField(required=False, allow_null=True, default=None)
 
 
 class ExecuteNodeSerializer(serializers.Serializer):
@@ -48,6 +50,10 @@ class ExecuteNodeSerializer(serializers.Serializer):
     node_id = serializers.CharField(required=True)
     trigger_data = serializers.JSONField(required=False, default=dict)
     credentials = serializers.JSONField(required=False, default=dict)
+    max_concurrency = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    run_async = serializers.BooleanField(required=False, allow_null=True, default=None)
+    # Reuse unchanged upstream outputs from the latest execution of the workflow
+    reuse_previous = serializers.BooleanField(required=False, default=False)
 
 
 class ExportedWorkflowSerializer(serializers.ModelSerializer):
@@ -1,3 +1,1912 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .caching import TieredCache, make_cache_key
+from .execution_engine import ExecutionContext, WorkflowExecutionEngine
+from .execution_plan import (
+    NODE_EXECUTOR_CLASSES,
+    CompiledWorkflow,
+    ExecutionPlanCache,
+    compute_workflow_hash,
+    is_node_cacheable,
+)
+from .execution_queue import DatabaseExecutionQueue, DatabaseExecutionWorker, ExecutionRequest
+from .execution_registry import ExecutionRegistry
+from .memory_backends import (
+    ConversationMemoryStore,
+    DBMemoryBackend,
+    ShardedConversationMemoryStore,
+    session_key,
+    shard_index,
+)
+from .models import ExecutionJob, MemoryCollection, MemoryMessage, SpilledConversation, Workflow, WorkflowExecution
+from .semantic_cache import SemanticCache, embed_text
+from .token_budget import (
+    TRUNCATION_MARKER,
+    context_window,
+    estimate_tokens,
+    fit_messages,
+    history_budget,
+    truncate_to_tokens,
+)
+from .node_executors.action_nodes import ActionNodeExecutor, parse_total, project_json_path
+from .node_executors.ai_nodes import AINodeExecutor, ChatModelExecutor
+from .node_executors.base import BaseNodeExecutor, NodeExecutionError
+from .node_executors.http_client import HTTPClientPool
+from .node_executors.llm_gateway import LLMGateway, LLMGatewayError
+from .node_executors.llm_pool import LLMThreadPool, provider_for_model
+from .node_executors.search_backend import SearchBackend
+from .node_executors.tool_dispatch import ToolCallDispatcher
+
+
+def make_node(node_id, node_type='test-step', **properties):
+    return {'id': node_id, 'data': {'type': node_type, 'label': node_id, 'properties': properties}}
+
+
+def make_edge(source, target, source_handle='main', target_handle='main'):
+    return {'source': source, 'target': target, 'sourceHandle': source_handle, 'targetHandle': target_handle}
+
+
+class StepExecutor(BaseNodeExecutor):
+    """Test node that waits `delay` seconds, optionally fails, and records how it was run"""
+
+    calls = []
+    inputs = {}
+    running = 0
+    peak = 0
+
+    async def execute(self, inputs, context):
+        cls = type(self)
+        cls.calls.append(self.node_id)
+        cls.inputs[self.node_id] = inputs
+        cls.running += 1
+        cls.peak = max(cls.peak, cls.running)
+        try:
+            await asyncio.sleep(float(self.get_property('delay', 0)))
+            if self.get_property('fail'):
+                raise NodeExecutionError(f"{self.node_id} failed")
+        finally:
+            cls.running -= 1
+        return {'main': {**(inputs.get('main') or {}), self.node_id: True}}
+
+
+class FakeMessage:
+    def __init__(self, role, content):
+        self.role = role
+        self.content = content
+
+
+class FakeMemory:
+    """In-memory conversation with the interface of Alith's WindowBufferMemory"""
+
+    def __init__(self, window_size=10):
+        self.window_size = window_size
+        self._messages = []
+
+    def add_user_message(self, content):
+        self._append(FakeMessage('user', content))
+
+    def add_ai_message(self, content):
+        self._append(FakeMessage('assistant', content))
+
+    def _append(self, message):
+        self._messages = (self._messages + [message])[-self.window_size:]
+
+    def messages(self):
+        return self._messages
+
+
+class MockHTTPClientPool(HTTPClientPool):
+    """HTTPClientPool whose shared client answers requests with handler(request)"""
+
+    def __init__(self, handler, **config):
+        super().__init__({'HTTP2': False, **config})
+        self.handler = handler
+
+    def _build_client(self):
+        self.clients_created += 1
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+class HTTPNodeTestCase(SimpleTestCase):
+    """Runs HTTP Request nodes against a MockHTTPClientPool"""
+
+    def make_pool(self, handler, **config):
+        pool = MockHTTPClientPool(handler, **config)
+        self.addCleanup(pool.close)
+        return pool
+
+    async def run_http_node(self, pool, **properties):
+        executor = ActionNodeExecutor('http', 'http-request', {'properties': {'method': 'GET', **properties}})
+        with mock.patch('workflows.node_executors.action_nodes.get_http_pool', return_value=pool):
+            return (await executor.execute({'main': {}}, {}))['main']
+
+
+class EngineTestCase(SimpleTestCase):
+    """Runs workflows of StepExecutor nodes on a fresh engine"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(NODE_EXECUTOR_CLASSES, {'test-step': StepExecutor})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        StepExecutor.calls = []
+        StepExecutor.inputs = {}
+        StepExecutor.running = 0
+        StepExecutor.peak = 0
+        self.engine = WorkflowExecutionEngine()
+
+    def run_workflow(self, nodes, edges, execution_id='execution', **kwargs):
+        kwargs.setdefault('timeout', 10)
+        return self.engine.execute_workflow(self.id(), execution_id, nodes, edges, **kwargs)
+
+
+class SchedulingTests(EngineTestCase):
+
+    async def test_independent_branches_run_concurrently(self):
+        nodes = [
+            make_node('a'),
+            make_node('b', delay=0.2),
+            make_node('c', delay=0.2),
+            make_node('d'),
+        ]
+        edges = [make_edge('a', 'b'), make_edge('a', 'c'), make_edge('b', 'd'), make_edge('c', 'd')]
+
+        started = time.monotonic()
+        context = await self.run_workflow(nodes, edges)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(context.status, 'completed')
+        self.assertEqual(StepExecutor.peak, 2)
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(context.execution_order[0], 'a')
+        self.assertEqual(context.execution_order[-1], 'd')
+        self.assertTrue(context.node_results['d']['main']['a'])
+
+    async def test_max_concurrency_bounds_nodes_in_flight(self):
+        nodes = [make_node(node_id, delay=0.02) for node_id in 'abcd']
+
+        context = await self.run_workflow(nodes, [], max_concurrency=1)
+
+        self.assertEqual(context.status, 'completed')
+        self.assertEqual(StepExecutor.peak, 1)
+        self.assertEqual(len(context.execution_order), 4)
+
+    async def test_failure_stops_downstream_nodes(self):
+        nodes = [make_node('a', fail=True), make_node('b')]
+
+        context = await self.run_workflow(nodes, [make_edge('a', 'b')])
+
+        self.assertEqual(context.status, 'error')
+        self.assertEqual(context.errors, {'a': 'a failed'})
+        self.assertNotIn('b', StepExecutor.calls)
+
+    async def test_cycles_are_rejected_before_running(self):
+        nodes = [make_node('a'), make_node('b')]
+
+        context = await self.run_workflow(nodes, [make_edge('a', 'b'), make_edge('b', 'a')])
+
+        self.assertEqual(context.status, 'error')
+        self.assertEqual(StepExecutor.calls, [])
+
+
+class PlanCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.nodes = [make_node('trigger', 'manual-trigger'), make_node('edit', 'edit-fields')]
+        self.edges = [make_edge('trigger', 'edit')]
+
+    def test_same_version_reuses_the_compiled_plan(self):
+        cache = ExecutionPlanCache()
+
+        plan = cache.get_or_compile('workflow', self.nodes, self.edges)
+
+        self.assertIs(cache.get_or_compile('workflow', self.nodes, self.edges), plan)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(plan.topological_order, ['trigger', 'edit'])
+
+    def test_edited_workflow_compiles_a_new_plan(self):
+        cache = ExecutionPlanCache()
+        plan = cache.get_or_compile('workflow', self.nodes, self.edges)
+
+        edited = [self.nodes[0], make_node('edit', 'edit-fields', fields=[{'key': 'a', 'value': 'b'}])]
+
+        self.assertNotEqual(compute_workflow_hash(edited, self.edges), plan.version)
+        self.assertIsNot(cache.get_or_compile('workflow', edited, self.edges), plan)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_invalidate_drops_every_version_of_a_workflow(self):
+        cache = ExecutionPlanCache()
+        cache.get_or_compile('workflow', self.nodes, self.edges, version='1')
+        cache.get_or_compile('workflow', self.nodes, self.edges, version='2')
+        other = cache.get_or_compile('other', self.nodes, self.edges, version='1')
+
+        cache.invalidate('workflow')
+
+        self.assertEqual(cache.stats()['size'], 1)
+        self.assertIs(cache.get_or_compile('other', self.nodes, self.edges, version='1'), other)
+
+    def test_least_recently_used_plan_is_evicted(self):
+        cache = ExecutionPlanCache(max_size=2)
+        first = cache.get_or_compile('first', self.nodes, self.edges)
+        cache.get_or_compile('second', self.nodes, self.edges)
+        cache.get_or_compile('first', self.nodes, self.edges)
+        cache.get_or_compile('third', self.nodes, self.edges)
+
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertIs(cache.get_or_compile('first', self.nodes, self.edges), first)
+        self.assertEqual(cache.stats()['misses'], 3)
+
+
+class LLMThreadPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = LLMThreadPool(max_workers=4, provider_limits={'openai': 2})
+        self.addCleanup(self.pool._executor.shutdown)
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+
+    def blocked_call(self, value):
+        self.gate.wait(5)
+        return value
+
+    def drain(self):
+        # Counters are released just after the caller's future resolves
+        self.pool._executor.shutdown(wait=True)
+
+    def test_calls_above_the_provider_limit_are_queued(self):
+        futures = [self.pool.submit('openai', self.blocked_call, index) for index in range(3)]
+
+        openai = self.pool.stats()['providers']['openai']
+        self.assertEqual(openai['in_flight'], 2)
+        self.assertEqual(openai['queued'], 1)
+        self.assertEqual(openai['saturation'], 1.0)
+
+        self.gate.set()
+
+        self.assertEqual([future.result(5) for future in futures], [0, 1, 2])
+        self.drain()
+        openai = self.pool.stats()['providers']['openai']
+        self.assertEqual(openai['peak_in_flight'], 2)
+        self.assertEqual(openai['peak_queued'], 1)
+        self.assertEqual(openai['completed'], 3)
+
+    def test_saturated_provider_does_not_block_others(self):
+        for index in range(3):
+            self.pool.submit('openai', self.blocked_call, index)
+
+        self.assertEqual(self.pool.submit('groq', lambda: 'groq').result(5), 'groq')
+        self.assertEqual(self.pool.stats()['providers']['openai']['queued'], 1)
+
+    def test_cancelled_queued_call_is_skipped(self):
+        running = [self.pool.submit('openai', self.blocked_call, index) for index in range(2)]
+        queued = self.pool.submit('openai', self.blocked_call, 'queued')
+
+        self.assertTrue(queued.cancel())
+        self.gate.set()
+        for future in running:
+            future.result(5)
+        self.drain()
+
+        self.assertEqual(self.pool.stats()['providers']['openai']['completed'], 2)
+
+    async def test_run_propagates_errors(self):
+        def fail():
+            raise RuntimeError('rate limited')
+
+        with self.assertRaisesMessage(RuntimeError, 'rate limited'):
+            await self.pool.run('anthropic', fail)
+        self.drain()
+
+        self.assertEqual(self.pool.stats()['providers']['anthropic']['errors'], 1)
+
+    def test_provider_for_model(self):
+        self.assertEqual(provider_for_model('gpt-4o'), 'openai')
+        self.assertEqual(provider_for_model('llama-3.1-8b-instant'), 'groq')
+        self.assertEqual(provider_for_model('claude-3-opus'), 'anthropic')
+        self.assertEqual(provider_for_model('gemini-1.5-pro'), 'google')
+        self.assertEqual(provider_for_model(None), 'default')
+
+
+class DatabaseExecutionQueueTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.workflow = Workflow.objects.create(
+            name='queued', user=self.user, nodes=[make_node('trigger', 'manual-trigger')], edges=[]
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch('workflows.execution_queue.get_execution_queue', return_value=DatabaseExecutionQueue())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue_job(self, **kwargs):
+        execution_id = str(uuid.uuid4())
+        WorkflowExecution.objects.create(id=execution_id, workflow=self.workflow, status='queued')
+        request = ExecutionRequest(execution_id, str(self.workflow.id), self.workflow.nodes, [], **kwargs)
+        DatabaseExecutionQueue().enqueue(request)
+        return ExecutionJob.objects.get(id=execution_id)
+
+    def test_run_async_returns_202_and_queues_a_job(self):
+        response = self.client.post(
+            f'/api/workflows/{self.workflow.id}/execute/',
+            {'run_async': True, 'credentials': {'openai_api_key': 'sk-secret'}},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        execution_id = response.data['execution_id']
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertTrue(response.data['status_url'].endswith(f'/api/executions/{execution_id}/status/'))
+        self.assertEqual(WorkflowExecution.objects.get(id=execution_id).status, 'queued')
+        job = ExecutionJob.objects.get(id=execution_id)
+        self.assertEqual(job.status, 'queued')
+        self.assertNotIn('credentials', job.payload)
+        self.assertNotIn('sk-secret', str(job.payload))
+
+    def test_worker_runs_a_job_and_clears_its_payload(self):
+        job = self.queue_job(trigger_data={'message': 'hello'})
+
+        self.assertTrue(DatabaseExecutionWorker(worker_id='worker').run_once())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.payload, {})
+        self.assertEqual(job.attempts, 1)
+        execution = WorkflowExecution.objects.get(id=job.id)
+        self.assertEqual(execution.status, 'completed')
+        self.assertEqual(execution.execution_order, ['trigger'])
+        self.assertFalse(DatabaseExecutionWorker(worker_id='worker').run_once())
+
+    def test_a_job_is_claimed_once(self):
+        job = self.queue_job()
+
+        claimed = DatabaseExecutionWorker(worker_id='first').claim_next()
+
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.worker_id, 'first')
+        self.assertIsNone(DatabaseExecutionWorker(worker_id='second').claim_next())
+
+    def test_abandoned_job_is_reclaimed(self):
+        job = self.queue_job()
+        DatabaseExecutionWorker(worker_id='dead').claim_next()
+        WorkflowExecution.objects.filter(id=job.id).update(status='running')
+        ExecutionJob.objects.filter(id=job.id).update(claimed_at=timezone.now() - timedelta(seconds=120))
+
+        claimed = DatabaseExecutionWorker(worker_id='alive', lease_seconds=60).claim_next()
+
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.worker_id, 'alive')
+        self.assertEqual(claimed.attempts, 2)
+        self.assertEqual(WorkflowExecution.objects.get(id=job.id).status, 'queued')
+
+    def test_running_job_within_its_lease_is_not_reclaimed(self):
+        self.queue_job()
+        DatabaseExecutionWorker(worker_id='busy').claim_next()
+
+        self.assertIsNone(DatabaseExecutionWorker(worker_id='other', lease_seconds=60).claim_next())
+
+    def test_running_worker_renews_its_lease(self):
+        job = self.queue_job()
+        worker = DatabaseExecutionWorker(worker_id='busy', lease_seconds=0.06)
+        claimed_at = worker.claim_next().claimed_at
+        done = threading.Event()
+        heartbeat = threading.Thread(target=worker._renew_lease, args=(job.id, done))
+        heartbeat.start()
+        time.sleep(0.1)
+        done.set()
+        heartbeat.join(1)
+
+        job.refresh_from_db()
+        self.assertGreater(job.claimed_at, claimed_at)
+
+    def test_abandoned_job_fails_after_max_attempts(self):
+        job = self.queue_job()
+        ExecutionJob.objects.filter(id=job.id).update(
+            status='running', attempts=3, claimed_at=timezone.now() - timedelta(seconds=120)
+        )
+
+        worker = DatabaseExecutionWorker(worker_id='alive', lease_seconds=60, max_attempts=3)
+
+        self.assertIsNone(worker.claim_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.payload, {})
+        self.assertIn('3 attempts', job.error)
+        self.assertEqual(WorkflowExecution.objects.get(id=job.id).status, 'error')
+
+    def test_payload_round_trip(self):
+        job = self.queue_job(trigger_data={'message': 'hi'}, credentials={'groq_api_key': 'gsk-secret'}, reuse_previous=True)
+
+        request = ExecutionRequest.from_job(job)
+
+        self.assertEqual(request.trigger_data, {'message': 'hi'})
+        self.assertTrue(request.reuse_previous)
+        self.assertEqual(request.credentials, {})
+
+
+class ExecutionEventStreamTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.workflow = Workflow.objects.create(name='streamed', user=self.user)
+        self.execution = WorkflowExecution.objects.create(workflow=self.workflow, status='running')
+        self.url = f'/api/executions/{self.execution.id}/events/'
+        self.engine = WorkflowExecutionEngine()
+        patcher = mock.patch('workflows.views.execution_engine', self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_context(self):
+        context = ExecutionContext(str(self.workflow.id), str(self.execution.id))
+        self.engine.active_executions[str(self.execution.id)] = context
+        return context
+
+    def finish_later(self, context):
+        def finish():
+            time.sleep(0.05)
+            context.set_node_state('trigger', 'completed')
+            context.complete('completed')
+        thread = threading.Thread(target=finish)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_wsgi_stream_follows_a_live_execution(self):
+        context = self.start_context()
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+        chunks = iter(response.streaming_content)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(next(chunks).startswith(b'event: snapshot'))
+        self.finish_later(context)
+        rest = b''.join(chunks).decode()
+
+        self.assertTrue(rest.startswith('event: node'))
+        self.assertIn('event: summary', rest)
+        self.assertEqual(context._subscribers, [])
+
+    async def test_asgi_stream_follows_a_live_execution(self):
+        context = self.start_context()
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+
+        response = await client.get(self.url, headers={'accept': 'text/event-stream'})
+        chunks = aiter(response.streaming_content)
+
+        self.assertTrue((await anext(chunks)).startswith(b'event: snapshot'))
+        self.assertEqual(len(context._subscribers), 1)
+        self.finish_later(context)
+        rest = b''.join([chunk async for chunk in chunks]).decode()
+
+        self.assertIn('event: node', rest)
+        self.assertIn('event: summary', rest)
+        self.assertEqual(context._subscribers, [])
+
+    def test_finished_execution_is_replayed_from_the_database(self):
+        WorkflowExecution.objects.filter(id=self.execution.id).update(
+            status='completed', node_states={'trigger': {'status': 'completed'}}, execution_order=['trigger']
+        )
+        self.client.force_login(self.user)
+
+        body = b''.join(self.client.get(self.url, HTTP_ACCEPT='text/event-stream').streaming_content).decode()
+
+        self.assertIn('"nodes": {"trigger": "completed"}', body)
+        self.assertIn('event: summary', body)
+
+    def test_synchronous_execution_has_no_live_stream(self):
+        context = self.start_context()
+        WorkflowExecution.objects.filter(id=context.execution_id).delete()
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('run_async', json.loads(response.content)['error'])
+
+    def test_other_users_cannot_stream(self):
+        self.start_context()
+        self.client.force_login(User.objects.create_user('other', password='secret'))
+
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ExecutionRegistryTests(SimpleTestCase):
+
+    def finished_context(self, registry, execution_id, payload=''):
+        context = ExecutionContext('workflow', execution_id)
+        context.set_node_result('node', payload)
+        registry[execution_id] = context
+        registry.mark_completed(execution_id)
+        return context
+
+    def test_running_executions_are_never_evicted(self):
+        registry = ExecutionRegistry(max_entries=1, max_bytes=1, ttl_seconds=0)
+        running = ExecutionContext('workflow', 'running')
+        registry['running'] = running
+        self.finished_context(registry, 'finished', 'x' * 100)
+
+        self.assertIs(registry.get('running'), running)
+        self.assertIsNone(registry.get('finished'))
+
+    def test_least_recently_used_finished_execution_is_evicted(self):
+        registry = ExecutionRegistry(max_entries=2, max_bytes=10 ** 6, ttl_seconds=None)
+        self.finished_context(registry, 'first')
+        self.finished_context(registry, 'second')
+        registry.get('first')
+        self.finished_context(registry, 'third')
+
+        self.assertIn('first', registry)
+        self.assertNotIn('second', registry)
+        self.assertEqual(registry.stats()['evictions'], 1)
+
+    def test_byte_budget_evicts_large_executions(self):
+        registry = ExecutionRegistry(max_entries=10, max_bytes=3000, ttl_seconds=None)
+        self.finished_context(registry, 'large', 'x' * 2000)
+        self.finished_context(registry, 'larger', 'x' * 2500)
+
+        self.assertNotIn('large', registry)
+        self.assertIn('larger', registry)
+        self.assertLessEqual(registry.stats()['finished_bytes'], 3000)
+
+    def test_finished_executions_expire(self):
+        registry = ExecutionRegistry(max_entries=10, max_bytes=10 ** 6, ttl_seconds=0.01)
+        self.finished_context(registry, 'finished')
+        time.sleep(0.02)
+
+        self.assertIsNone(registry.get('finished'))
+        stats = registry.stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['finished_bytes'], 0)
+
+
+class BranchSkippingTests(EngineTestCase):
+
+    async def test_untaken_branch_is_skipped(self):
+        nodes = [
+            make_node('trigger', 'manual-trigger'),
+            make_node('check', 'if-else', conditions=[{'field': 'message', 'operator': 'equals', 'value': 'yes'}]),
+            make_node('taken'),
+            make_node('untaken'),
+            make_node('after_untaken'),
+        ]
+        edges = [
+            make_edge('trigger', 'check'),
+            make_edge('check', 'taken', source_handle='true'),
+            make_edge('check', 'untaken', source_handle='false'),
+            make_edge('untaken', 'after_untaken'),
+        ]
+
+        context = await self.run_workflow(nodes, edges, trigger_data={'message': 'yes'})
+
+        self.assertEqual(context.status, 'completed')
+        self.assertEqual(StepExecutor.calls, ['taken'])
+        self.assertEqual(context.skipped_nodes, {'untaken', 'after_untaken'})
+        self.assertEqual(context.node_states['untaken']['status'], 'skipped')
+
+    async def test_node_with_a_live_input_is_not_skipped(self):
+        nodes = [
+            make_node('trigger', 'manual-trigger'),
+            make_node('check', 'if-else', conditions=[{'field': 'message', 'operator': 'equals', 'value': 'yes'}]),
+            make_node('join'),
+        ]
+        edges = [
+            make_edge('trigger', 'check'),
+            make_edge('check', 'join', source_handle='false'),
+            make_edge('trigger', 'join', target_handle='extra'),
+        ]
+
+        context = await self.run_workflow(nodes, edges, trigger_data={'message': 'yes'})
+
+        self.assertEqual(StepExecutor.calls, ['join'])
+        self.assertEqual(context.skipped_nodes, set())
+
+
+class MemoizationTests(EngineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.node_cache = TieredCache('node_results', db_path=None)
+        patcher = mock.patch('workflows.execution_engine.get_cache', return_value=self.node_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cached_workflow(self):
+        nodes = [
+            make_node('trigger', 'manual-trigger'),
+            make_node('edit', 'edit-fields', cacheResults=True, fields=[{'key': 'tag', 'value': 'x'}]),
+        ]
+        return nodes, [make_edge('trigger', 'edit')]
+
+    async def test_cacheable_node_is_served_from_cache(self):
+        nodes, edges = self.cached_workflow()
+
+        first = await self.run_workflow(nodes, edges, trigger_data={'message': 'hi'})
+        second = await self.run_workflow(nodes, edges, trigger_data={'message': 'hi'})
+
+        self.assertFalse(first.node_states['edit']['cache']['hit'])
+        self.assertTrue(second.node_states['edit']['cache']['hit'])
+        self.assertEqual(second.node_results['edit'], first.node_results['edit'])
+
+    async def test_changed_inputs_miss_the_cache(self):
+        nodes, edges = self.cached_workflow()
+
+        first = await self.run_workflow(nodes, edges, trigger_data={'message': 'hi'})
+        second = await self.run_workflow(nodes, edges, trigger_data={'message': 'bye'})
+
+        self.assertFalse(second.node_states['edit']['cache']['hit'])
+        self.assertNotEqual(second.node_states['edit']['fingerprint'], first.node_states['edit']['fingerprint'])
+        self.assertEqual(second.node_results['edit']['main']['message'], 'bye')
+
+    async def test_cached_value_is_not_shared_with_consumers(self):
+        nodes, edges = self.cached_workflow()
+
+        first = await self.run_workflow(nodes, edges, trigger_data={'message': 'hi'})
+        first.node_results['edit']['main']['tag'] = 'mutated'
+        second = await self.run_workflow(nodes, edges, trigger_data={'message': 'hi'})
+
+        self.assertEqual(second.node_results['edit']['main']['tag'], 'x')
+
+    def test_trigger_fingerprint_includes_trigger_data(self):
+        trigger = make_node('trigger', 'manual-trigger')
+        step = make_node('step')
+        first, second = mock.Mock(trigger_data={'message': 'a'}), mock.Mock(trigger_data={'message': 'b'})
+
+        self.assertNotEqual(
+            self.engine._node_fingerprint(trigger, {}, first),
+            self.engine._node_fingerprint(trigger, {}, second)
+        )
+        self.assertEqual(
+            self.engine._node_fingerprint(step, {'main': 1}, first),
+            self.engine._node_fingerprint(step, {'main': 1}, second)
+        )
+
+    def test_only_opted_in_deterministic_nodes_are_cacheable(self):
+        self.assertFalse(is_node_cacheable(make_node('edit', 'edit-fields')))
+        self.assertTrue(is_node_cacheable(make_node('edit', 'edit-fields', cacheResults=True)))
+        self.assertFalse(is_node_cacheable(make_node('http', 'http-request', cacheResults=True)))
+        self.assertTrue(is_node_cacheable(make_node('llm', 'openai', cacheResults=True, temperature=0)))
+        self.assertFalse(is_node_cacheable(make_node('llm', 'openai', cacheResults=True, temperature=0.7)))
+        self.assertFalse(is_node_cacheable(make_node('llm', 'openai', cacheResults=True)))
+
+
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = os.path.join(directory.name, 'cache.sqlite3')
+
+    def db_keys(self, cache):
+        return {row[0] for row in cache._connection().execute(f'SELECT key FROM {cache._table}')}
+
+    def test_memory_tier_is_least_recently_used(self):
+        cache = TieredCache('lru', max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        cache = TieredCache('ttl', ttl_seconds=0.01, db_path=self.db_path)
+        cache.set('a', 1)
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(TieredCache('ttl', db_path=self.db_path).get('a'))
+
+    def test_persistent_tier_survives_a_new_instance(self):
+        TieredCache('shared', db_path=self.db_path).set('a', {'value': 1})
+
+        cache = TieredCache('shared', db_path=self.db_path)
+
+        self.assertEqual(cache.get('a'), {'value': 1})
+        self.assertEqual(cache.stats()['db_hits'], 1)
+
+    def test_unencodable_values_stay_in_memory(self):
+        cache = TieredCache('objects', db_path=self.db_path)
+        value = object()
+        cache.set('a', value)
+
+        self.assertIs(cache.get('a'), value)
+        self.assertIsNone(TieredCache('objects', db_path=self.db_path).get('a'))
+
+    def test_row_cap_keeps_the_most_recently_used_rows(self):
+        cache = TieredCache('capped', max_entries=1, db_path=self.db_path, max_db_entries=4)
+        for index in range(7):
+            cache.set(f'key {index}', index)
+        cache._db_get('key 0')
+        cache.set('key 7', 7)
+
+        self.assertEqual(self.db_keys(cache), {'key 0', 'key 5', 'key 6', 'key 7'})
+
+    def test_memory_tier_byte_cap(self):
+        # Values are counted by their JSON encoding: 10 bytes each
+        cache = TieredCache('bytes', max_bytes=15)
+        cache.set('a', 'x' * 8)
+        cache.set('b', 'y' * 8)
+        cache.set('too large', 'z' * 30)
+
+        self.assertIsNone(cache.get('too large'))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'y' * 8)
+        self.assertEqual(cache.stats()['bytes'], 10)
+
+    def test_persistent_tier_byte_cap_keeps_the_most_recently_used_rows(self):
+        cache = TieredCache('bytes', max_entries=1, db_path=self.db_path, max_db_entries=None, max_bytes=250)
+        # 100 encoded bytes per row; each write is over 1/16 of the cap, so every write trims
+        for index in range(3):
+            cache.set(f'key {index}', 'x' * 98)
+        self.assertEqual(self.db_keys(cache), {'key 1', 'key 2'})
+
+        cache._db_get('key 1')
+        cache.set('key 3', 'x' * 98)
+        self.assertEqual(self.db_keys(cache), {'key 1', 'key 3'})
+
+    def test_make_cache_key_ignores_key_order(self):
+        self.assertEqual(make_cache_key({'a': 1, 'b': 2}), make_cache_key({'b': 2, 'a': 1}))
+        self.assertNotEqual(make_cache_key({'a': 1}), make_cache_key({'a': 2}))
+
+
+class PartialExecutionTests(EngineTestCase):
+
+    async def test_unchanged_upstream_nodes_are_reused(self):
+        nodes = [make_node('a'), make_node('b'), make_node('c')]
+        edges = [make_edge('a', 'b'), make_edge('b', 'c')]
+        first = await self.run_workflow(nodes, edges)
+        StepExecutor.calls = []
+
+        second = await self.run_workflow(nodes, edges, start_node_id='b', previous_node_states=first.node_states)
+
+        self.assertEqual(second.status, 'completed')
+        self.assertEqual(StepExecutor.calls, ['b', 'c'])
+        self.assertTrue(second.node_states['a']['reused'])
+        self.assertNotIn('reused', second.node_states['b'])
+
+    async def test_changed_upstream_nodes_run_again(self):
+        nodes = [make_node('a'), make_node('b')]
+        edges = [make_edge('a', 'b')]
+        first = await self.run_workflow(nodes, edges)
+        StepExecutor.calls = []
+
+        nodes[0] = make_node('a', delay=0.01)
+        await self.run_workflow(nodes, edges, start_node_id='b', previous_node_states=first.node_states)
+
+        self.assertEqual(StepExecutor.calls, ['a', 'b'])
+
+
+class ConfigFoldingTests(EngineTestCase):
+
+    def workflow(self):
+        nodes = [make_node('model', 'gpt-4-turbo', temperature=0), make_node('agent')]
+        return nodes, [make_edge('model', 'agent', target_handle='chat-model')]
+
+    async def test_static_config_node_is_folded_into_the_plan(self):
+        nodes, edges = self.workflow()
+
+        context = await self.run_workflow(nodes, edges)
+
+        self.assertEqual(context.status, 'completed')
+        self.assertTrue(context.node_states['model']['folded'])
+        self.assertEqual(context.execution_order, ['model', 'agent'])
+        self.assertEqual(StepExecutor.inputs['agent']['chat-model']['model'], 'gpt-4-turbo')
+
+    def test_config_node_with_inputs_is_not_folded(self):
+        nodes = [make_node('source'), make_node('model', 'gpt-4-turbo')]
+
+        plan = CompiledWorkflow('workflow', '1', nodes, [make_edge('source', 'model')])
+
+        self.assertEqual(plan.folded_results, {})
+
+    async def test_consumers_cannot_mutate_the_folded_result(self):
+        nodes, edges = self.workflow()
+        first = await self.run_workflow(nodes, edges, execution_id='first')
+        first.node_results['model']['main']['model'] = 'mutated'
+
+        await self.run_workflow(nodes, edges, execution_id='second')
+
+        self.assertEqual(StepExecutor.inputs['agent']['chat-model']['model'], 'gpt-4-turbo')
+
+    async def test_failed_folding_falls_back_to_running_the_node(self):
+        nodes, edges = self.workflow()
+
+        with mock.patch.object(ChatModelExecutor, 'build_config', side_effect=ValueError('invalid model')):
+            context = await self.run_workflow(nodes, edges)
+
+        self.assertNotIn('folded', context.node_states['model'])
+        self.assertEqual(context.status, 'error')
+        self.assertEqual(context.errors, {'model': 'invalid model'})
+        self.assertEqual(StepExecutor.calls, [])
+
+
+class TimeoutAndCancellationTests(EngineTestCase):
+
+    async def test_node_timeout(self):
+        context = await self.run_workflow([make_node('slow', delay=5, timeout=0.05)], [])
+
+        self.assertEqual(context.status, 'error')
+        self.assertEqual(context.errors['slow'], 'Node slow timed out after 0.05s')
+
+    async def test_execution_deadline(self):
+        started = time.monotonic()
+        context = await self.run_workflow([make_node('slow', delay=5, timeout=0)], [], timeout=0.1)
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(context.status, 'error')
+        self.assertEqual(context.errors['slow'], 'Execution deadline exceeded')
+
+    async def test_cancel_execution_stops_running_nodes(self):
+        nodes = [make_node('slow', delay=5), make_node('after')]
+        task = asyncio.ensure_future(self.run_workflow(nodes, [make_edge('slow', 'after')], execution_id='cancelled'))
+        await asyncio.sleep(0.05)
+
+        self.assertTrue(self.engine.cancel_execution('cancelled'))
+        context = await task
+
+        self.assertEqual(context.status, 'stopped')
+        self.assertEqual(context.node_states['slow']['status'], 'cancelled')
+        self.assertNotIn('after', StepExecutor.calls)
+
+    def test_cancel_unknown_execution(self):
+        self.assertFalse(self.engine.cancel_execution('missing'))
+
+    def test_node_timeouts_are_resolved_at_compile_time(self):
+        plan = CompiledWorkflow('workflow', '1', [
+            make_node('default'),
+            make_node('explicit', timeout=5),
+            make_node('disabled', timeout=0),
+            make_node('code', 'code'),
+        ], [])
+
+        self.assertEqual(plan.node_timeouts['default'], 60)
+        self.assertEqual(plan.node_timeouts['explicit'], 5)
+        self.assertIsNone(plan.node_timeouts['disabled'])
+        self.assertEqual(plan.node_timeouts['code'], 30)
+
+
+class HTTPClientPoolTests(HTTPNodeTestCase):
+
+    def test_client_is_shared_across_event_loops(self):
+        pool = self.make_pool(lambda request: httpx.Response(200, json={'ok': True}))
+
+        for _ in range(3):
+            # async_to_sync runs each call on a new event loop
+            response = async_to_sync(pool.request)('GET', 'https://api.example.com/items')
+            self.assertEqual(response.json(), {'ok': True})
+
+        stats = pool.stats()
+        self.assertEqual(stats['clients_created'], 1)
+        self.assertEqual(stats['open_clients'], 1)
+        self.assertEqual(stats['requests'], 3)
+
+    async def test_requests_are_limited_per_host(self):
+        active = {'now': 0, 'peak': 0}
+
+        async def handler(request):
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+            await asyncio.sleep(0.02)
+            active['now'] -= 1
+            return httpx.Response(200)
+
+        pool = self.make_pool(handler, PER_HOST_LIMIT=2)
+        await asyncio.gather(*[pool.request('GET', 'https://api.example.com/items') for _ in range(6)])
+
+        self.assertEqual(active['peak'], 2)
+
+    async def test_client_is_only_usable_on_the_pool_loop(self):
+        pool = self.make_pool(lambda request: httpx.Response(200))
+
+        with self.assertRaises(RuntimeError):
+            pool.get_client()
+
+    def redirecting_handler(self, request):
+        if request.url.path == '/old':
+            return httpx.Response(302, headers={'location': 'https://api.example.com/new'})
+        return httpx.Response(200, json={'moved': True})
+
+    async def test_http_node_does_not_follow_redirects_by_default(self):
+        pool = self.make_pool(self.redirecting_handler)
+
+        with self.assertRaisesMessage(NodeExecutionError, '302'):
+            await self.run_http_node(pool, url='https://api.example.com/old')
+
+    async def test_http_node_follows_redirects_when_enabled(self):
+        pool = self.make_pool(self.redirecting_handler)
+
+        result = await self.run_http_node(pool, url='https://api.example.com/old', followRedirects=True)
+
+        self.assertEqual(result['status_code'], 200)
+        self.assertEqual(result['data'], {'moved': True})
+
+
+class HTTPResponseBodyTests(HTTPNodeTestCase):
+
+    def setUp(self):
+        self.spill_dir = tempfile.mkdtemp()
+        settings_override = override_settings(HTTP_REQUEST_NODE={'SPILL_DIR': self.spill_dir})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.body = json.dumps({'data': {'items': [{'id': 1}, {'id': 2}]}, 'padding': 'x' * 4096}).encode()
+        self.pool = self.make_pool(lambda request: httpx.Response(200, content=self.body, headers={'content-type': 'application/json'}))
+
+    async def test_small_bodies_stay_in_memory(self):
+        result = await self.run_http_node(self.pool, url='https://api.example.com/items')
+
+        self.assertEqual(result['data']['data']['items'], [{'id': 1}, {'id': 2}])
+        self.assertNotIn('body_file', result)
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    async def test_large_bodies_are_spilled_to_a_file(self):
+        result = await self.run_http_node(self.pool, url='https://api.example.com/items', maxInMemoryMB=0.001)
+
+        body_file = result['body_file']
+        self.addCleanup(os.unlink, body_file['path'])
+        self.assertIsNone(result['data'])
+        self.assertEqual(os.path.dirname(body_file['path']), self.spill_dir)
+        self.assertEqual(body_file['size'], len(self.body))
+        self.assertEqual(body_file['content_type'], 'application/json')
+        with open(body_file['path'], 'rb') as file:
+            self.assertEqual(file.read(), self.body)
+
+    async def test_json_path_selects_part_of_the_body(self):
+        result = await self.run_http_node(self.pool, url='https://api.example.com/items', jsonPath='$.data.items[*].id')
+
+        self.assertEqual(result['data'], [1, 2])
+
+    async def test_invalid_max_in_memory_size_is_rejected(self):
+        for value in ('lots', -1, 'nan'):
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(NodeExecutionError, 'Max In-Memory Size (MB)'):
+                    await self.run_http_node(self.pool, url='https://api.example.com/items', maxInMemoryMB=value)
+
+    def test_project_json_path(self):
+        document = {'data': {'items': [{'id': 1, 'tags': ['a']}, {'id': 2}]}}
+
+        self.assertEqual(project_json_path(document, 'data.items[0].id'), 1)
+        self.assertEqual(project_json_path(document, '$.data.items[1]'), {'id': 2})
+        self.assertEqual(project_json_path(document, 'data.items[*].tags[0]'), ['a', None])
+        self.assertIsNone(project_json_path(document, 'data.missing.id'))
+        self.assertIsNone(project_json_path(document, 'data.items[5]'))
+
+
+class HTTPResponseCacheTests(HTTPNodeTestCase):
+
+    def setUp(self):
+        self.cache = TieredCache('http_responses', db_path=None)
+        for target in ('workflows.node_executors.http_cache.get_response_cache', 'workflows.node_executors.action_nodes.get_response_cache'):
+            patcher = mock.patch(target, return_value=self.cache)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.requests = []
+        self.response_headers = {}
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.headers.get('if-none-match') == '"v1"':
+            return httpx.Response(304, headers={'etag': '"v1"', 'cache-control': 'max-age=60'})
+        return httpx.Response(200, json={'language': request.headers.get('accept-language')}, headers={'etag': '"v1"', **self.response_headers})
+
+    async def fetch(self, headers=None):
+        pool = self.make_pool(self.handler)
+        headers = [{'key': key, 'value': value} for key, value in (headers or {}).items()]
+        return await self.run_http_node(pool, url='https://api.example.com/items', cacheResponses=True, headers=headers)
+
+    async def test_fresh_responses_are_served_from_cache(self):
+        self.response_headers = {'cache-control': 'max-age=60'}
+        await self.fetch()
+
+        result = await self.fetch()
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertTrue(result['from_cache'])
+        self.assertFalse(result['revalidated'])
+
+    async def test_stale_responses_are_revalidated(self):
+        self.response_headers = {'cache-control': 'no-cache'}
+        await self.fetch()
+
+        result = await self.fetch()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].headers['if-none-match'], '"v1"')
+        self.assertTrue(result['revalidated'])
+        self.assertEqual(result['status_code'], 200)
+        self.assertEqual(result['data'], {'language': None})
+
+        # The 304 made the entry fresh for another minute
+        await self.fetch()
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_private_responses_are_not_stored(self):
+        self.response_headers = {'cache-control': 'private, max-age=60'}
+        await self.fetch()
+        await self.fetch()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn('if-none-match', self.requests[1].headers)
+
+    async def test_responses_to_requests_with_credentials_need_public(self):
+        self.response_headers = {'cache-control': 'max-age=60'}
+        for headers in ({'Authorization': 'Bearer one'}, {'X-Api-Key': 'one'}):
+            with self.subTest(headers=headers):
+                self.requests.clear()
+                await self.fetch(headers)
+                await self.fetch(headers)
+                self.assertEqual(len(self.requests), 2)
+
+        self.requests.clear()
+        self.response_headers = {'cache-control': 'public, max-age=60'}
+        await self.fetch({'Authorization': 'Bearer one'})
+        await self.fetch({'Authorization': 'Bearer one'})
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_vary_headers_select_the_stored_response(self):
+        self.response_headers = {'cache-control': 'max-age=60', 'vary': 'Accept-Language'}
+        await self.fetch({'Accept-Language': 'en'})
+        await self.fetch({'Accept-Language': 'de'})
+
+        english = await self.fetch({'Accept-Language': 'en'})
+        german = await self.fetch({'accept-language': 'de'})
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(english['data'], {'language': 'en'})
+        self.assertEqual(german['data'], {'language': 'de'})
+
+    async def test_vary_star_is_not_stored(self):
+        self.response_headers = {'cache-control': 'max-age=60', 'vary': '*'}
+        await self.fetch()
+        await self.fetch()
+
+        self.assertEqual(len(self.requests), 2)
+
+
+class PaginationTests(HTTPNodeTestCase):
+
+    def setUp(self):
+        self.items = list(range(10))
+        self.requests = []
+        self.total = 10
+
+    def handler(self, request):
+        """Serves self.items by page/per_page, offset/limit or cursor"""
+        self.requests.append(request)
+        params = request.url.params
+        if 'cursor' in params or request.url.path == '/cursor':
+            start = int(params.get('cursor', 0))
+            end = start + 3
+            return httpx.Response(200, json={'data': self.items[start:end], 'next_cursor': str(end) if end < len(self.items) else None})
+        if 'offset' in params:
+            start, size = int(params['offset']), int(params['limit'])
+        else:
+            size = int(params['per_page'])
+            start = (int(params['page']) - 1) * size
+        return httpx.Response(200, json={'data': self.items[start:start + size], 'total': self.total})
+
+    async def paginate(self, **properties):
+        pool = self.make_pool(self.handler)
+        properties = {'url': 'https://api.example.com/items', 'pagination': 'page', 'pageSize': 3, 'itemsPath': 'data', **properties}
+        return await self.run_http_node(pool, **properties)
+
+    def items_of(self, result):
+        return [item for batch in result['batches'] for item in batch]
+
+    async def test_known_total_fetches_every_page_in_order(self):
+        result = await self.paginate(totalPath='total', pageConcurrency=4)
+
+        self.assertEqual(self.items_of(result), self.items)
+        self.assertEqual(result['page_count'], 4)
+        self.assertFalse(result['truncated'])
+
+    async def test_offset_pagination(self):
+        result = await self.paginate(pagination='offset', totalPath='total')
+
+        self.assertEqual(self.items_of(result), self.items)
+        self.assertEqual({request.url.params['offset'] for request in self.requests}, {'0', '3', '6', '9'})
+
+    async def test_max_pages_truncates(self):
+        for properties in ({'totalPath': 'total'}, {}, {'pagination': 'cursor', 'url': 'https://api.example.com/cursor'}):
+            with self.subTest(properties=properties):
+                result = await self.paginate(maxPages=2, **properties)
+
+                self.assertEqual(self.items_of(result), self.items[:6])
+                self.assertTrue(result['truncated'])
+
+    async def test_byte_budget_truncates(self):
+        with override_settings(HTTP_REQUEST_NODE={'MAX_PAGINATED_BYTES': 60}):
+            with_total = await self.paginate(totalPath='total')
+            without_total = await self.paginate()
+
+        for result in (with_total, without_total):
+            self.assertTrue(result['truncated'])
+            self.assertLess(result['page_count'], 4)
+            self.assertEqual(self.items_of(result), self.items[:3 * result['page_count']])
+
+    async def test_non_numeric_total_walks_until_a_short_page(self):
+        self.total = 'unknown'
+
+        result = await self.paginate(totalPath='total')
+
+        self.assertEqual(self.items_of(result), self.items)
+        self.assertEqual(len(self.requests), 4)
+        self.assertFalse(result['truncated'])
+
+    async def test_cursor_pagination(self):
+        result = await self.paginate(pagination='cursor', url='https://api.example.com/cursor', batchSize=5)
+
+        self.assertEqual(result['batches'], [self.items[:5], self.items[5:]])
+        self.assertFalse(result['truncated'])
+
+    async def test_link_pagination(self):
+        def handler(request):
+            page = int(request.url.params.get('page', 1))
+            headers = {'link': f'<https://api.example.com/items?page={page + 1}>; rel="next"'} if page < 3 else {}
+            return httpx.Response(200, json=[page], headers=headers)
+
+        pool = self.make_pool(handler)
+        result = await self.run_http_node(pool, url='https://api.example.com/items', pagination='link')
+
+        self.assertEqual(self.items_of(result), [1, 2, 3])
+        self.assertFalse(result['truncated'])
+
+    def test_parse_total(self):
+        self.assertEqual(parse_total(42), 42)
+        self.assertEqual(parse_total('42'), 42)
+        self.assertEqual(parse_total(42.0), 42)
+        for value in (None, True, 'many', -1, {'value': 1}, float('inf')):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_total(value))
+
+
+class SearchBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        self.backend = SearchBackend(TieredCache('web_search', db_path=None))
+        self.release = threading.Event()
+        self.fetched = []
+
+    def fake_fetch(self, query, region, max_results):
+        self.fetched.append(query)
+        self.release.wait(5)
+        if query == 'broken':
+            return {'query': query, 'error': 'Search failed: boom', 'results': [], 'total_results': 0}
+        return {'query': query, 'results': [{'title': query}], 'total_results': 1, 'region': region}
+
+    def search_concurrently(self, queries):
+        results = [None] * len(queries)
+
+        def search(index):
+            results[index] = self.backend.search(queries[index])
+
+        threads = [threading.Thread(target=search, args=(index,)) for index in range(len(queries))]
+        for thread in threads:
+            thread.start()
+        while self.backend.stats()['coalesced'] < len(queries) - 1:
+            time.sleep(0.005)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_identical_queries_share_one_search(self):
+        with mock.patch.object(self.backend, '_fetch', side_effect=self.fake_fetch):
+            results = self.search_concurrently(['Django cache', 'django  CACHE', 'django cache'])
+
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual([result['query'] for result in results], ['Django cache', 'django  CACHE', 'django cache'])
+        self.assertTrue(all(result['results'] == [{'title': self.fetched[0]}] for result in results))
+        self.assertEqual(self.backend.stats()['in_flight'], 0)
+
+    def test_results_are_cached(self):
+        self.release.set()
+        with mock.patch.object(self.backend, '_fetch', side_effect=self.fake_fetch):
+            self.backend.search('django cache')
+            result = self.backend.search('Django Cache')
+
+        self.assertEqual(len(self.fetched), 1)
+        self.assertTrue(result['from_cache'])
+        self.assertEqual(result['query'], 'Django Cache')
+
+    def test_failed_searches_are_not_cached(self):
+        self.release.set()
+        with mock.patch.object(self.backend, '_fetch', side_effect=self.fake_fetch):
+            self.backend.search('broken')
+            result = self.backend.search('broken')
+
+        self.assertEqual(len(self.fetched), 2)
+        self.assertIn('error', result)
+
+    def test_exceptions_reach_waiting_callers(self):
+        def failing_fetch(query, region, max_results):
+            self.release.wait(5)
+            raise RuntimeError('search backend down')
+
+        errors = []
+
+        def search():
+            try:
+                self.backend.search('django cache')
+            except RuntimeError as e:
+                errors.append(e)
+
+        with mock.patch.object(self.backend, '_fetch', side_effect=failing_fetch):
+            threads = [threading.Thread(target=search) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            while self.backend.stats()['coalesced'] < 1:
+                time.sleep(0.005)
+            self.release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(self.backend.stats()['in_flight'], 0)
+
+
+class ToolCallDispatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dispatcher = ToolCallDispatcher(max_workers=2)
+        self.addCleanup(self.dispatcher._executor.shutdown)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def call(self, delay):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(delay)
+        with self.lock:
+            self.running -= 1
+        if delay < 0.005:
+            raise ValueError(f'bad call {delay}')
+        return delay
+
+    def test_results_keep_call_order(self):
+        delays = [0.03, 0.01, 0.02, 0.015]
+
+        self.assertEqual(self.dispatcher.map(self.call, delays), delays)
+        self.assertEqual(self.peak, 2)
+
+    def test_failures_fill_their_own_slot(self):
+        results = self.dispatcher.map(self.call, [0.01, 0, 0.02])
+
+        self.assertEqual(results[0], 0.01)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 0.02)
+        self.assertEqual(self.dispatcher.stats()['errors'], 1)
+
+    def test_single_call_runs_inline(self):
+        threads = self.dispatcher.map(lambda item: threading.current_thread(), ['query'])
+
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(self.dispatcher.stats()['calls'], 1)
+
+
+class MockLLMGateway(LLMGateway):
+    """LLMGateway whose provider clients answer requests with handler(request)"""
+
+    def __init__(self, handler, config=None, provider_limits=None):
+        super().__init__({'BACKOFF_BASE': 0.001, 'BACKOFF_MAX': 0.01, **(config or {})}, provider_limits)
+        self.handler = handler
+
+    def _build_client(self, provider, api_key, base_url):
+        headers = super()._build_client(provider, api_key, base_url).headers
+        return httpx.AsyncClient(base_url=base_url, headers=headers, transport=httpx.MockTransport(self.handler))
+
+
+def completion(text, **body):
+    return httpx.Response(200, json={
+        'model': 'gpt-test',
+        'choices': [{'message': {'content': text}}],
+        'usage': {'prompt_tokens': 3, 'completion_tokens': 2},
+        **body
+    })
+
+
+class LLMGatewayTests(SimpleTestCase):
+
+    def setUp(self):
+        self.requests = []
+        # Responses (or exceptions) returned to successive requests
+        self.responses = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        response = self.responses.pop(0) if self.responses else completion('hello')
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def make_gateway(self, **kwargs):
+        gateway = MockLLMGateway(self.handler, **kwargs)
+        self.addCleanup(gateway.close)
+        return gateway
+
+    async def complete(self, gateway, provider='openai', api_key='key-one', **kwargs):
+        return await gateway.complete(provider, 'gpt-test', [{'role': 'user', 'content': 'hi'}], api_key, **kwargs)
+
+    def test_clients_are_shared_across_event_loops(self):
+        gateway = self.make_gateway()
+
+        for api_key in ('key-one', 'key-one', 'key-two'):
+            result = async_to_sync(self.complete)(gateway, api_key=api_key)
+            self.assertEqual(result['text'], 'hello')
+
+        self.assertEqual(gateway.stats()['clients_created'], 2)
+        self.assertEqual([request.headers['authorization'] for request in self.requests], ['Bearer key-one', 'Bearer key-one', 'Bearer key-two'])
+        self.assertEqual(str(self.requests[0].url), 'https://api.openai.com/v1/chat/completions')
+
+    async def test_retryable_statuses_are_retried(self):
+        gateway = self.make_gateway()
+        self.responses = [httpx.Response(429, headers={'retry-after': '0'}), httpx.Response(503)]
+
+        result = await self.complete(gateway)
+
+        self.assertEqual(result['text'], 'hello')
+        self.assertEqual(result['usage'], {'prompt_tokens': 3, 'completion_tokens': 2})
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(gateway.stats()['providers']['openai']['retries'], 2)
+
+    async def test_other_errors_fail_without_retrying(self):
+        gateway = self.make_gateway()
+        self.responses = [httpx.Response(400, json={'error': {'message': 'unknown model'}})]
+
+        with self.assertRaisesMessage(LLMGatewayError, 'unknown model') as raised:
+            await self.complete(gateway)
+
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(gateway.stats()['providers']['openai']['errors'], 1)
+
+    async def test_transport_errors_are_retried_up_to_max_retries(self):
+        gateway = self.make_gateway(config={'MAX_RETRIES': 1})
+        self.responses = [httpx.ConnectError('refused'), httpx.ConnectError('refused')]
+
+        with self.assertRaisesMessage(LLMGatewayError, 'refused'):
+            await self.complete(gateway)
+
+        self.assertEqual(len(self.requests), 2)
+
+    def test_retry_delay_honours_retry_after_up_to_backoff_max(self):
+        gateway = self.make_gateway(config={'BACKOFF_BASE': 0.1, 'BACKOFF_MAX': 5})
+
+        self.assertEqual(gateway._retry_delay(0, httpx.Response(429, headers={'retry-after': '3'})), 3)
+        self.assertEqual(gateway._retry_delay(0, httpx.Response(429, headers={'retry-after': '30'})), 5)
+        self.assertLessEqual(gateway._retry_delay(0, httpx.Response(429, headers={'retry-after': 'soon'})), 0.1)
+        self.assertLessEqual(gateway._retry_delay(10), 5)
+
+    async def test_provider_concurrency_is_limited(self):
+        active = {'now': 0, 'peak': 0}
+
+        async def handler(request):
+            active['now'] += 1
+            active['peak'] = max(active['peak'], active['now'])
+            await asyncio.sleep(0.02)
+            active['now'] -= 1
+            return completion('hello')
+
+        gateway = MockLLMGateway(handler, provider_limits={'openai': 1})
+        self.addCleanup(gateway.close)
+        await asyncio.gather(*[self.complete(gateway) for _ in range(3)])
+
+        self.assertEqual(active['peak'], 1)
+
+    async def test_anthropic_uses_the_messages_api(self):
+        gateway = self.make_gateway()
+        self.responses = [httpx.Response(200, json={
+            'content': [{'type': 'text', 'text': 'bonjour'}],
+            'usage': {'input_tokens': 4, 'output_tokens': 1}
+        })]
+
+        result = await self.complete(gateway, provider='anthropic', system='Be brief')
+
+        request = self.requests[0]
+        self.assertEqual(str(request.url), 'https://api.anthropic.com/v1/messages')
+        self.assertEqual(request.headers['x-api-key'], 'key-one')
+        self.assertEqual(json.loads(request.content)['system'], 'Be brief')
+        self.assertEqual(result['text'], 'bonjour')
+        self.assertEqual(result['usage'], {'prompt_tokens': 4, 'completion_tokens': 1})
+
+    async def test_stream_yields_text_deltas(self):
+        gateway = self.make_gateway()
+        events = [{'choices': [{'delta': {'content': 'Hel'}}]}, {'choices': [{'delta': {'content': 'lo'}}]}]
+        body = ''.join(f'data: {json.dumps(event)}\n\n' for event in events) + 'data: [DONE]\n\n'
+        self.responses = [httpx.Response(503), httpx.Response(200, text=body)]
+
+        deltas = [delta async for delta in gateway.stream('openai', 'gpt-test', [{'role': 'user', 'content': 'hi'}], 'key-one')]
+
+        self.assertEqual(deltas, ['Hel', 'lo'])
+        self.assertTrue(json.loads(self.requests[-1].content)['stream'])
+        stats = gateway.stats()['providers']['openai']
+        self.assertEqual((stats['streams'], stats['retries'], stats['in_flight']), (1, 1, 0))
+
+
+class LLMResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.gateway = MockLLMGateway(self.handler)
+        self.addCleanup(self.gateway.close)
+        patcher = mock.patch('workflows.node_executors.llm_gateway.get_response_cache', return_value=TieredCache('llm_responses', db_path=None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handler(self, request):
+        self.requests.append(request)
+        return completion(f'answer {len(self.requests)}')
+
+    async def summarize(self, text='A long text', **properties):
+        executor = AINodeExecutor('summary', 'summarization-chain', {'properties': {'api_key': 'key-one', **properties}})
+        with mock.patch('workflows.node_executors.ai_nodes.get_llm_gateway', return_value=self.gateway):
+            return (await executor.execute({'main': {'text': text}}, {}))['main']
+
+    async def test_responses_are_not_cached_by_default(self):
+        first = await self.summarize()
+        second = await self.summarize()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(second['summary'], 'answer 2')
+        self.assertEqual(second['llm_cache'], {'enabled': False, 'hit': False})
+        self.assertNotIn('temperature', json.loads(self.requests[0].content))
+        self.assertEqual(first['llm_cache'], second['llm_cache'])
+
+    async def test_nodes_opt_in_with_cache_responses(self):
+        first = await self.summarize(cacheResponses=True)
+        second = await self.summarize(cacheResponses=True)
+        other_text = await self.summarize('Another text', cacheResponses=True)
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(first['llm_cache'], {'enabled': True, 'hit': False})
+        self.assertEqual(second['llm_cache'], {'enabled': True, 'hit': True})
+        self.assertEqual(second['summary'], first['summary'])
+        self.assertEqual(other_text['summary'], 'answer 2')
+        self.assertEqual(self.gateway.stats()['providers']['openai']['cache_hits'], 1)
+
+
+class SemanticCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def make_cache(self, **kwargs):
+        cache = SemanticCache(self.directory, **{'dim': 256, 'max_entries': 8, 'threshold': 0.9, **kwargs})
+        self.addCleanup(lambda: cache._connection and cache._connection.close())
+        return cache
+
+    def test_paraphrases_hit_above_the_threshold(self):
+        cache = self.make_cache()
+        cache.store('assistant', 'How do I reset my password?', 'Use the reset link.')
+
+        hit = cache.lookup('assistant', 'how can I reset my password')
+
+        self.assertEqual(hit['answer'], 'Use the reset link.')
+        self.assertGreaterEqual(hit['similarity'], 0.9)
+        self.assertIsNone(cache.lookup('assistant', 'What is the weather in Paris?'))
+        self.assertIsNone(cache.lookup('other scope', 'How do I reset my password?'))
+
+    def test_threshold(self):
+        question, paraphrase = 'How do I export a workflow as JSON?', 'How do I export my workflows to JSON files?'
+        similarity = sum(a * b for a, b in zip(embed_text(question, 256), embed_text(paraphrase, 256)))
+        strict = self.make_cache(threshold=min(1.0, similarity + 0.01))
+        strict.store('assistant', question, 'Use export.')
+
+        self.assertIsNone(strict.lookup('assistant', paraphrase))
+        self.assertIsNotNone(self.make_cache(threshold=similarity - 0.01).lookup('assistant', paraphrase))
+
+    def test_least_recently_used_entry_is_evicted_when_full(self):
+        cache = self.make_cache(max_entries=2)
+        cache.store('assistant', 'first question about billing', 'one')
+        cache.store('assistant', 'second question about invoices', 'two')
+        cache.lookup('assistant', 'first question about billing')
+        cache.store('assistant', 'third question about refunds', 'three')
+
+        self.assertEqual(cache.lookup('assistant', 'first question about billing')['answer'], 'one')
+        self.assertIsNone(cache.lookup('assistant', 'second question about invoices'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        cache = self.make_cache(ttl_seconds=0.01)
+        cache.store('assistant', 'How do I reset my password?', 'Use the reset link.')
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.lookup('assistant', 'How do I reset my password?'))
+
+    def test_entries_survive_a_new_instance(self):
+        self.make_cache().store('assistant', 'How do I reset my password?', 'Use the reset link.')
+
+        hit = self.make_cache().lookup('assistant', 'How do I reset my password?')
+
+        self.assertEqual(hit['answer'], 'Use the reset link.')
+
+    def test_rebuild_applies_new_dimensions_and_capacity(self):
+        cache = self.make_cache(ttl_seconds=None)
+        for index, topic in enumerate(['billing', 'invoices', 'refunds']):
+            cache.store('assistant', f'question about {topic}', f'answer {index}')
+            time.sleep(0.001)
+
+        resized = self.make_cache(dim=128, max_entries=2, ttl_seconds=None)
+        kept = resized.rebuild()
+
+        self.assertEqual(kept, 2)
+        self.assertEqual(resized.stats()['entries'], 2)
+        self.assertEqual(resized.lookup('assistant', 'question about refunds')['answer'], 'answer 2')
+        self.assertEqual(resized.lookup('assistant', 'question about invoices')['answer'], 'answer 1')
+
+
+class DBMemoryBackendTests(TestCase):
+
+    def setUp(self):
+        self.backend = DBMemoryBackend(workers=1)
+        self.addCleanup(self.backend._executor.shutdown)
+        self.collection, _ = self.backend.get_or_create_collection('conversation', 'workflow', 'node', 3)
+
+    def add_messages(self, count):
+        start = timezone.now()
+        MemoryMessage.objects.bulk_create([
+            MemoryMessage(collection=self.collection, role='user' if index % 2 == 0 else 'assistant',
+                          content=f'message {index}', timestamp=start + timedelta(seconds=index))
+            for index in range(count)
+        ])
+
+    def test_get_or_create_collection_reuses_the_collection(self):
+        collection, created = self.backend.get_or_create_collection('conversation', 'workflow', 'node', 3)
+
+        self.assertFalse(created)
+        self.assertEqual(collection.id, self.collection.id)
+
+    def test_tail_returns_the_newest_messages_oldest_first(self):
+        self.add_messages(5)
+
+        self.assertEqual(
+            self.backend.tail(self.collection.id, 3),
+            [('user', 'message 2'), ('assistant', 'message 3'), ('user', 'message 4')]
+        )
+        self.assertEqual(len(self.backend.tail(self.collection.id, 10)), 5)
+
+    def test_trim_keeps_the_window(self):
+        self.add_messages(5)
+
+        self.assertEqual(self.backend.trim(self.collection.id, 2), 3)
+        self.assertEqual(
+            list(MemoryMessage.objects.filter(collection=self.collection).values_list('content', flat=True)),
+            ['message 3', 'message 4']
+        )
+        self.assertEqual(self.backend.trim(self.collection.id, 2), 0)
+
+    def test_trim_of_an_empty_collection(self):
+        self.assertEqual(self.backend.trim(self.collection.id, 3), 0)
+
+
+class DBMemoryWriteBehindTests(TransactionTestCase):
+
+    def setUp(self):
+        self.backend = DBMemoryBackend(workers=1, shards=4)
+        self.addCleanup(self.backend._executor.shutdown)
+
+    async def create_collection(self, name='conversation', window_size=3):
+        collection, _ = await self.backend.run(self.backend.get_or_create_collection, name, 'workflow', 'node', window_size)
+        return collection
+
+    async def test_messages_are_written_on_flush(self):
+        collection = await self.create_collection()
+        for index in range(5):
+            self.backend.enqueue(collection.id, 'user', f'message {index}', 3)
+
+        self.assertEqual(await self.backend.run(self.backend.tail, collection.id, 10), [])
+        self.assertEqual(self.backend.stats()['pending_messages'], 5)
+
+        await self.backend.flush(collection.id)
+
+        self.assertEqual(
+            await self.backend.run(self.backend.tail, collection.id, 10),
+            [('user', 'message 2'), ('user', 'message 3'), ('user', 'message 4')]
+        )
+        stats = self.backend.stats()
+        self.assertEqual(stats['pending_messages'], 0)
+        self.assertEqual(stats['flushes'], 1)
+        self.assertEqual(stats['flushed_messages'], 5)
+
+    async def test_flush_only_writes_its_collection(self):
+        first = await self.create_collection('first')
+        second = await self.create_collection('second')
+        self.backend.enqueue(first.id, 'user', 'first', 3)
+        self.backend.enqueue(second.id, 'user', 'second', 3)
+
+        await self.backend.flush(first.id)
+
+        self.assertEqual(self.backend.stats()['pending_collections'], 1)
+        self.assertEqual(await self.backend.run(self.backend.tail, second.id, 3), [])
+
+    async def test_failed_flush_keeps_messages_in_order(self):
+        collection = await self.create_collection()
+        self.backend.enqueue(collection.id, 'user', 'first', 3)
+
+        with mock.patch.object(self.backend, 'write_batch', side_effect=RuntimeError('database is down')):
+            await self.backend.flush(collection.id)
+        self.backend.enqueue(collection.id, 'assistant', 'second', 3)
+        await self.backend.flush(collection.id)
+
+        self.assertEqual(self.backend.stats()['flush_errors'], 1)
+        self.assertEqual(
+            await self.backend.run(self.backend.tail, collection.id, 3),
+            [('user', 'first'), ('assistant', 'second')]
+        )
+
+    async def test_flush_all_writes_every_collection(self):
+        collections = [await self.create_collection(f'conversation {index}') for index in range(3)]
+        for collection in collections:
+            self.backend.enqueue(collection.id, 'user', 'hello', 3)
+
+        await self.backend.run(self.backend.flush_all)
+
+        self.assertEqual(self.backend.stats()['pending_messages'], 0)
+        for collection in collections:
+            self.assertEqual(await self.backend.run(self.backend.tail, collection.id, 3), [('user', 'hello')])
+
+    async def test_discard_drops_buffered_messages(self):
+        collection = await self.create_collection()
+        self.backend.enqueue(collection.id, 'user', 'hello', 3)
+
+        self.backend.discard(collection.id)
+        await self.backend.flush(collection.id)
+
+        self.assertEqual(await self.backend.run(self.backend.tail, collection.id, 3), [])
+
+
+class MemoryStoreTestCase(TransactionTestCase):
+    """Acquires FakeMemory conversations from stores backed by a private DBMemoryBackend"""
+
+    def setUp(self):
+        self.backend = DBMemoryBackend(workers=1)
+        self.addCleanup(self.backend._executor.shutdown)
+
+    async def use(self, store, key, *messages):
+        memory, status = await store.acquire(key, FakeMemory, 10)
+        for content in messages:
+            memory.add_user_message(content)
+        store.release(key)
+        return memory, status
+
+
+class ConversationMemoryStoreTests(MemoryStoreTestCase):
+
+    def make_store(self, **kwargs):
+        options = {'max_entries': 2, 'max_bytes': None, 'ttl_seconds': None, 'spill': False, **kwargs}
+        return ConversationMemoryStore(self.backend, **options)
+
+    async def test_least_recently_used_conversation_is_evicted(self):
+        store = self.make_store()
+        await self.use(store, 'a')
+        await self.use(store, 'b')
+        await self.use(store, 'a')
+        await self.use(store, 'c')
+
+        self.assertEqual(list(store._entries), ['a', 'c'])
+        self.assertEqual(store.stats()['evictions'], 1)
+        self.assertEqual((await self.use(store, 'a'))[1], 'hit')
+
+    async def test_byte_budget_evicts_conversations(self):
+        store = self.make_store(max_entries=10, max_bytes=1000)
+        await self.use(store, 'a', 'x' * 600)
+        await self.use(store, 'b', 'x' * 600)
+
+        self.assertEqual(list(store._entries), ['b'])
+        self.assertLessEqual(store.stats()['bytes'], 1000)
+
+    async def test_pinned_conversation_is_not_evicted(self):
+        store = self.make_store(max_entries=1)
+        memory, _ = await store.acquire('a', FakeMemory, 10)
+        await store.acquire('b', FakeMemory, 10)
+
+        self.assertEqual(store.stats()['pinned'], 2)
+        store.release('b')
+        self.assertEqual(list(store._entries), ['a'])
+
+        memory.add_user_message('still running')
+        store.release('a')
+        self.assertEqual(store.stats()['pinned'], 0)
+        self.assertEqual(list(store._entries), ['a'])
+
+    async def test_idle_conversation_expires(self):
+        store = self.make_store(ttl_seconds=0.01)
+        await self.use(store, 'a', 'hello')
+        await asyncio.sleep(0.02)
+
+        memory, status = await self.use(store, 'a')
+
+        self.assertEqual(status, 'new')
+        self.assertEqual(memory.messages(), [])
+        self.assertEqual(store.stats()['expirations'], 1)
+
+    async def test_evicted_conversation_is_rehydrated(self):
+        store = self.make_store(max_entries=1, spill=True)
+        await self.use(store, 'a', 'first', 'second')
+        await self.use(store, 'b', 'other')
+
+        memory, status = await self.use(store, 'a')
+
+        self.assertEqual(status, 'rehydrated')
+        self.assertEqual([(message.role, message.content) for message in memory.messages()],
+                         [('user', 'first'), ('user', 'second')])
+        self.assertEqual(store.stats()['rehydrated'], 1)
+
+    async def test_conversation_evicted_while_pinned_spills_its_whole_turn(self):
+        store = self.make_store(max_entries=1, spill=True)
+        memory, _ = await store.acquire('a', FakeMemory, 10)
+        await self.use(store, 'b')
+        memory.add_user_message('question')
+        memory.add_ai_message('answer')
+        store.release('a')
+        await self.use(store, 'c')
+
+        memory, status = await self.use(store, 'a')
+
+        self.assertEqual(status, 'rehydrated')
+        self.assertEqual([message.content for message in memory.messages()], ['question', 'answer'])
+
+    async def test_spills_are_kept_apart_from_memory_collections(self):
+        store = self.make_store(max_entries=1, spill=True)
+        await self.use(store, 'a', 'first')
+        await self.use(store, 'b', 'other')
+        await self.use(store, 'a')
+
+        self.assertEqual(await self.backend.run(MemoryCollection.objects.count), 0)
+        spilled = await self.backend.run(lambda: SpilledConversation.objects.get(key='a'))
+        self.assertEqual(spilled.messages, [['user', 'first']])
+
+    def test_concurrent_spills_of_a_key_share_one_row(self):
+        store = self.make_store(spill=True)
+        entry = {'workflow_id': 'workflow', 'node_id': 'node', 'window_size': 10}
+        barrier = threading.Barrier(4)
+
+        def spill(index):
+            barrier.wait(5)
+            store._write_spill('a', [('user', f'message {index}')], entry)
+
+        threads = [threading.Thread(target=spill, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(SpilledConversation.objects.filter(key='a').count(), 1)
+        self.assertEqual(len(store._read_spill('a', 10)), 1)
+
+    def test_spilled_collections_of_earlier_versions_are_moved(self):
+        migration = importlib.import_module('workflows.migrations.0010_spilledconversation')
+        older = MemoryCollection.objects.create(name='spill:a', workflow_id='workflow', node_id='node', window_size=2)
+        newer = MemoryCollection.objects.create(name='spill:a', workflow_id='workflow', node_id='node', window_size=2)
+        agent = MemoryCollection.objects.create(name='workflow_1_node_2', workflow_id='workflow', node_id='node')
+        start = timezone.now()
+        for collection, contents in ((older, ['stale']), (newer, ['one', 'two', 'three'])):
+            MemoryMessage.objects.bulk_create([
+                MemoryMessage(collection=collection, role='user', content=content, timestamp=start + timedelta(seconds=index))
+                for index, content in enumerate(contents)
+            ])
+
+        migration.move_spilled_collections(django_apps, None)
+
+        self.assertEqual(list(MemoryCollection.objects.values_list('id', flat=True)), [agent.id])
+        self.assertEqual(SpilledConversation.objects.get(key='a').messages, [['user', 'two'], ['user', 'three']])
+
+
+class ShardedConversationMemoryStoreTests(MemoryStoreTestCase):
+
+    async def test_sharded_store_routes_keys_to_one_shard(self):
+        store = ShardedConversationMemoryStore(
+            self.backend, shards=4, max_entries=8, max_bytes=None, ttl_seconds=None, spill=False
+        )
+        await self.use(store, 'session', 'hello')
+
+        memory, status = await self.use(store, 'session')
+
+        self.assertEqual(status, 'hit')
+        self.assertIs(store.shard('session'), store.shard('session'))
+        self.assertEqual(store.stats()['entries'], 1)
+
+    def test_session_keys(self):
+        self.assertEqual(shard_index('session', 8), shard_index('session', 8))
+        self.assertEqual(session_key({'user': 'bob', 'channel': 'support'}), session_key({'user': 'bob', 'channel': 'support'}))
+        self.assertNotEqual(session_key({'user': 'bob'}), session_key({'user': 'alice'}))
+        self.assertLessEqual(len(session_key({'user': 'x' * 500})), 64)
+
+    def test_shards_split_the_budgets(self):
+        store = ShardedConversationMemoryStore(
+            self.backend, shards=4, max_entries=10, max_bytes=1000, ttl_seconds=None, spill=False
+        )
+
+        self.assertEqual({(shard.max_entries, shard.max_bytes) for shard in store._shards}, {(3, 250)})
+        self.assertEqual(store.stats()['shards'], 4)
+
+    def test_executions_without_a_user_or_channel_share_one_session(self):
+        self.assertEqual(session_key(None), '')
+        self.assertEqual(session_key({'message': 'hi'}), '')
+        self.assertEqual(session_key({'user': 'bob'}), 'bob@default')
+        self.assertEqual(session_key({'channel': 'support'}), 'anonymous@support')
+
+
+class TokenBudgetTests(SimpleTestCase):
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens(None), 0)
+        self.assertEqual(estimate_tokens('hello world'), 2)
+        self.assertEqual(estimate_tokens('Hello, world!'), 4)
+        self.assertEqual(estimate_tokens('internationalization'), 5)
+        self.assertEqual(estimate_tokens('你好世界'), 4)
+
+    def test_truncate_to_tokens_keeps_the_beginning(self):
+        text = 'one two three four five six seven eight'
+
+        self.assertEqual(truncate_to_tokens(text, 5), 'one two three four' + TRUNCATION_MARKER)
+        self.assertEqual(truncate_to_tokens(text, 100), text)
+        self.assertEqual(truncate_to_tokens(text, 1), '')
+
+    def test_fit_messages_keeps_the_newest_messages(self):
+        messages = [('user', 'old message ' * 20), ('assistant', 'middle answer'), ('user', 'newest question')]
+
+        kept, report = fit_messages(messages, 30)
+
+        self.assertEqual(kept, messages[1:])
+        self.assertEqual(report['dropped_messages'], 1)
+        self.assertEqual(report['truncated_messages'], 0)
+        self.assertLessEqual(report['history_tokens'], 30)
+
+    def test_fit_messages_truncates_the_oldest_kept_message(self):
+        messages = [('user', 'old message ' * 20), ('assistant', 'middle answer'), ('user', 'newest question')]
+
+        kept, report = fit_messages(messages, 30, min_truncated_tokens=5)
+
+        self.assertEqual(len(kept), 3)
+        self.assertTrue(kept[0][1].endswith(TRUNCATION_MARKER))
+        self.assertEqual(kept[1:], messages[1:])
+        self.assertEqual(report['truncated_messages'], 1)
+        self.assertLessEqual(report['history_tokens'], 30)
+
+    def test_fit_messages_within_budget_is_unchanged(self):
+        messages = [('user', 'hi'), ('assistant', 'hello')]
+
+        kept, report = fit_messages(messages, 1000)
+
+        self.assertEqual(kept, messages)
+        self.assertEqual(report['dropped_messages'], 0)
+
+    def test_context_window_uses_the_longest_prefix(self):
+        self.assertEqual(context_window('gpt-4o-mini'), 128000)
+        self.assertEqual(context_window('gpt-4-0613'), 8192)
+        self.assertEqual(context_window('my-model', {'my-': 1000}), 1000)
+
+    def test_history_budget(self):
+        config = {'MAX_HISTORY_TOKENS': 4000, 'RESERVED_TOKENS': 512, 'CONTEXT_WINDOWS': {}}
+
+        self.assertEqual(history_budget('gpt-4', 100, 50, 1000, config=config), 4000)
+        self.assertEqual(history_budget('gpt-4', 100, 50, 1000, limit=100000, config=config), 8192 - 100 - 50 - 1000 - 512)
+        self.assertEqual(history_budget('gpt-4', 8000, 0, config=config), 0)
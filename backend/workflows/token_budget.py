@@ -0,0 +1,214 @@
+"""
+Token-budgeted context assembly
+Fast local token estimates and per-model budgets for the conversation history sent to an LLM
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import re
+
+DEFAULT_AGENT_CONTEXT_SETTINGS = {
+    'MAX_HISTORY_TOKENS': 4000,  # History budget when the memory node does not set one
+    'RESERVED_TOKENS': 512,  # Kept free for tool definitions and message formatting
+    'MIN_TRUNCATED_TOKENS': 32,  # An older message is truncated only if at least this much of it fits
+    'CONTEXT_WINDOWS': {},  # Model prefix -> context window, merged over MODEL_CONTEXT_WINDOWS
+}
+
+# Context window (tokens) by model name prefix; the longest matching prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4o': 128000,
+    'gpt-4-turbo': 128000,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+    'o1': 128000,
+    'claude-': 200000,
+    'gemini-1.5': 1000000,
+    'gemini-2': 1000000,
+    'gemini-': 32768,
+    'llama-3.1': 128000,
+    'llama-3.3': 128000,
+    'llama-': 8192,
+    'mixtral-': 32768,
+    'gemma-': 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat formatting cost of one message (role markers and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = ' …'
+
+# Words, numbers and single punctuation marks, roughly how BPE tokenizers split text
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# Words long enough to count as more than one token
+_LONG_WORD_PATTERN = re.compile(r"\w{8,}")
+
+
+def get_agent_context_settings() -> Dict[str, Any]:
+    """Get agent context settings merged over the defaults"""
+    from django.conf import settings
+    return {**DEFAULT_AGENT_CONTEXT_SETTINGS, **getattr(settings, 'AGENT_CONTEXT', {})}
+
+
+def _piece_tokens(piece: str) -> int:
+    # Non-ASCII scripts (e.g. CJK) average about one token per character
+    if not piece.isascii():
+        return len(piece)
+    return max(1, len(piece) // 4)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estimate the token count of text without a tokenizer.
+
+    Words up to seven characters count as one token and longer ones as one
+    per four characters; every punctuation mark is a token. This errs
+    slightly high against BPE tokenizers, which is the safe side for a
+    budget, and runs in microseconds.
+    """
+    if not text:
+        return 0
+    if not text.isascii():
+        return sum(_piece_tokens(match.group()) for match in _TOKEN_PATTERN.finditer(text))
+    # ASCII fast path: one token per piece plus the extra tokens of long words
+    count = len(_TOKEN_PATTERN.findall(text))
+    return count + sum(len(word) // 4 - 1 for word in _LONG_WORD_PATTERN.findall(text))
+
+
+def estimate_message_tokens(content: Optional[str]) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def context_window(model: str, overrides: Optional[Dict[str, int]] = None) -> int:
+    """Get the context window of a model by its longest matching name prefix"""
+    windows = {**MODEL_CONTEXT_WINDOWS, **(overrides or {})}
+    model = (model or '').lower()
+    matches = [prefix for prefix in windows if model.startswith(prefix.lower())]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return windows[max(matches, key=len)]
+
+
+def history_budget(
+    model: str,
+    system_tokens: int,
+    prompt_tokens: int,
+    max_tokens: Optional[int] = None,
+    limit: Optional[int] = None,
+    config: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Tokens available for conversation history in one request.
+
+    The smaller of the configured limit and what is left of the model's
+    context window after the system prompt, the user prompt, the completion
+    and the reserve.
+    """
+    config = config or get_agent_context_settings()
+    if limit in (None, ''):
+        limit = config['MAX_HISTORY_TOKENS']
+    available = (
+        context_window(model, config['CONTEXT_WINDOWS'])
+        - system_tokens - prompt_tokens - int(max_tokens or 0) - config['RESERVED_TOKENS']
+    )
+    return max(0, min(int(limit), available))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens estimated tokens, keeping its beginning"""
+    marker_tokens = estimate_tokens(TRUNCATION_MARKER)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens - marker_tokens
+    if keep <= 0:
+        return ''
+    end = 0
+    count = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        count += _piece_tokens(match.group())
+        if count > keep:
+            break
+        end = match.end()
+    return text[:end].rstrip() + TRUNCATION_MARKER
+
+
+def fit_messages(
+    messages: List[Tuple[str, str]],
+    budget: int,
+    min_truncated_tokens: int = DEFAULT_AGENT_CONTEXT_SETTINGS['MIN_TRUNCATED_TOKENS']
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """
+    Keep the newest (role, content) messages that fit in a token budget.
+
+    Messages are taken newest first. The first one that does not fit is
+    truncated when enough of it fits, and it and everything older are
+    dropped otherwise. Returns (kept messages oldest first, report).
+    """
+    kept: List[Tuple[str, str]] = []
+    used = 0
+    truncated = 0
+    for index in range(len(messages) - 1, -1, -1):
+        role, content = messages[index]
+        tokens = estimate_message_tokens(content)
+        if used + tokens <= budget:
+            kept.append((role, content))
+            used += tokens
+            continue
+        remaining = budget - used - MESSAGE_OVERHEAD_TOKENS
+        if remaining >= min_truncated_tokens:
+            content = truncate_to_tokens(content or '', remaining)
+            kept.append((role, content))
+            used += estimate_message_tokens(content)
+            truncated = 1
+        break
+    kept.reverse()
+    return kept, {
+        'history_budget': budget,
+        'history_tokens': used,
+        'history_messages': len(kept),
+        'dropped_messages': len(messages) - len(kept),
+        'truncated_messages': truncated,
+    }
+
+
+class TokenBudgetedMemory:
+    """
+    View of an agent memory whose messages() fits a token budget.
+
+    The agent runtime reads the history through messages(); everything else
+    (adding messages, clearing) goes to the wrapped memory, which keeps its
+    full window. The pending user prompt, when the runtime has already added
+    it to memory, is always sent whole and is not charged to the budget.
+    """
+
+    def __init__(self, memory, budget: int, prompt: str = '',
+                 min_truncated_tokens: int = DEFAULT_AGENT_CONTEXT_SETTINGS['MIN_TRUNCATED_TOKENS']):
+        self.memory = memory
+        self.budget = budget
+        self.prompt = prompt
+        self.min_truncated_tokens = min_truncated_tokens
+        self.report: Dict[str, Any] = {}
+
+    def messages(self) -> List:
+        from .memory_backends import build_message
+
+        messages = list(self.memory.messages())
+        pinned = []
+        if messages and self.prompt and getattr(messages[-1], 'role', '') == 'user' \
+                and getattr(messages[-1], 'content', '') == self.prompt:
+            pinned = [messages.pop()]
+
+        rows = [(getattr(message, 'role', 'user'), getattr(message, 'content', '') or '') for message in messages]
+        kept, self.report = fit_messages(rows, self.budget, self.min_truncated_tokens)
+
+        # Reuse the original message objects; only a truncated one is rebuilt
+        originals = messages[len(messages) - len(kept):]
+        result = [
+            original if (role, content) == rows[len(rows) - len(kept) + index] else build_message(role, content)
+            for index, (original, (role, content)) in enumerate(zip(originals, kept))
+        ]
+        return result + pinned
+
+    def to_string(self) -> str:
+        return '\n'.join([f"{msg.role}: {msg.content}" for msg in self.messages()])
+
+    def __getattr__(self, name):
+        return getattr(self.memory, name)
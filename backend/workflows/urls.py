@@ -7,7 +7,7 @@ from .views import (
     WorkflowViewSet, WorkflowExecutionViewSet, CredentialViewSet, 
     ExportedWorkflowViewSet, trigger_chat, test_api_key, ai_chat,
     export_workflow, get_exported_workflow, get_available_memory_types,
-    test_memory_connection, get_memory_statistics
+    test_memory_connection, get_memory_statistics, get_execution_metrics
 )
 from .auth_views import signup, signin, signout, get_current_user, check_auth, get_csrf_token
 from .ui_builder_views import UIBuilderProjectViewSet
@@ -41,6 +41,9 @@ urlpatterns = [
     path('memory/test-connection/', test_memory_connection, name='test-memory-connection'),
     path('memory/statistics/', get_memory_statistics, name='get-memory-statistics'),
     
+    # Execution metrics endpoints
+    path('metrics/execution/', get_execution_metrics, name='get-execution-metrics'),
+    
     # UI Builder asset endpoints
     path('ui-assets/upload/', upload_asset, name='upload-asset'),
     path('ui-assets/', list_assets, name='list-assets'),
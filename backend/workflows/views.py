@@ -4,14 +4,22 @@ Django REST Framework views for workflows
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from django.conf import settings as django_settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
 import uuid
 import asyncio
+import json
 import os
+import queue
 import time
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 
 from .models import Workflow, WorkflowExecution, Credential, ExportedWorkflow
 from .serializers import (
@@ -25,6 +33,190 @@ from .serializers import (
     ExportedWorkflowListSerializer
 )
 from .execution_engine import execution_engine
+from .execution_plan import get_compiled_workflow, plan_cache
+from .caching import get_cache_stats, make_cache_key
+from .semantic_cache import get_semantic_cache
+from .memory_backends import get_db_memory_backend, get_memory_store
+from .node_executors.llm_pool import get_llm_pool
+from .node_executors.http_client import get_http_pool
+from .node_executors.llm_gateway import get_llm_gateway, PROVIDER_BASE_URLS
+from .node_executors.search_backend import get_search_backend
+from .node_executors.tool_dispatch import get_tool_dispatcher
+from .execution_queue import (
+    ExecutionRequest,
+    get_execution_queue,
+    get_queue_settings,
+    save_execution,
+    submit_execution
+)
+
+
+def _should_run_async(run_async) -> bool:
+    """Whether an execute request should be queued instead of run inline"""
+    if run_async is None:
+        return get_queue_settings()['ASYNC_BY_DEFAULT']
+    if isinstance(run_async, str):
+        return run_async.lower() in ['1', 'true', 'yes']
+    return bool(run_async)
+
+
+def _accepted_response(request, execution_id: str, **extra) -> Response:
+    """202 response for a queued execution"""
+    return Response({
+        'execution_id': execution_id,
+        'status': 'queued',
+        'status_url': request.build_absolute_uri(reverse('execution-status', args=[execution_id])),
+        **extra
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF content negotiation accept text/event-stream requests"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Error responses (404, 409) carry a dict; send it as JSON rather than its keys
+        if isinstance(data, (dict, list)):
+            return json.dumps(data)
+        return data
+
+
+def _sse(event: dict) -> str:
+    """Format an event as a Server-Sent Events message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+# Seconds between database polls while a queued execution waits for a worker
+EVENT_STREAM_POLL_INTERVAL = 0.25
+
+
+def _stored_execution_events(execution) -> list:
+    """SSE messages replaying a finished (or evicted) execution from its database row"""
+    if execution is None:
+        return []
+    return [
+        _sse({
+            'type': 'snapshot',
+            'execution_id': str(execution.id),
+            'status': execution.status,
+            'nodes': {node_id: state.get('status') for node_id, state in execution.node_states.items()}
+        }),
+        _sse({
+            'type': 'summary',
+            'execution_id': str(execution.id),
+            'status': execution.status,
+            'execution_order': execution.execution_order,
+            'errors': execution.errors
+        }),
+    ]
+
+
+def _get_execution_row(execution_id: str):
+    return WorkflowExecution.objects.filter(id=execution_id).first()
+
+
+def _is_waiting(execution) -> bool:
+    """Whether a stored execution is queued or running (its live context may appear later)"""
+    return execution is not None and execution.status in ['queued', 'running']
+
+
+def _execution_event_stream(execution_id: str):
+    """
+    Yield SSE messages for an execution until it finishes.
+    
+    Used under WSGI, where each streaming response holds its worker thread
+    anyway; ASGI deployments use _execution_event_stream_async instead.
+    """
+    heartbeat = getattr(django_settings, 'WORKFLOW_EVENT_STREAM_HEARTBEAT', 15)
+    
+    # Queued executions get their context once a worker picks them up
+    context = execution_engine.get_execution(execution_id)
+    while context is None:
+        execution = _get_execution_row(execution_id)
+        if not _is_waiting(execution):
+            yield from _stored_execution_events(execution)
+            return
+        yield ': waiting\n\n'
+        time.sleep(EVENT_STREAM_POLL_INTERVAL)
+        context = execution_engine.get_execution(execution_id)
+    
+    events = context.subscribe()
+    try:
+        yield _sse(context.snapshot_event())
+        if context.end_time is not None:
+            yield _sse(context.summary_event())
+            return
+        
+        while True:
+            try:
+                event = events.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            
+            yield _sse(event)
+            if event['type'] == 'summary':
+                return
+    finally:
+        context.unsubscribe(events)
+
+
+class _LoopEventSink:
+    """Hands events emitted on engine threads to an asyncio.Queue on the subscriber's loop"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+    
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            # Subscriber's loop already closed
+            pass
+
+
+async def _execution_event_stream_async(execution_id: str):
+    """
+    Async variant of _execution_event_stream for ASGI servers.
+    
+    Waiting for events does not hold a worker thread; only the short
+    database polls of a queued execution run in a thread.
+    """
+    heartbeat = getattr(django_settings, 'WORKFLOW_EVENT_STREAM_HEARTBEAT', 15)
+    
+    context = execution_engine.get_execution(execution_id)
+    while context is None:
+        execution = await sync_to_async(_get_execution_row)(execution_id)
+        if not _is_waiting(execution):
+            for message in _stored_execution_events(execution):
+                yield message
+            return
+        yield ': waiting\n\n'
+        await asyncio.sleep(EVENT_STREAM_POLL_INTERVAL)
+        context = execution_engine.get_execution(execution_id)
+    
+    sink = context.subscribe(_LoopEventSink(asyncio.get_running_loop()))
+    try:
+        yield _sse(context.snapshot_event())
+        if context.end_time is not None:
+            yield _sse(context.summary_event())
+            return
+        
+        while True:
+            try:
+                event = await asyncio.wait_for(sink.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            
+            yield _sse(event)
+            if event['type'] == 'summary':
+                return
+    finally:
+        context.unsubscribe(sink)
 
 
 class WorkflowViewSet(viewsets.ModelViewSet):
@@ -57,33 +249,33 @@ class WorkflowViewSet(viewsets.ModelViewSet):
         trigger_data = serializer.validated_data.get('trigger_data', {})
         start_node_id = serializer.validated_data.get('start_node_id')
         credentials = serializer.validated_data.get('credentials', {})
+        max_concurrency = serializer.validated_data.get('max_concurrency')
         
         # Generate execution ID
         execution_id = str(uuid.uuid4())
         
-        # Execute workflow asynchronously
+        execution_request = ExecutionRequest(
+            execution_id=execution_id,
+            workflow_id=str(workflow.id),
+            nodes=workflow.nodes,
+            edges=workflow.edges,
+            trigger_data=trigger_data,
+            credentials=credentials,
+            start_node_id=start_node_id,
+            max_concurrency=max_concurrency,
+            version=workflow.updated_at.isoformat()
+        )
+        
         try:
-            context = async_to_sync(execution_engine.execute_workflow)(
-                workflow_id=str(workflow.id),
-                execution_id=execution_id,
-                nodes=workflow.nodes,
-                edges=workflow.edges,
-                trigger_data=trigger_data,
-                credentials=credentials,
-                start_node_id=start_node_id
-            )
+            # Queue the execution and return immediately when requested
+            if _should_run_async(serializer.validated_data.get('run_async')):
+                submit_execution(execution_request)
+                return _accepted_response(request, execution_id)
+            
+            context = async_to_sync(execution_engine.execute_workflow)(**execution_request.engine_kwargs())
             
             # Save execution to database
-            execution = WorkflowExecution.objects.create(
-                workflow=workflow,
-                status=context.status,
-                started_at=context.start_time,
-                finished_at=context.end_time,
-                execution_order=context.execution_order,
-                node_states=context.node_states,
-                errors=context.errors,
-                trigger_data=trigger_data
-            )
+            save_execution(execution_request, context)
             
             return Response({
                 'execution_id': execution_id,
@@ -109,9 +301,11 @@ class WorkflowViewSet(viewsets.ModelViewSet):
         node_id = serializer.validated_data['node_id']
         trigger_data = serializer.validated_data.get('trigger_data', {})
         credentials = serializer.validated_data.get('credentials', {})
+        max_concurrency = serializer.validated_data.get('max_concurrency')
         
         # Check if node exists in workflow
-        node = next((n for n in workflow.nodes if n['id'] == node_id), None)
+        plan = get_compiled_workflow(str(workflow.id), workflow.nodes, workflow.edges, workflow.updated_at.isoformat())
+        node = plan.get_node(node_id)
         if not node:
             return Response({
                 'error': f'Node {node_id} not found in workflow'
@@ -120,28 +314,29 @@ class WorkflowViewSet(viewsets.ModelViewSet):
         # Generate execution ID
         execution_id = str(uuid.uuid4())
         
+        execution_request = ExecutionRequest(
+            execution_id=execution_id,
+            workflow_id=str(workflow.id),
+            nodes=workflow.nodes,
+            edges=workflow.edges,
+            trigger_data=trigger_data,
+            credentials=credentials,
+            start_node_id=node_id,
+            max_concurrency=max_concurrency,
+            version=plan.version,
+            reuse_previous=serializer.validated_data.get('reuse_previous', False)
+        )
+        
         try:
-            context = async_to_sync(execution_engine.execute_workflow)(
-                workflow_id=str(workflow.id),
-                execution_id=execution_id,
-                nodes=workflow.nodes,
-                edges=workflow.edges,
-                trigger_data=trigger_data,
-                credentials=credentials,
-                start_node_id=node_id
-            )
+            # Queue the execution and return immediately when requested
+            if _should_run_async(serializer.validated_data.get('run_async')):
+                submit_execution(execution_request)
+                return _accepted_response(request, execution_id, node_id=node_id)
+            
+            context = async_to_sync(execution_engine.execute_workflow)(**execution_request.engine_kwargs())
             
             # Save execution to database
-            execution = WorkflowExecution.objects.create(
-                workflow=workflow,
-                status=context.status,
-                started_at=context.start_time,
-                finished_at=context.end_time,
-                execution_order=context.execution_order,
-                node_states=context.node_states,
-                errors=context.errors,
-                trigger_data=trigger_data
-            )
+            save_execution(execution_request, context)
             
             return Response({
                 'execution_id': execution_id,
@@ -233,6 +428,74 @@ class WorkflowExecutionViewSet(viewsets.ReadOnlyModelViewSet):
             'node_states': execution.node_states,
             'errors': execution.errors
         })
+    
+    @action(detail=True, methods=['get'], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def events(self, request, pk=None):
+        """
+        Stream node state changes as Server-Sent Events
+        
+        Live events are available for executions started with run_async (their
+        id is known while they run); a synchronous execution has no database
+        row until it finishes and can only be replayed afterwards.
+        """
+        context = execution_engine.get_execution(str(pk))
+        if (
+            context is not None
+            and not WorkflowExecution.objects.filter(pk=pk).exists()
+            and Workflow.objects.filter(id=context.workflow_id, user=request.user).exists()
+        ):
+            return Response(
+                {'error': 'Live events are only available for executions started with run_async'},
+                status=status.HTTP_409_CONFLICT
+            )
+        execution = self.get_object()
+        
+        # ASGI servers stream an async iterator without holding a thread per subscriber
+        if isinstance(request._request, ASGIRequest):
+            stream = _execution_event_stream_async(str(execution.id))
+        else:
+            stream = _execution_event_stream(str(execution.id))
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+        return response
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a queued or running execution"""
+        execution_id = str(pk)
+        
+        # Running in this process: cancel the in-flight node tasks
+        # (synchronous executions have no database row until they finish)
+        context = execution_engine.get_execution(execution_id)
+        if (
+            context is not None
+            and request.user.is_authenticated
+            and Workflow.objects.filter(id=context.workflow_id, user=request.user).exists()
+            and execution_engine.cancel_execution(execution_id)
+        ):
+            return Response({
+                'execution_id': execution_id,
+                'status': 'stopping'
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        execution = self.get_object()
+        # Not picked up by a worker yet: it will be skipped
+        stopped = WorkflowExecution.objects.filter(id=execution.id, status='queued').update(
+            status='stopped',
+            finished_at=timezone.now()
+        )
+        if stopped:
+            return Response({
+                'execution_id': execution_id,
+                'status': 'stopped'
+            })
+        
+        if execution.status == 'running':
+            error = 'Execution is running in another worker process and cannot be cancelled from here'
+        else:
+            error = f'Execution already finished with status {execution.status}'
+        return Response({'error': error}, status=status.HTTP_409_CONFLICT)
 
 
 class CredentialViewSet(viewsets.ModelViewSet):
@@ -283,39 +546,39 @@ def trigger_chat(request):
     workflow = get_object_or_404(Workflow, id=workflow_id)
     
     # Find chat trigger node
-    chat_trigger = next((n for n in workflow.nodes if n['data']['type'] == 'when-chat-received'), None)
+    plan = get_compiled_workflow(str(workflow.id), workflow.nodes, workflow.edges, workflow.updated_at.isoformat())
+    chat_trigger = plan.find_node_by_type('when-chat-received')
     if not chat_trigger:
         return Response({'error': 'Workflow does not have a chat trigger'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Execute workflow
     execution_id = str(uuid.uuid4())
     
+    execution_request = ExecutionRequest(
+        execution_id=execution_id,
+        workflow_id=str(workflow.id),
+        nodes=workflow.nodes,
+        edges=workflow.edges,
+        trigger_data={
+            'message': message,
+            'user': user,
+            'channel': channel,
+            'timestamp': '',
+        },
+        credentials={},
+        version=plan.version
+    )
+    
     try:
-        context = async_to_sync(execution_engine.execute_workflow)(
-            workflow_id=str(workflow.id),
-            execution_id=execution_id,
-            nodes=workflow.nodes,
-            edges=workflow.edges,
-            trigger_data={
-                'message': message,
-                'user': user,
-                'channel': channel,
-                'timestamp': '',
-            },
-            credentials={}
-        )
+        # Queue the execution and return immediately when requested
+        if _should_run_async(request.data.get('run_async')):
+            submit_execution(execution_request)
+            return _accepted_response(request, execution_id)
+        
+        context = async_to_sync(execution_engine.execute_workflow)(**execution_request.engine_kwargs())
         
         # Save execution
-        execution = WorkflowExecution.objects.create(
-            workflow=workflow,
-            status=context.status,
-            started_at=context.start_time,
-            finished_at=context.end_time,
-            execution_order=context.execution_order,
-            node_states=context.node_states,
-            errors=context.errors,
-            trigger_data={'message': message, 'user': user, 'channel': channel}
-        )
+        save_execution(execution_request, context, trigger_data={'message': message, 'user': user, 'channel': channel})
         
         return Response({
             'execution_id': execution_id,
@@ -358,8 +621,10 @@ def ai_chat(request):
         # Use settings from request or fallback to environment variables
         api_key = settings.get('apiKey') or os.getenv('GROQ_API_KEY')
         model = settings.get('model') or 'llama-3.1-8b-instant'
-        base_url = settings.get('baseUrl') or 'https://api.groq.com/openai/v1'
         provider = settings.get('llmProvider', 'groq')
+        if provider not in PROVIDER_BASE_URLS:
+            provider = 'default'  # Custom OpenAI-compatible endpoint
+        base_url = settings.get('baseUrl') or PROVIDER_BASE_URLS.get(provider, PROVIDER_BASE_URLS['groq'])
         
         if not api_key:
             return Response({
@@ -367,52 +632,17 @@ def ai_chat(request):
                 'timestamp': str(asyncio.get_event_loop().time())
             })
         
-        try:
-            # Import alith with error handling
-            try:
-                from alith import Agent, WindowBufferMemory
-            except ImportError as e:
-                print(f"🤖 Alith import error: {e}")
-                return Response({
-                    'error': 'AI service dependencies not available',
-                    'response': 'The AI service is not properly configured. Please check the backend setup.'
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
-            # Create memory for conversation history
-            memory = WindowBufferMemory(window_size=20)  # Keep last 20 messages
-            
-            # Add conversation history to memory (ensure proper alternation)
-            if conversation_history:
-                try:
-                    # Process conversation history in order, ensuring alternation
-                    for msg in conversation_history:
-                        if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                            if msg['role'] == 'user':
-                                memory.add_user_message(msg['content'])
-                            elif msg['role'] == 'assistant':
-                                memory.add_ai_message(msg['content'])
-                except Exception as e:
-                    print(f"🤖 Memory processing error: {e}")
-                    # Continue without memory if there's an error
-            
-            # Create simple agent without tools
-            try:
-                agent = Agent(
-                    name="workflow-assistant",
-                    model=model,
-                    api_key=api_key,
-                    base_url=base_url,
-                    memory=memory
-                )
-            except Exception as e:
-                print(f"🤖 Agent creation error: {e}")
-                return Response({
-                    'error': f'Failed to create AI agent: {str(e)}',
-                    'response': 'I apologize, but there was an error initializing the AI service. Please check your API key and try again.'
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
-            # Set simple preamble for the agent
-            agent.preamble = """You are a helpful AI assistant for a workflow builder application. You can help users with:
+        # Conversation history becomes the message list (last 20 messages, user/assistant only)
+        messages = [
+            {'role': msg['role'], 'content': msg['content']}
+            for msg in conversation_history
+            if isinstance(msg, dict) and msg.get('role') in ('user', 'assistant') and 'content' in msg
+        ][-20:]
+        while messages and messages[0]['role'] != 'user':
+            messages.pop(0)  # Providers expect the conversation to open with a user turn
+        messages.append({'role': 'user', 'content': message})
+        
+        preamble = """You are a helpful AI assistant for a workflow builder application. You can help users with:
 
 - Creating and configuring workflows
 - Understanding workflow concepts
@@ -420,47 +650,59 @@ def ai_chat(request):
 - Technical support and guidance
 
 Be friendly, helpful, and provide clear, concise answers."""
-            
-            # Get AI response (memory is already loaded)
-            try:
-                print(f"🤖 Sending message to AI: {message[:50]}...")
-                start_time = time.time()
-                response = agent.prompt(message)
-                end_time = time.time()
-                execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
-                
-                print(f"🤖 AI Response generated: {response[:100]}...")
-                print(f"🤖 Response length: {len(response)} characters")
-                print(f"🤖 Execution time: {execution_time:.2f}ms")
-                
+        
+        # Stand-alone questions can be answered from the semantic cache (opt-in via SEMANTIC_CACHE)
+        semantic_cache = get_semantic_cache() if not conversation_history else None
+        semantic_scope = make_cache_key(provider, base_url, model, preamble)
+        if semantic_cache is not None:
+            match = semantic_cache.lookup(semantic_scope, message)
+            if match is not None:
                 total_request_time = (time.time() - request_start_time) * 1000
-                print(f"🤖 Total request time: {total_request_time:.2f}ms")
-                
+                print(f"🤖 Semantic cache hit ({match['similarity']:.3f}): {match['question'][:50]}")
                 return Response({
-                    'response': response,
+                    'response': match['answer'],
                     'timestamp': str(time.time()),
-                    'execution_time_ms': execution_time,
-                    'total_request_time_ms': total_request_time
+                    'execution_time_ms': 0.0,
+                    'total_request_time_ms': total_request_time,
+                    'cached': True,
+                    'similarity': match['similarity'],
+                    'matched_question': match['question']
                 })
-            except Exception as e:
-                total_request_time = (time.time() - request_start_time) * 1000
-                print(f"🤖 Agent prompt error: {e}")
-                print(f"🤖 Total request time (error): {total_request_time:.2f}ms")
-                return Response({
-                    'error': f'AI response generation failed: {str(e)}',
-                    'response': 'I apologize, but I encountered an error while generating a response. Please try again or check your API key.',
-                    'total_request_time_ms': total_request_time
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        # Get AI response through the shared gateway (keeps pooled connections alive between requests)
+        try:
+            print(f"🤖 Sending message to AI: {message[:50]}...")
+            start_time = time.time()
+            gateway = get_llm_gateway()
+            response = gateway.run_sync(gateway.complete(
+                provider, model, messages, api_key, base_url=base_url, system=preamble
+            ))['text']
+            end_time = time.time()
+            execution_time = (end_time - start_time) * 1000  # Convert to milliseconds
+            
+            print(f"🤖 AI Response generated: {response[:100]}...")
+            print(f"🤖 Response length: {len(response)} characters")
+            print(f"🤖 Execution time: {execution_time:.2f}ms")
+            
+            if semantic_cache is not None and response:
+                semantic_cache.store(semantic_scope, message, response)
             
+            total_request_time = (time.time() - request_start_time) * 1000
+            print(f"🤖 Total request time: {total_request_time:.2f}ms")
+            
+            return Response({
+                'response': response,
+                'timestamp': str(time.time()),
+                'execution_time_ms': execution_time,
+                'total_request_time_ms': total_request_time
+            })
         except Exception as e:
             total_request_time = (time.time() - request_start_time) * 1000
-            error_msg = str(e) if str(e) else 'Unknown error occurred'
-            print(f"🤖 AI Service Exception: {error_msg}")
-            print(f"🤖 Exception type: {type(e)}")
-            print(f"🤖 Total request time (exception): {total_request_time:.2f}ms")
+            print(f"🤖 LLM gateway error: {e}")
+            print(f"🤖 Total request time (error): {total_request_time:.2f}ms")
             return Response({
-                'error': f'AI service unavailable: {error_msg}',
-                'response': 'I apologize, but the AI service is currently unavailable. Please try again later.',
+                'error': f'AI response generation failed: {str(e)}',
+                'response': 'I apologize, but I encountered an error while generating a response. Please try again or check your API key.',
                 'total_request_time_ms': total_request_time
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
@@ -905,4 +1147,30 @@ def get_memory_statistics(request):
     except Exception as e:
         return Response({
             'error': f'Failed to get memory statistics: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+def get_execution_metrics(request):
+    """Get execution engine runtime metrics"""
+    try:
+        semantic_cache = get_semantic_cache()
+        return Response({
+            'execution_plans': plan_cache.stats(),
+            'llm_thread_pool': get_llm_pool().stats(),
+            'llm_gateway': get_llm_gateway().stats(),
+            'http_client_pool': get_http_pool().stats(),
+            'web_search': get_search_backend().stats(),
+            'tool_dispatcher': get_tool_dispatcher().stats(),
+            'agent_memory': get_db_memory_backend().stats(),
+            'memory_store': get_memory_store().stats(),
+            'execution_queue': get_execution_queue().stats(),
+            'active_executions': execution_engine.active_executions.stats(),
+            'caches': get_cache_stats(),
+            'semantic_cache': semantic_cache.stats() if semantic_cache else None,
+        })
+        
+    except Exception as e:
+        return Response({
+            'error': f'Failed to get execution metrics: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
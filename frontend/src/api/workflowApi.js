@@ -92,13 +92,15 @@ class WorkflowAPI {
 
   /**
    * Execute a single node in the workflow
+   * Pass { reusePrevious: true } to reuse unchanged upstream results of the last run
    */
-  async executeNode(workflowId, nodeId, triggerData = {}, credentials = {}) {
+  async executeNode(workflowId, nodeId, triggerData = {}, credentials = {}, { reusePrevious = false } = {}) {
     return this.request(`/workflows/${workflowId}/execute_node/`, {
       method: 'POST',
       body: JSON.stringify({
         node_id: nodeId,
         trigger_data: triggerData,
+        reuse_previous: reusePrevious,
         credentials: {
           openai_api_key: credentials.openai_api_key,
           anthropic_api_key: credentials.anthropic_api_key,
@@ -124,6 +126,36 @@ class WorkflowAPI {
     return this.request(`/executions/${executionId}/status/`);
   }
 
+  /**
+   * Cancel a queued or running execution
+   */
+  async cancelExecution(executionId) {
+    return this.request(`/executions/${executionId}/cancel/`, {
+      method: 'POST',
+    });
+  }
+
+  /**
+   * Subscribe to live node state changes of an execution (Server-Sent Events)
+   * Returns the EventSource; call close() on it to stop listening
+   */
+  subscribeToExecution(executionId, { onSnapshot, onNode, onSummary, onError } = {}) {
+    const source = new EventSource(
+      `${apiService.baseURL}/executions/${executionId}/events/`,
+      { withCredentials: true }
+    );
+
+    source.addEventListener('snapshot', (event) => onSnapshot?.(JSON.parse(event.data)));
+    source.addEventListener('node', (event) => onNode?.(JSON.parse(event.data)));
+    source.addEventListener('summary', (event) => {
+      onSummary?.(JSON.parse(event.data));
+      source.close();
+    });
+    source.onerror = (error) => onError?.(error);
+
+    return source;
+  }
+
   /**
    * Trigger workflow from chat message
    */
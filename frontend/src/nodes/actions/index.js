@@ -5,7 +5,10 @@ import {
   keyValueProperty, 
   jsonProperty,
   operationProperty,
-  textProperty
+  textProperty,
+  valueProperty,
+  booleanProperty,
+  selectProperty
 } from '../base/commonProperties';
 
 export const actionNodes = {
@@ -22,6 +25,48 @@ export const actionNodes = {
       body: {
         ...jsonProperty('Body', '{}'),
         showIf: { method: ['POST', 'PUT', 'PATCH'] }
+      },
+      followRedirects: {
+        ...booleanProperty('Follow Redirects', false),
+        description: 'Custom headers are sent to the redirect target too'
+      },
+      cacheResponses: {
+        ...booleanProperty('Cache Responses', false),
+        description: 'Private responses, and responses to requests with credentials unless marked public, are not cached',
+        showIf: { method: ['GET'] }
+      },
+      jsonPath: textProperty('JSON Path', false, '$.data.items[*].id'),
+      maxInMemoryMB: valueProperty(5, 1, null, 'Max In-Memory Size (MB)', 'Larger responses are saved to a file and passed on as a handle'),
+      pagination: selectProperty('Pagination', 'none', [
+        { value: 'none', label: 'None' },
+        { value: 'page', label: 'Page Number' },
+        { value: 'offset', label: 'Offset / Limit' },
+        { value: 'cursor', label: 'Cursor' },
+        { value: 'link', label: 'Link Header' }
+      ]),
+      itemsPath: {
+        ...textProperty('Items Path', false, 'data.items'),
+        showIf: { pagination: ['page', 'offset', 'cursor', 'link'] }
+      },
+      pageSize: {
+        ...valueProperty(100, 1, null, 'Page Size', 'Items requested per page'),
+        showIf: { pagination: ['page', 'offset'] }
+      },
+      totalPath: {
+        ...textProperty('Total Count Path', false, 'meta.total'),
+        showIf: { pagination: ['page', 'offset'] }
+      },
+      cursorPath: {
+        ...textProperty('Next Cursor Path', false, 'next_cursor'),
+        showIf: { pagination: ['cursor'] }
+      },
+      pageConcurrency: {
+        ...valueProperty(4, 1, 16, 'Concurrent Pages', 'Pages fetched at once when the total count is known'),
+        showIf: { pagination: ['page', 'offset'] }
+      },
+      maxPages: {
+        ...valueProperty(100, 1, null, 'Max Pages', 'Stop after this many pages'),
+        showIf: { pagination: ['page', 'offset', 'cursor', 'link'] }
       }
     }
   }),
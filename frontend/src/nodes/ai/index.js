@@ -7,6 +7,7 @@ import {
   textProperty,
   valueProperty,
   jsonProperty,
+  booleanProperty,
   claudeModels
 } from '../base/commonProperties';
 
@@ -77,7 +78,8 @@ export const aiNodes = {
     icon: 'FiFileText',
     description: 'Transforms text into a concise summary',
     properties: {
-      maxLength: valueProperty(500, 100, 2000)
+      maxLength: valueProperty(500, 100, 2000),
+      cacheResponses: booleanProperty('Cache Responses', false)
     }
   }),
 
@@ -88,7 +90,8 @@ export const aiNodes = {
     icon: 'BiData',
     description: 'Extract information from text in a structured format',
     properties: {
-      schema: jsonProperty('Extraction Schema', '{\n  "fields": ["name", "email", "company"]\n}')
+      schema: jsonProperty('Extraction Schema', '{\n  "fields": ["name", "email", "company"]\n}'),
+      cacheResponses: booleanProperty('Cache Responses', false)
     }
   }),
 
@@ -100,7 +103,8 @@ export const aiNodes = {
     description: 'Classify your text into distinct categories',
     properties: {
       text: messageProperty(true),
-      categories: textProperty('Categories (comma separated)', true, 'positive, negative, neutral')
+      categories: textProperty('Categories (comma separated)', true, 'positive, negative, neutral'),
+      cacheResponses: booleanProperty('Cache Responses', false)
     }
   }),
 
@@ -111,7 +115,8 @@ export const aiNodes = {
     icon: 'FiTrendingUp',
     description: 'Analyze the sentiment of your text',
     properties: {
-      text: messageProperty(true)
+      text: messageProperty(true),
+      cacheResponses: booleanProperty('Cache Responses', false)
     }
   })
 };
@@ -9,7 +9,8 @@ export const memoryNodes = {
     icon: 'FiDatabase',
     description: 'Maintains a sliding window of recent messages using Alith SDK',
     properties: {
-      windowSize: valueProperty(20, 1, 1000, 'Window Size', 'Number of messages to keep in memory')
+      windowSize: valueProperty(20, 1, 1000, 'Window Size', 'Number of messages to keep in memory'),
+      maxContextTokens: valueProperty(4000, 64, 1000000, 'Max Context Tokens', 'Token budget for the history sent with each prompt; older messages are dropped or truncated')
     }
   }),
 
@@ -20,7 +21,8 @@ export const memoryNodes = {
     icon: 'FiDatabase',
     description: 'Persistent memory storage using Django database - survives server restarts',
     properties: {
-      windowSize: valueProperty(20, 1, 1000, 'Window Size', 'Number of messages to keep in memory')
+      windowSize: valueProperty(20, 1, 1000, 'Window Size', 'Number of messages to keep in memory'),
+      maxContextTokens: valueProperty(4000, 64, 1000000, 'Max Context Tokens', 'Token budget for the history sent with each prompt; older messages are dropped or truncated')
     }
   }),
 